@@ -0,0 +1,491 @@
+import argparse
+import datetime
+import hashlib
+import io
+import math
+import multiprocessing
+import os
+import struct
+import sys
+import xml.etree.ElementTree as ET
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Runs, rides and walks from GPS files (GPX, TCX, FIT). Each file is parsed
+# into flat arrays of track points, summarized with numpy (distance, moving
+# time, elevation gain, energy) and stored as one workouts row plus a
+# workout_tracks row holding the route as a compact encoded polyline.
+# Folders of files are parsed in worker processes; only the summaries come
+# back to be written.
+
+TRACKS_TABLE = '''
+CREATE TABLE IF NOT EXISTS workout_tracks (
+    workout_id INTEGER PRIMARY KEY REFERENCES workouts (id),
+    username TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    sport TEXT NOT NULL,
+    distance_m REAL NOT NULL,
+    moving_seconds REAL NOT NULL,
+    elapsed_seconds REAL NOT NULL,
+    elevation_gain_m REAL NOT NULL,
+    points INTEGER NOT NULL,
+    polyline TEXT NOT NULL,
+    UNIQUE (username, source_hash)
+)
+'''
+
+EXTENSIONS = (".gpx", ".tcx", ".fit")
+
+EARTH_RADIUS_M = 6371008.8
+
+# Slower than this (or a gap in recording longer than MAX_GAP_SECONDS) is stopped
+MOVING_SPEED = 0.5
+MAX_GAP_SECONDS = 120
+
+# GPS altitude wobbles by metres; it is averaged over this many points (odd) before climbs and grades
+ELEVATION_SMOOTHING = 5
+
+# Route simplification: points closer than this to the simplified line are dropped,
+# then the tolerance doubles until the route fits MAX_TRACK_POINTS
+TRACK_TOLERANCE_M = 5
+MAX_TRACK_POINTS = 500
+
+# Used for the energy estimate when the user has no profile weight
+DEFAULT_WEIGHT_KG = 70
+
+# Stored in workouts.level, matched from each format's own sport names
+SPORTS = {
+    "running": "Running", "run": "Running", "1": "Running",
+    "biking": "Cycling", "cycling": "Cycling", "ride": "Cycling", "2": "Cycling",
+    "walking": "Walking", "walk": "Walking", "11": "Walking",
+    "hiking": "Hiking", "hike": "Hiking", "17": "Hiking",
+}
+DEFAULT_SPORT = "Activity"
+
+# Cycling METs by speed (km/h upper bounds), from the Compendium of Physical Activities
+CYCLING_SPEEDS = [16, 19, 22, 25, 30]
+CYCLING_METS = [4.0, 6.8, 8.0, 10.0, 12.0, 15.8]
+DEFAULT_MET = 6.0
+
+# Rows per write transaction and files handed to a worker at a time
+WRITE_BATCH = 200
+WORKER_CHUNK = 8
+
+# FIT: seconds from the Unix epoch to 1989-12-31, and the messages read
+FIT_EPOCH = 631065600
+FIT_SESSION, FIT_RECORD = 18, 20
+FIT_TIMESTAMP, FIT_LAT, FIT_LON, FIT_ALTITUDE, FIT_ENHANCED_ALTITUDE, FIT_SPORT = 253, 0, 1, 2, 78, 5
+FIT_SEMICIRCLE = 180 / 2 ** 31
+# struct codes by FIT base type number (low 5 bits)
+FIT_TYPES = {0: "B", 1: "b", 2: "B", 3: "h", 4: "H", 5: "i", 6: "I", 8: "f", 9: "d", 10: "B", 11: "H",
+             12: "I", 13: "B", 14: "q", 15: "Q", 16: "Q"}
+
+
+class Track:
+    """Track points as flat arrays: degrees, metres (nan if missing), Unix seconds"""
+
+    def __init__(self):
+        self.lat = array("d")
+        self.lon = array("d")
+        self.ele = array("d")
+        self.time = array("d")
+        self.sport = DEFAULT_SPORT
+
+    def add(self, lat, lon, ele, time):
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.ele.append(math.nan if ele is None else ele)
+        self.time.append(time)
+
+    def set_sport(self, name):
+        if name:
+            self.sport = SPORTS.get(str(name).strip().lower(), self.sport)
+
+
+def _local_name(tag):
+    return tag.rpartition("}")[2]
+
+
+def _iso_seconds(text):
+    return datetime.datetime.fromisoformat(text.strip().replace("Z", "+00:00")).timestamp()
+
+
+def _child_text(elem, name):
+    for child in elem:
+        if _local_name(child.tag) == name:
+            return child.text
+    return None
+
+
+def parse_gpx(stream):
+    """Track points of every <trkpt> with a time, cleared as they are read"""
+    track = Track()
+    for event, elem in ET.iterparse(stream, events=("end",)):
+        name = _local_name(elem.tag)
+        if name == "trkpt":
+            time = _child_text(elem, "time")
+            if time:
+                ele = _child_text(elem, "ele")
+                track.add(float(elem.get("lat")), float(elem.get("lon")), float(ele) if ele else None,
+                          _iso_seconds(time))
+            elem.clear()
+        elif name == "type" and elem.text:
+            track.set_sport(elem.text)
+    return track
+
+
+def parse_tcx(stream):
+    """Track points of every <Trackpoint> with a position and time"""
+    track = Track()
+    lat = lon = None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        name = _local_name(elem.tag)
+        if event == "start":
+            if name == "Activity":
+                track.set_sport(elem.get("Sport"))
+            continue
+        if name == "LatitudeDegrees":
+            lat = float(elem.text)
+        elif name == "LongitudeDegrees":
+            lon = float(elem.text)
+        elif name == "Trackpoint":
+            time = _child_text(elem, "Time")
+            if time and lat is not None and lon is not None:
+                ele = _child_text(elem, "AltitudeMeters")
+                track.add(lat, lon, float(ele) if ele else None, _iso_seconds(time))
+            lat = lon = None
+            elem.clear()
+    return track
+
+
+def parse_fit(data):
+    """Track points from the record messages of a FIT file (bytes)
+
+    Only what a track needs is decoded: record timestamps, positions and
+    altitude, and the session's sport. Other messages are skipped by size.
+    """
+    header_size = data[0] if data else 0
+    if len(data) < 12 or data[8:12] != b".FIT":
+        raise ValueError("not a FIT file")
+    end = header_size + struct.unpack_from("<I", data, 4)[0]
+
+    track = Track()
+    # local message type -> (global number, struct, {field number: index into the unpacked values})
+    definitions = {}
+    position = header_size
+    timestamp = None
+    while position < end:
+        header = data[position]
+        position += 1
+        if header & 0x80:
+            # Compressed timestamp header: a data message with a 5 bit time offset
+            local = (header >> 5) & 0x03
+            offset = header & 0x1F
+            if timestamp is None:
+                raise ValueError("compressed timestamp before any full one")
+            timestamp += (offset - timestamp) & 0x1F
+        elif header & 0x40:
+            local = header & 0x0F
+            big_endian = data[position + 1] == 1
+            number, count = struct.unpack_from(">HB" if big_endian else "<HB", data, position + 2)
+            position += 5
+            codes, fields = [], {}
+            for i in range(count):
+                field, size, base = data[position:position + 3]
+                position += 3
+                code = FIT_TYPES.get(base & 0x1F)
+                if code and struct.calcsize(code) == size:
+                    fields[field] = len(fields)
+                    codes.append(code)
+                else:
+                    codes.append(f"{size}x")
+            if header & 0x20:
+                # Developer fields: skipped by their size
+                developer = data[position]
+                position += 1
+                codes.extend(f"{data[position + 3 * i + 1]}x" for i in range(developer))
+                position += 3 * developer
+            layout = struct.Struct((">" if big_endian else "<") + "".join(codes))
+            definitions[local] = (number, layout, fields)
+            continue
+        else:
+            local = header & 0x0F
+
+        number, layout, fields = definitions[local]
+        values = layout.unpack_from(data, position)
+        position += layout.size
+        if FIT_TIMESTAMP in fields and values[fields[FIT_TIMESTAMP]] != 0xFFFFFFFF:
+            timestamp = values[fields[FIT_TIMESTAMP]]
+        if number == FIT_RECORD and timestamp is not None:
+            lat = values[fields[FIT_LAT]] if FIT_LAT in fields else 0x7FFFFFFF
+            lon = values[fields[FIT_LON]] if FIT_LON in fields else 0x7FFFFFFF
+            if lat == 0x7FFFFFFF or lon == 0x7FFFFFFF:
+                continue  # no fix yet
+            ele = None
+            if FIT_ENHANCED_ALTITUDE in fields and values[fields[FIT_ENHANCED_ALTITUDE]] != 0xFFFFFFFF:
+                ele = values[fields[FIT_ENHANCED_ALTITUDE]] / 5 - 500
+            elif FIT_ALTITUDE in fields and values[fields[FIT_ALTITUDE]] != 0xFFFF:
+                ele = values[fields[FIT_ALTITUDE]] / 5 - 500
+            track.add(lat * FIT_SEMICIRCLE, lon * FIT_SEMICIRCLE, ele, timestamp + FIT_EPOCH)
+        elif number == FIT_SESSION and FIT_SPORT in fields:
+            track.set_sport(values[fields[FIT_SPORT]])
+    return track
+
+
+def read_track(path):
+    """Parse a .gpx, .tcx or .fit file; returns (Track, sha1 of the file)"""
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()
+    kind = os.path.splitext(path)[1].lower()
+    if kind == ".fit":
+        return parse_fit(data), digest
+    try:
+        # Files are read once for the hash; elements are still cleared as they are parsed
+        parser = parse_gpx if kind == ".gpx" else parse_tcx
+        return parser(io.BytesIO(data)), digest
+    except ET.ParseError as e:
+        raise ValueError(f"bad XML ({e})") from None
+
+
+def haversine(lat, lon):
+    """Distances in metres between consecutive points (degrees arrays)"""
+    lat, lon = np.radians(lat), np.radians(lon)
+    dlat, dlon = np.diff(lat), np.diff(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def smooth_elevation(ele):
+    """Altitudes with gaps interpolated, averaged over ELEVATION_SMOOTHING points; zeros if there are none"""
+    known = ~np.isnan(ele)
+    if known.sum() < 2:
+        return np.zeros(len(ele))
+    index = np.arange(len(ele))
+    filled = np.interp(index, index[known], ele[known])
+    if len(filled) <= ELEVATION_SMOOTHING:
+        return filled
+    padded = np.pad(filled, ELEVATION_SMOOTHING // 2, mode="edge")
+    return np.convolve(padded, np.ones(ELEVATION_SMOOTHING) / ELEVATION_SMOOTHING, mode="valid")
+
+
+def segment_mets(sport, speed, grade):
+    """Energy cost of each moving segment in METs
+
+    Running and walking use the ACSM equations (uphill grade counted);
+    cycling uses the Compendium's speed bands.
+    """
+    metres_per_minute = speed * 60
+    climb = np.clip(grade, 0, None)
+    if sport == "Running":
+        return (3.5 + 0.2 * metres_per_minute + 0.9 * metres_per_minute * climb) / 3.5
+    if sport in ("Walking", "Hiking"):
+        return (3.5 + 0.1 * metres_per_minute + 1.8 * metres_per_minute * climb) / 3.5
+    if sport == "Cycling":
+        return np.asarray(CYCLING_METS)[np.searchsorted(CYCLING_SPEEDS, speed * 3.6)]
+    return np.full(len(speed), DEFAULT_MET)
+
+
+def simplify(x, y, tolerance, max_points):
+    """Indices of a Douglas-Peucker simplification of the (x, y) line (metres)
+
+    The tolerance doubles until at most max_points are kept.
+    """
+    n = len(x)
+    while True:
+        keep = np.zeros(n, dtype=bool)
+        keep[0] = keep[-1] = True
+        stack = [(0, n - 1)]
+        while stack:
+            first, last = stack.pop()
+            if last - first < 2:
+                continue
+            dx, dy = x[last] - x[first], y[last] - y[first]
+            length = math.hypot(dx, dy)
+            px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+            if length:
+                distance = np.abs(dx * py - dy * px) / length
+            else:
+                distance = np.hypot(px, py)
+            worst = int(np.argmax(distance))
+            if distance[worst] > tolerance:
+                middle = first + 1 + worst
+                keep[middle] = True
+                stack.append((first, middle))
+                stack.append((middle, last))
+        if keep.sum() <= max_points:
+            return np.flatnonzero(keep)
+        tolerance *= 2
+
+
+def encode_polyline(lat, lon):
+    """Google's encoded polyline format (1e-5 degree precision)"""
+    out = []
+    previous_lat = previous_lon = 0
+    for value_lat, value_lon in zip(np.round(np.asarray(lat) * 1e5).astype(int),
+                                    np.round(np.asarray(lon) * 1e5).astype(int)):
+        for value, previous in ((value_lat, previous_lat), (value_lon, previous_lon)):
+            delta = int(value - previous)
+            delta = ~(delta << 1) if delta < 0 else delta << 1
+            while delta >= 0x20:
+                out.append(chr((0x20 | (delta & 0x1F)) + 63))
+                delta >>= 5
+            out.append(chr(delta + 63))
+        previous_lat, previous_lon = value_lat, value_lon
+    return "".join(out)
+
+
+def summarize(track, weight_kg=DEFAULT_WEIGHT_KG):
+    """Workout summary of a track; raises ValueError if it has fewer than two points"""
+    if len(track.time) < 2:
+        raise ValueError("no timed track points")
+    lat, lon = np.frombuffer(track.lat), np.frombuffer(track.lon)
+    ele, time = np.frombuffer(track.ele), np.frombuffer(track.time)
+    # Some devices write points out of order
+    order = np.argsort(time, kind="stable")
+    if np.any(order != np.arange(len(order))):
+        lat, lon, ele, time = lat[order], lon[order], ele[order], time[order]
+
+    distance = haversine(lat, lon)
+    seconds = np.diff(time)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speed = np.where(seconds > 0, distance / seconds, 0.0)
+        climb = np.diff(smooth_elevation(ele))
+        grade = np.where(distance > 0, climb / distance, 0.0)
+    travelling = speed >= MOVING_SPEED
+    # A long gap (auto-pause) still covers its distance but not moving time
+    moving = travelling & (seconds <= MAX_GAP_SECONDS)
+
+    mets = segment_mets(track.sport, speed[moving], grade[moving])
+    calories = float(np.sum(mets * weight_kg * seconds[moving]) / 3600)
+
+    # Simplify in a local flat projection around the start, in metres
+    x = np.radians(lon - lon[0]) * EARTH_RADIUS_M * math.cos(math.radians(lat[0]))
+    y = np.radians(lat - lat[0]) * EARTH_RADIUS_M
+    kept = simplify(x, y, TRACK_TOLERANCE_M, MAX_TRACK_POINTS)
+
+    start = datetime.datetime.fromtimestamp(time[0])
+    moving_seconds = float(seconds[moving].sum())
+    return {
+        "date": start.strftime("%Y-%m-%d %H:%M:%S"),
+        "sport": track.sport,
+        "distance_m": round(float(distance[travelling].sum()), 1),
+        "moving_seconds": round(moving_seconds, 1),
+        "elapsed_seconds": round(float(time[-1] - time[0]), 1),
+        "elevation_gain_m": round(float(np.clip(climb, 0, None).sum()), 1),
+        "calories": round(calories, 1),
+        "points": len(time),
+        "polyline": encode_polyline(lat[kept], lon[kept]),
+    }
+
+
+def summarize_file(path, weight_kg=DEFAULT_WEIGHT_KG):
+    """Summary dict for one file, with "path" and "source_hash"; {"path", "error"} if unreadable (runs in a worker)"""
+    try:
+        track, digest = read_track(path)
+        summary = summarize(track, weight_kg)
+    except (OSError, ValueError, KeyError, IndexError, struct.error) as e:
+        return {"path": path, "error": str(e) or type(e).__name__}
+    summary.update(path=path, source_hash=digest)
+    return summary
+
+
+def _summarize_chunk(paths, weight_kg):
+    return [summarize_file(path, weight_kg) for path in paths]
+
+
+def find_files(paths):
+    """Activity files among paths, searching folders recursively, sorted"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in os.walk(path):
+                found.extend(os.path.join(directory, name) for name in names if name.lower().endswith(EXTENSIONS))
+        else:
+            found.append(path)
+    return sorted(found)
+
+
+def summarize_files(paths, weight_kg=DEFAULT_WEIGHT_KG, workers=1):
+    """Yield summaries in path order, parsing in worker processes when there are enough files"""
+    chunks = [paths[i:i + WORKER_CHUNK] for i in range(0, len(paths), WORKER_CHUNK)]
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from _summarize_chunk(chunk, weight_kg)
+        return
+
+    # spawn, like the report workers: nothing of the parent's threads or connections is inherited
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for summaries in pool.map(_summarize_chunk, chunks, [weight_kg] * len(chunks)):
+            yield from summaries
+
+
+def create_workout_tracks(conn):
+    conn.execute(TRACKS_TABLE)
+
+
+def save_activities(conn, username, summaries):
+    """Store summaries as workouts plus tracks; files the user already imported are skipped. Returns rows added"""
+    added = 0
+    for summary in summaries:
+        if conn.execute("SELECT 1 FROM workout_tracks WHERE username = ? AND source_hash = ?",
+                        (username, summary["source_hash"])).fetchone():
+            continue
+        workout_id = conn.execute('''
+        INSERT INTO workouts (username, date, day, level, duration, calories_burned, completed)
+        VALUES (?, ?, ?, ?, ?, ?, 1)
+        ''', (username, summary["date"], summary["date"][:10], summary["sport"],
+              round(summary["moving_seconds"] / 60, 1), summary["calories"])).lastrowid
+        conn.execute('''
+        INSERT INTO workout_tracks (workout_id, username, source_hash, sport, distance_m, moving_seconds,
+                                    elapsed_seconds, elevation_gain_m, points, polyline)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (workout_id, username, summary["source_hash"], summary["sport"], summary["distance_m"],
+              summary["moving_seconds"], summary["elapsed_seconds"], summary["elevation_gain_m"],
+              summary["points"], summary["polyline"]))
+        added += 1
+    return added
+
+
+def import_activities(write, username, paths, weight_kg=DEFAULT_WEIGHT_KG, workers=1, report=None):
+    """Import activity files for username; returns (files added, already imported, [(path, error)])
+
+    write(work, *args) runs work(conn, *args) in one write transaction and
+    returns its result, like database.submit_write(...).result().
+    report(summary), if given, is called for every file parsed.
+    """
+    added, parsed, errors, batch = 0, 0, [], []
+    for summary in summarize_files(paths, weight_kg, workers):
+        if report:
+            report(summary)
+        if "error" in summary:
+            errors.append((summary["path"], summary["error"]))
+            continue
+        parsed += 1
+        batch.append(summary)
+        if len(batch) >= WRITE_BATCH:
+            added += write(save_activities, username, batch)
+            batch = []
+    if batch:
+        added += write(save_activities, username, batch)
+    return added, parsed - added, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize GPX, TCX and FIT files without storing them")
+    parser.add_argument("files", nargs="+")
+    args = parser.parse_args(argv)
+
+    for summary in summarize_files(find_files(args.files)):
+        if "error" in summary:
+            print(f"{summary['path']}: {summary['error']}", file=sys.stderr)
+            continue
+        print(f"{summary['path']}: {summary['sport']} {summary['date']} {summary['distance_m'] / 1000:.2f} km, "
+              f"{summary['moving_seconds'] / 60:.0f} min moving, +{summary['elevation_gain_m']:.0f} m, "
+              f"{summary['calories']:.0f} kcal, {summary['points']} points")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,877 @@
+import argparse
+import datetime
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that must not be imported before the login window appears
+HEAVY_MODULES = ["matplotlib", "numpy", "pandas", "PIL", "tkcalendar"]
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+FIRST_FRAME_SNIPPET = """
+import time
+start = time.perf_counter()
+import tkinter as tk
+from login_signup import AuthenticationSystem
+root = tk.Tk()
+AuthenticationSystem(root, None)
+root.update()
+print(f"{(time.perf_counter() - start) * 1000:.1f}")
+root.destroy()
+"""
+
+
+def run_in_sandbox(args):
+    """Run a Python subprocess against a throwaway data directory"""
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    with tempfile.TemporaryDirectory() as cwd:
+        return subprocess.run([sys.executable] + args, cwd=cwd, env=env,
+                              capture_output=True, text=True)
+
+
+def parse_importtime(stderr):
+    """Parse -X importtime output into (module, self_us, cumulative_us, depth) rows"""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def bench_importtime(args):
+    """Report what the login screen imports and how long it takes"""
+    result = run_in_sandbox(["-X", "importtime", "-c", f"import {args.module}"])
+    if result.returncode != 0:
+        print(result.stderr)
+        return 1
+
+    rows = parse_importtime(result.stderr)
+    top_level = [row for row in rows if row[3] == 0]
+    total_ms = sum(row[2] for row in top_level) / 1000
+
+    print(f"Importing {args.module}: {len(rows)} modules, {total_ms:.1f} ms")
+    # The slowest direct dependencies are the ones worth deferring
+    print(f"\n{'cumulative ms':>14}  {'self ms':>8}  module")
+    direct = [row for row in rows if row[3] <= 1]
+    for module, self_us, cumulative_us, _ in sorted(direct, key=lambda r: -r[2])[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f}  {self_us / 1000:>8.1f}  {module}")
+
+    loaded = {row[0].split(".")[0] for row in rows}
+    heavy = [name for name in HEAVY_MODULES if name in loaded]
+    if heavy:
+        print(f"\nHeavy modules imported before login: {', '.join(heavy)}")
+    else:
+        print("\nNo heavy modules imported before login")
+
+    # Time to first login frame needs a display; skip quietly without one
+    frame = run_in_sandbox(["-c", FIRST_FRAME_SNIPPET])
+    if frame.returncode == 0:
+        print(f"Time to first login frame: {frame.stdout.strip()} ms")
+    else:
+        print("Time to first login frame: skipped (no display available)")
+
+    return 1 if heavy else 0
+
+
+def timed(fn, repeat):
+    """Median wall time of fn() in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def synthetic_database(path, username="bench", years=5, meals_per_day=8, seed=1):
+    """Create a migrated database holding years of meals and water for one user"""
+    import database
+    from migrations import migrate
+
+    database.configure(path)
+    migrate(run_backfills=False)
+
+    rng = random.Random(seed)
+    meal_types = ["Breakfast", "Lunch", "Dinner", "Snack"]
+    start = datetime.date.today() - datetime.timedelta(days=365 * years)
+
+    meals = []
+    water = []
+    for offset in range(365 * years):
+        day = (start + datetime.timedelta(days=offset)).isoformat()
+        for _ in range(rng.randint(meals_per_day // 2, meals_per_day)):
+            meals.append((username, day, rng.choice(meal_types), "Food", rng.randint(50, 800),
+                          rng.uniform(0, 40), rng.uniform(0, 80), rng.uniform(0, 30)))
+        for _ in range(rng.randint(2, 8)):
+            water.append((username, day, 250))
+
+    with database.write_connection() as conn:
+        conn.executemany('''
+        INSERT INTO meals (username, date, meal_type, food_name, calories, protein, carbs, fats)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', meals)
+        conn.executemany("INSERT INTO hydration (username, date, amount) VALUES (?, ?, ?)", water)
+    return len(meals)
+
+
+def bench_diet(args):
+    """Diet tab refresh latency: three queries plus Python sums vs one aggregate query"""
+    import database
+    from diet_queries import load_day
+
+    with tempfile.TemporaryDirectory() as tmp:
+        total = synthetic_database(os.path.join(tmp, "bench.db"), years=args.years)
+
+        # One very busy day on top of the history
+        day = datetime.date.today().isoformat()
+        with database.write_connection() as conn:
+            conn.executemany('''
+            INSERT INTO meals (username, date, meal_type, food_name, calories, protein, carbs, fats)
+            VALUES (?, ?, 'Snack', 'Food', 100, 5, 10, 2)
+            ''', [("bench", day)] * args.items)
+            conn.execute("ANALYZE")
+
+        def separate_queries():
+            with database.read_connection() as conn:
+                rows = conn.execute('''
+                SELECT id, meal_type, food_name, calories, protein, carbs, fats
+                FROM meals WHERE username = ? AND date = ? ORDER BY meal_type
+                ''', ("bench", day)).fetchall()
+            with database.read_connection() as conn:
+                conn.execute("SELECT SUM(amount) FROM hydration WHERE username = ? AND date = ?",
+                             ("bench", day)).fetchone()
+            meals = [dict(zip(("id", "meal_type", "food_name", "calories", "protein", "carbs", "fats"), row))
+                     for row in rows]
+            sum(m['calories'] for m in meals)
+            sum(m['protein'] for m in meals)
+            sum(m['carbs'] for m in meals)
+            sum(m['fats'] for m in meals)
+
+        def single_query():
+            with database.read_connection() as conn:
+                load_day(conn, "bench", day)
+
+        print(f"{total + args.items} meals over {args.years} years, {args.items} on the refreshed day")
+        print(f"separate queries: {timed(separate_queries, args.repeat):8.3f} ms")
+        print(f"single query:     {timed(single_query, args.repeat):8.3f} ms")
+        database.close()
+    return 0
+
+
+def legacy_sleep_stats(records):
+    """The per-row Python loops SleepTab ran (analytics, then recommendations)"""
+    results = []
+    for _ in range(2):
+        dates = [datetime.datetime.strptime(r[0], "%Y-%m-%d") for r in records]
+        hours = [r[1] for r in records]
+        qualities = [r[2] for r in records]
+        avg_hours = sum(hours) / len(hours)
+        consistency = [max(0, 1 - abs(h - avg_hours) / avg_hours) for h in hours]
+        weekday_hours = [h for d, h in zip(dates, hours) if d.weekday() < 5]
+        weekend_hours = [h for d, h in zip(dates, hours) if d.weekday() >= 5]
+        quality_counts = {"Good": 0, "Average": 0, "Poor": 0}
+        for q in qualities:
+            quality_counts[q] = quality_counts.get(q, 0) + 1
+        recent = hours[-14:]
+        variance = sum((h - avg_hours) ** 2 for h in recent) / len(recent)
+        results.append((avg_hours, sum(consistency) / len(consistency),
+                        sum(weekday_hours) / len(weekday_hours), sum(weekend_hours) / len(weekend_hours),
+                        quality_counts, variance))
+    return results[0]
+
+
+# Quality labels in code order for vectorized_sleep_stats
+QUALITY_LEVELS = ("Good", "Average", "Poor")
+
+
+def vectorized_sleep_stats(rows):
+    """The NumPy pass that replaced legacy_sleep_stats before the sleep_accumulators table
+
+    rows are (YYYY-MM-DD, hours, quality code); returns the same tuple as legacy_sleep_stats.
+    """
+    import numpy as np
+
+    dates, hours, codes = zip(*rows)
+    # NumPy parses ISO dates in C, replacing a strptime call per row
+    dates = np.array(dates, dtype="datetime64[D]")
+    hours = np.array(hours, dtype=np.float64)
+    codes = np.array(codes, dtype=np.int8)
+
+    avg_hours = float(hours.mean())
+    consistency = float(np.clip(1 - np.abs(hours - avg_hours) / avg_hours, 0, None).mean())
+    # 1970-01-01 was a Thursday
+    weekend = (dates.astype(np.int64) + 3) % 7 >= 5
+    counts = np.bincount(codes, minlength=len(QUALITY_LEVELS))
+    recent = hours[-14:]
+    return (avg_hours, consistency, float(hours[~weekend].mean()), float(hours[weekend].mean()),
+            dict(zip(QUALITY_LEVELS, (int(c) for c in counts))), float(((recent - avg_hours) ** 2).mean()))
+
+
+def bench_sleep(args):
+    """Sleep analytics: legacy Python loops vs a vectorized NumPy pass"""
+
+    rng = random.Random(1)
+    print(f"{'nights':>10}  {'legacy ms':>10}  {'vectorized ms':>14}  speedup")
+    for nights in args.nights:
+        start = datetime.date(1000, 1, 1)
+        legacy_rows = []
+        coded_rows = []
+        for offset in range(nights):
+            day = (start + datetime.timedelta(days=offset)).isoformat()
+            hours = round(rng.uniform(4, 10), 1)
+            code = rng.randrange(len(QUALITY_LEVELS))
+            legacy_rows.append((day, hours, QUALITY_LEVELS[code]))
+            coded_rows.append((day, hours, code))
+
+        repeat = max(1, args.repeat * 10000 // nights)
+        legacy_ms = timed(lambda: legacy_sleep_stats(legacy_rows), repeat)
+        vectorized_ms = timed(lambda: vectorized_sleep_stats(coded_rows), repeat)
+
+        # Both paths must agree before their timings mean anything
+        expected = legacy_sleep_stats(legacy_rows)
+        stats = vectorized_sleep_stats(coded_rows)
+        assert abs(stats[0] - expected[0]) < 1e-6
+        assert abs(stats[2] - expected[2]) < 1e-6
+        assert stats[4] == expected[4]
+
+        print(f"{nights:>10}  {legacy_ms:>10.1f}  {vectorized_ms:>14.1f}  {legacy_ms / vectorized_ms:>6.1f}x")
+    return 0
+
+
+FOOD_WORDS = ("chicken beef pork turkey salmon tuna cod shrimp egg tofu lentil bean chickpea rice pasta "
+              "bread oat quinoa barley potato sweet corn pea carrot broccoli spinach kale lettuce tomato "
+              "onion garlic pepper mushroom apple banana orange grape berry strawberry blueberry mango "
+              "pineapple peach pear cherry yogurt milk cheese butter cream almond peanut walnut cashew "
+              "chocolate cookie cake muffin cereal granola soup salad sandwich burger pizza taco").split()
+FOOD_STYLES = "raw cooked boiled baked grilled fried roasted steamed canned frozen dried smoked".split()
+
+
+def synthetic_catalog(path, items, seed=1):
+    """Write a USDA-style CSV of items made-up foods with distinct names"""
+    import csv
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < items:
+        words = rng.sample(FOOD_WORDS, rng.randint(2, 4))
+        names.add(f"{' '.join(words).title()}, {', '.join(rng.sample(FOOD_STYLES, rng.randint(1, 2)))}")
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["description", "energy_kcal", "protein_g", "carbohydrate_g", "fat_g"])
+        for name in sorted(names, key=lambda _: rng.random()):
+            writer.writerow([name, rng.randint(10, 600), round(rng.uniform(0, 40), 1),
+                             round(rng.uniform(0, 80), 1), round(rng.uniform(0, 40), 1)])
+
+
+def bench_foods(args):
+    """Food catalog: streaming CSV import and search-as-you-type latency"""
+    import database
+    from migrations import migrate
+    from food_catalog import import_csv, search
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "foods.csv")
+        synthetic_catalog(csv_path, args.items)
+        database.configure(os.path.join(directory, "bench.db"))
+        migrate(run_backfills=False)
+
+        start = time.perf_counter()
+        with database.write_connection() as conn:
+            count = import_csv(conn, csv_path)
+        print(f"imported {count} foods in {time.perf_counter() - start:.1f}s")
+
+        # Every prefix of each query is one keystroke
+        queries = ["chicken breast grilled", "greek yogurt", "brocoli", "salmn smoked", "pnut butter", "oat"]
+        samples = []
+        with database.read_connection() as conn:
+            for query in queries:
+                for end in range(1, len(query) + 1):
+                    start = time.perf_counter()
+                    results = search(conn, query[:end])
+                    samples.append((time.perf_counter() - start) * 1000)
+                print(f"{query!r:>26} -> {results[0]['name'] if results else '(none)'}")
+        database.close()
+
+    samples.sort()
+    p95 = samples[int(len(samples) * 0.95)]
+    print(f"{len(samples)} keystrokes: median {statistics.median(samples):.2f} ms, "
+          f"p95 {p95:.2f} ms, max {samples[-1]:.2f} ms")
+    return 0
+
+
+def bench_frequency(args):
+    """Quick Add's food list: a GROUP BY over the user's meals vs the maintained top foods"""
+    import database
+    from food_frequency import rebuild_food_frequency, record_meal, forget_meal, top_foods, find_drift
+
+    with tempfile.TemporaryDirectory() as tmp:
+        total = synthetic_database(os.path.join(tmp, "bench.db"), years=args.years)
+
+        # Give the meals a skewed mix of names: a few staples and a long tail
+        rng = random.Random(2)
+        names = [f"Food {i}" for i in range(args.foods)]
+        with database.write_connection() as conn:
+            ids = [row[0] for row in conn.execute("SELECT id FROM meals")]
+            conn.executemany("UPDATE meals SET food_name = ? WHERE id = ?",
+                             [(names[min(int(rng.paretovariate(1.2)) - 1, args.foods - 1)], meal_id)
+                              for meal_id in ids])
+            start = time.perf_counter()
+            rebuild_food_frequency(conn)
+            print(f"{total} meals, {args.foods} distinct foods; rebuild {time.perf_counter() - start:.2f}s")
+            conn.execute("ANALYZE")
+
+        def group_by_scan():
+            with database.read_connection() as conn:
+                conn.execute('''
+                SELECT food_name, COUNT(*), MAX(date) FROM meals WHERE username = ?
+                GROUP BY food_name ORDER BY COUNT(*) DESC LIMIT 50
+                ''', ("bench",)).fetchall()
+
+        def maintained():
+            with database.read_connection() as conn:
+                top_foods(conn, "bench")
+
+        print(f"GROUP BY scan: {timed(group_by_scan, args.repeat):8.3f} ms")
+        print(f"top foods:     {timed(maintained, args.repeat):8.3f} ms")
+
+        # Incremental upkeep: random saves and deletes, then compare with a recompute
+        today = datetime.date.today().isoformat()
+        saved = []
+
+        def save():
+            with database.write_connection() as conn:
+                name = rng.choice(names[:200])
+                cursor = conn.execute('''
+                INSERT INTO meals (username, date, meal_type, food_name, calories, protein, carbs, fats)
+                VALUES ('bench', ?, 'Snack', ?, 100, 5, 10, 2)
+                ''', (today, name))
+                record_meal(conn, "bench", today, name, 100, 5, 10, 2)
+                saved.append(cursor.lastrowid)
+
+        def delete():
+            with database.write_connection() as conn:
+                meal_id = saved.pop(rng.randrange(len(saved))) if saved and rng.random() < 0.5 else rng.choice(ids)
+                forget_meal(conn, meal_id)
+                conn.execute("DELETE FROM meals WHERE id = ?", (meal_id,))
+
+        print(f"save + update:   {timed(save, args.repeat):8.3f} ms")
+        print(f"delete + update: {timed(delete, args.repeat):8.3f} ms")
+        with database.write_connection() as conn:
+            drift = find_drift(conn)
+            stored = conn.execute("SELECT COUNT(*) FROM food_frequency").fetchone()[0]
+        database.close()
+
+    print(f"{stored} foods stored; drift after {2 * args.repeat} edits: {len(drift)}")
+    return 1 if drift else 0
+
+
+def bench_core(args):
+    """Each headless service on its own: the pure rules, then their writes against a temporary database"""
+    import database
+    from migrations import migrate
+    import nutrition
+    import profiles
+    from sleep_accumulators import load_summary
+    from sleep_stats import recommendations, save_night
+    from workouts import WorkoutSession, save_workout
+
+    rng = random.Random(3)
+    form = {"name": "Bench", "age": "30", "gender": "Other", "height": "175", "weight": "70",
+            "daily_workout_goal": "30"}
+
+    def profile_rules():
+        profile = profiles.parse_profile(form)
+        bmi = profiles.calculate_bmi(profile["weight"], profile["height"])
+        profiles.bmi_category(bmi), profiles.bmi_color(bmi)
+
+    def workout_rules():
+        session = WorkoutSession("Advanced")
+        for exercise in session.exercises:
+            for _ in range(exercise["sets"]):
+                session.complete_set(exercise["name"])
+        return session.finish()
+
+    totals = {"calories": 2150, "protein": 42.0, "carbs": 310.0, "fats": 80.0, "hydration": 1500}
+
+    start = datetime.date.today() - datetime.timedelta(days=args.nights)
+    nights = [((start + datetime.timedelta(days=i)).isoformat(), rng.uniform(4, 10), rng.choice(QUALITY_LEVELS))
+              for i in range(args.nights)]
+
+    print(f"{'service':<28}{'median ms':>12}")
+    rules = [
+        ("profile: validate + BMI", profile_rules),
+        ("workout: full session", workout_rules),
+        ("nutrition: insights", lambda: nutrition.insights(totals, 2000, 1980.0, 7)),
+    ]
+    for name, fn in rules:
+        print(f"{name:<28}{timed(fn, args.repeat):>12.4f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.configure(os.path.join(tmp, "bench.db"))
+        migrate(run_backfills=False)
+        profile = profiles.parse_profile(form)
+        summary = workout_rules()
+        day = datetime.date.today().isoformat()
+
+        def write(work, *work_args):
+            with database.write_connection() as conn:
+                work(conn, *work_args)
+
+        writes = [
+            ("profile: save", lambda: write(profiles.save_profile, "bench", profile)),
+            ("workout: save", lambda: write(save_workout, "bench", summary)),
+            ("nutrition: add meal", lambda: write(nutrition.add_meal, "bench", day, "Lunch",
+                                                  rng.choice(["Rice", "Eggs", "Salad"]), 400, 20, 50, 10)),
+            ("hydration: add water", lambda: write(nutrition.add_water, "bench", day, 250)),
+            ("sleep: save night", lambda: write(save_night, "bench", rng.choice(nights)[0], 7.5, "Good", "")),
+        ]
+        for name, fn in writes:
+            print(f"{name:<28}{timed(fn, args.repeat):>12.4f}")
+
+        # What the Sleep tab reads: the accumulators, kept current by the triggers
+        with database.write_connection() as conn:
+            conn.executemany("INSERT OR REPLACE INTO sleep (username, date, hours, quality) VALUES ('bench', ?, ?, ?)",
+                             nights)
+
+        def read(work, *work_args):
+            with database.read_connection() as conn:
+                return work(conn, *work_args)
+
+        reads = [
+            (f"sleep: summary ({args.nights} nights)", lambda: read(load_summary, "bench")),
+            ("sleep: recommendations", lambda: recommendations(read(load_summary, "bench"))),
+        ]
+        for name, fn in reads:
+            print(f"{name:<28}{timed(fn, args.repeat):>12.4f}")
+        database.close()
+    return 0
+
+
+def bench_batch(args):
+    """trackfit.py report: per-user summaries with one worker vs a process per core"""
+    import database
+    from migrations import migrate
+    from trackfit import generate_reports
+
+    rng = random.Random(4)
+    start = datetime.date.today() - datetime.timedelta(days=args.days)
+    days = [(start + datetime.timedelta(days=i)).isoformat() for i in range(args.days)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        database.configure(path)
+        migrate(run_backfills=False)
+        users = [f"user{i:05d}" for i in range(args.users)]
+        with database.write_connection() as conn:
+            conn.executemany('''
+            INSERT INTO meals (username, date, meal_type, food_name, calories, protein, carbs, fats)
+            VALUES (?, ?, 'Lunch', 'Food', ?, 10, 20, 5)
+            ''', ((user, day, rng.randint(100, 900)) for user in users for day in days if rng.random() < 0.8))
+            conn.executemany("INSERT INTO sleep (username, date, hours, quality) VALUES (?, ?, ?, 'Good')",
+                             ((user, day, rng.uniform(5, 9)) for user in users for day in days))
+            # Signed up but never logged anything: reported with zeros, like a user with no rows at all
+            conn.execute("INSERT INTO users (username) VALUES ('newbie')")
+        database.close()
+        print(f"{args.users} users x {args.days} days")
+
+        as_of = datetime.date.today()
+        empty = {row["username"]: row for row in generate_reports(path, ["newbie", "nobody"], as_of, 1)}
+        for row in empty.values():
+            assert row["days_logged"] == 0 and row["avg_calories_in"] == 0 and row["avg_sleep_hours"] is None, row
+        for workers in sorted({1, os.cpu_count() or 1}):
+            started = time.perf_counter()
+            count = sum(1 for _ in generate_reports(path, users, as_of, workers))
+            elapsed = time.perf_counter() - started
+            print(f"{workers} worker(s): {count} reports in {elapsed:.2f}s ({count / elapsed:.0f} users/s)")
+    return 0
+
+
+def bench_export(args):
+    """Per-user export throughput (rows/s) and peak Python memory for each available format"""
+    import tracemalloc
+    import database
+    from export import export_user
+
+    with tempfile.TemporaryDirectory() as tmp:
+        total = synthetic_database(os.path.join(tmp, "bench.db"), years=args.years, meals_per_day=args.meals_per_day)
+        print(f"{total} meals over {args.years} years")
+
+        combinations = [("csv", "none"), ("csv", "gzip"), ("jsonl", "none"), ("jsonl", "gzip"),
+                        ("csv", "zstd"), ("parquet", "zstd")]
+        with database.read_connection() as conn:
+            for fmt, compression in combinations:
+                out = os.path.join(tmp, f"{fmt}-{compression}")
+                tracemalloc.start()
+                start = time.perf_counter()
+                try:
+                    counts = export_user(conn, "bench", out, fmt, compression)
+                except ValueError as e:
+                    print(f"{fmt:<8}{compression:<6} skipped: {e}")
+                    continue
+                finally:
+                    elapsed = time.perf_counter() - start
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                rows = sum(counts.values())
+                size = sum(os.path.getsize(os.path.join(root, name))
+                           for root, _, names in os.walk(out) for name in names)
+                print(f"{fmt:<8}{compression:<6} {rows} rows in {elapsed:.2f}s: {rows / elapsed:>9.0f} rows/s, "
+                      f"{size / 1e6:6.1f} MB, peak {peak / 1e6:.1f} MB")
+        database.close()
+    return 0
+
+
+def synthetic_activity(path, points, seed=1):
+    """Write a run of points one-second samples as .gpx, .tcx or .fit (by extension)"""
+    import struct
+
+    rng = random.Random(seed)
+    started = datetime.datetime(2024, 1, 1, 7, tzinfo=datetime.timezone.utc) + datetime.timedelta(days=seed)
+    lat, lon, ele = 52.0 + rng.uniform(-1, 1), 4.0 + rng.uniform(-1, 1), 10.0
+    samples = []
+    for i in range(points):
+        # About 3 m/s with some wander, and a stop every ten minutes
+        step = 0 if i % 600 < 30 else 3e-5
+        lat += step * rng.uniform(0.5, 1)
+        lon += step * rng.uniform(-0.5, 1)
+        ele += rng.uniform(-0.5, 0.6)
+        samples.append((lat, lon, ele, started + datetime.timedelta(seconds=i)))
+
+    kind = os.path.splitext(path)[1]
+    if kind == ".gpx":
+        with open(path, "w") as f:
+            f.write('<?xml version="1.0"?>\n<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1">'
+                    '<trk><type>running</type><trkseg>\n')
+            f.writelines(f'<trkpt lat="{la:.7f}" lon="{lo:.7f}"><ele>{el:.1f}</ele>'
+                         f'<time>{t:%Y-%m-%dT%H:%M:%SZ}</time></trkpt>\n' for la, lo, el, t in samples)
+            f.write("</trkseg></trk></gpx>\n")
+    elif kind == ".tcx":
+        with open(path, "w") as f:
+            f.write('<?xml version="1.0"?>\n<TrainingCenterDatabase '
+                    'xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2"><Activities>'
+                    '<Activity Sport="Running"><Lap><Track>\n')
+            f.writelines(f"<Trackpoint><Time>{t:%Y-%m-%dT%H:%M:%SZ}</Time><Position><LatitudeDegrees>{la:.7f}"
+                         f"</LatitudeDegrees><LongitudeDegrees>{lo:.7f}</LongitudeDegrees></Position>"
+                         f"<AltitudeMeters>{el:.1f}</AltitudeMeters></Trackpoint>\n" for la, lo, el, t in samples)
+            f.write("</Track></Lap></Activity></Activities></TrainingCenterDatabase>\n")
+    else:
+        # Local 0: record with timestamp; local 1: record without (sent with compressed
+        # timestamp headers); local 2: session with its sport
+        records = [struct.pack("<BBBHB", 0x40, 0, 0, 20, 4) + bytes([253, 4, 0x86, 0, 4, 0x85, 1, 4, 0x85, 2, 2, 0x84]),
+                   struct.pack("<BBBHB", 0x41, 0, 0, 20, 3) + bytes([0, 4, 0x85, 1, 4, 0x85, 2, 2, 0x84]),
+                   struct.pack("<BBBHB", 0x42, 0, 0, 18, 1) + bytes([5, 1, 0x00]),
+                   struct.pack("<BB", 0x02, 1)]
+        for i, (la, lo, el, t) in enumerate(samples):
+            position = (round(la * 2 ** 31 / 180), round(lo * 2 ** 31 / 180), round((el + 500) * 5))
+            stamp = int(t.timestamp()) - 631065600
+            if i % 10:
+                records.append(struct.pack("<BiiH", 0x80 | (1 << 5) | (stamp & 0x1F), *position))
+            else:
+                records.append(struct.pack("<BIiiH", 0x00, stamp, *position))
+        data = b"".join(records)
+        with open(path, "wb") as f:
+            f.write(struct.pack("<BBHI4sH", 14, 0x10, 2100, len(data), b".FIT", 0) + data + b"\0\0")
+
+
+def bench_activities(args):
+    """GPS file import throughput (files/s) for each format and worker count"""
+    import database
+    from migrations import migrate
+    from activity_import import import_activities, summarize_file
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = []
+        for i in range(args.files):
+            path = os.path.join(tmp, f"run{i:05d}{('.gpx', '.tcx', '.fit')[i % 3]}")
+            synthetic_activity(path, args.points, seed=i)
+            files.append(path)
+        print(f"{args.files} files of {args.points} points")
+
+        for kind in (".gpx", ".tcx", ".fit"):
+            subset = [path for path in files if path.endswith(kind)]
+            started = time.perf_counter()
+            summaries = [summarize_file(path) for path in subset]
+            elapsed = time.perf_counter() - started
+            assert not any("error" in summary for summary in summaries), summaries[0]
+            print(f"{kind:<5} {len(subset) / elapsed:8.1f} files/s  {sum(s['points'] for s in summaries) / elapsed:10.0f} "
+                  f"points/s  ({summaries[0]['distance_m'] / 1000:.2f} km, {summaries[0]['calories']:.0f} kcal)")
+
+        database.configure(os.path.join(tmp, "bench.db"))
+        migrate(run_backfills=False)
+
+        def write(work, *work_args):
+            return database.submit_write(work, *work_args).result()
+
+        for workers in sorted({1, os.cpu_count() or 1}):
+            # A user of its own per run, so every file is parsed and written rather than skipped
+            started = time.perf_counter()
+            added, skipped, errors = import_activities(write, f"bench{workers}", files, workers=workers)
+            elapsed = time.perf_counter() - started
+            assert added == len(files), (added, skipped, errors)
+            print(f"import, {workers} worker(s): {added} workouts in {elapsed:.2f}s ({len(files) / elapsed:.1f} files/s)")
+        started = time.perf_counter()
+        added, skipped, errors = import_activities(write, "bench1", files)
+        print(f"re-import: {added} added, {skipped} skipped in {time.perf_counter() - started:.2f}s")
+        database.close()
+    return 0
+
+
+def legacy_bmi_gauge(plt, bmi):
+    """The BMI gauge as ProfileTab drew it before charts.py: a new pyplot figure per save"""
+    from charts import BmiGauge
+
+    fig, ax = plt.subplots(figsize=(6, 3), dpi=100)
+    for start, end, color, label in BmiGauge.RANGES:
+        ax.barh(0, end-start, left=start, height=0.5, color=color, alpha=0.7)
+        ax.text((start + end) / 2, 0, label, ha='center', va='center', color='white', fontweight='bold')
+    ax.plot(bmi, 0, 'ko', markersize=12)
+    ax.plot(bmi, 0, 'wo', markersize=8)
+    ax.text(bmi, 0.7, f'Your BMI: {bmi:.1f}', ha='center', fontweight='bold')
+    ax.set_xlim(10, 40)
+    ax.set_ylim(-1, 1)
+    fig.canvas.draw()
+
+
+def bench_leaks(args):
+    """Memory regression check: redraw the BMI gauge for N profile saves
+
+    Runs headless on Agg. The persistent gauge (the path ProfileTab uses)
+    must keep the same artists, register no pyplot figures and stay within
+    a small heap budget per save (Agg's glyph rendering allocates a few
+    bytes per draw on its own); exits 1 otherwise. The legacy
+    create-per-save path is measured alongside for comparison.
+    """
+    import gc
+    import tracemalloc
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from charts import BmiGauge
+
+    # A user's BMI takes a limited set of values; cycling through them lets
+    # matplotlib's bounded caches (text layout, fonts) fill during warm-up,
+    # so any growth left afterwards is a real leak
+    rng = random.Random(1)
+    values = [round(rng.uniform(15, 38), 1) for _ in range(args.distinct)]
+    bmis = [values[i % len(values)] for i in range(args.saves)]
+
+    def measure(save):
+        for bmi in values:
+            save(bmi)
+        gc.collect()
+        figures_before = len(plt.get_fignums())
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        for bmi in bmis:
+            save(bmi)
+        elapsed = time.perf_counter() - start
+        gc.collect()
+        growth = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        return growth, len(plt.get_fignums()) - figures_before, elapsed * 1000 / len(bmis)
+
+    figure = Figure(figsize=(6, 3), dpi=100)
+    canvas = FigureCanvasAgg(figure)
+    gauge = BmiGauge(figure)
+
+    def persistent_save(bmi):
+        gauge.update(bmi)
+        canvas.draw()
+
+    artists_before = len(figure.findobj())
+    results = [("persistent", *measure(persistent_save))]
+    artists_added = len(figure.findobj()) - artists_before
+    if not args.skip_legacy:
+        with warnings.catch_warnings():
+            # The legacy path trips pyplot's "too many open figures" warning by design
+            warnings.simplefilter("ignore", RuntimeWarning)
+            results.append(("legacy", *measure(lambda bmi: legacy_bmi_gauge(plt, bmi))))
+        plt.close("all")
+
+    print(f"{args.saves} profile saves")
+    print(f"{'path':<12}  {'heap growth KiB':>16}  {'new figures':>11}  {'ms/save':>8}")
+    for name, growth, figures, ms in results:
+        print(f"{name:<12}  {growth / 1024:>16.1f}  {figures:>11}  {ms:>8.2f}")
+
+    _, growth, figures, _ = results[0]
+    if figures or artists_added or growth > args.max_growth_bytes * args.saves:
+        print(f"LEAK: persistent gauge added {artists_added} artists, {figures} figures "
+              f"and {growth / args.saves:.0f} bytes per save")
+        return 1
+    print(f"persistent gauge: no new artists or figures, {growth / args.saves:.0f} bytes per save")
+    return 0
+
+
+def bench_downsample(args):
+    """Sleep duration plot: drawing every night vs LTTB downsampled to the axis width"""
+    import numpy as np
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from charts import SleepCharts
+    from downsample import for_width
+
+    figure = Figure(figsize=(10, 8), dpi=100)
+    canvas = FigureCanvasAgg(figure)
+    chart = SleepCharts(figure, "#3498db", {"Good": "#2ecc71", "Average": "#f39c12", "Poor": "#e74c3c"})
+    pixels = SleepCharts.duration_pixels((10, 8))
+    counts = {"Good": 1, "Average": 1, "Poor": 1}
+
+    rng = np.random.default_rng(1)
+    print(f"duration axis {pixels:.0f} px")
+    print(f"{'nights':>10}  {'full ms':>8}  {'points':>6}  {'lttb ms':>8}  {'(of which lttb)':>15}")
+    for nights in args.nights:
+        dates = np.datetime64("1900-01-01") + np.arange(nights)
+        hours = rng.uniform(4, 10, nights)
+
+        def full():
+            chart.update(dates, hours, 7.0, counts)
+            canvas.draw()
+
+        def downsampled():
+            chart.update(*for_width(dates, hours, pixels), 7.0, counts)
+            canvas.draw()
+
+        full_ms = timed(full, args.repeat)
+        lttb_ms = timed(downsampled, args.repeat)
+        select_ms = timed(lambda: for_width(dates, hours, pixels), args.repeat)
+        points = len(for_width(dates, hours, pixels)[0])
+        print(f"{nights:>10}  {full_ms:>8.1f}  {points:>6}  {lttb_ms:>8.1f}  {select_ms:>15.1f}")
+    return 0
+
+
+def bench_render(args):
+    """Sleep analytics figure: Tk-thread cost of drawing in-process vs the render service"""
+    import numpy as np
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import render_service
+    from charts import SleepCharts
+
+    options = {"line_color": "#3498db",
+               "quality_colors": {"Good": "#2ecc71", "Average": "#f39c12", "Poor": "#e74c3c"}}
+    rng = np.random.default_rng(1)
+    dates = np.datetime64("2000-01-01") + np.arange(args.nights)
+    hours = rng.uniform(4, 10, args.nights)
+    data = (dates, hours, float(hours.mean()), {"Good": 10, "Average": 20, "Poor": 15})
+
+    # In-process: what the Tk thread paid before, with a persistent figure
+    figure = Figure(figsize=(10, 8), dpi=100)
+    canvas = FigureCanvasAgg(figure)
+    chart = SleepCharts(figure, **options)
+
+    def draw_in_process():
+        chart.update(*data)
+        canvas.draw()
+    in_process_ms = timed(draw_in_process, args.repeat)
+
+    render_service.warm_up().result()
+    start = time.perf_counter()
+    width, height, rgba = render_service.render("SleepCharts", (10, 8), data, options=options).result()
+    worker_ms = (time.perf_counter() - start) * 1000
+
+    # A revisit with unchanged data: hash the series and look it up
+    hit = lambda: render_service.render("SleepCharts", (10, 8), data, options=options)
+    hit_ms = timed(hit, args.repeat)
+    assert hit().done()
+
+    # The worker's bitmap must match an in-process render of the same data
+    assert (width, height) == canvas.get_width_height()
+    assert rgba == bytes(canvas.buffer_rgba())
+    render_service.shutdown()
+
+    print(f"{args.nights} nights, {width}x{height} bitmap")
+    print(f"in-process Agg draw on the Tk thread  {in_process_ms:8.1f} ms")
+    print(f"worker render (Tk thread is free)     {worker_ms:8.1f} ms")
+    print(f"cache hit on the Tk thread            {hit_ms:8.2f} ms")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TrackFit performance benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    importtime = subparsers.add_parser("importtime", help="cold-start import cost of the login screen")
+    importtime.add_argument("--module", default="login_signup")
+    importtime.add_argument("--top", type=int, default=15)
+    importtime.set_defaults(func=bench_importtime)
+
+    diet = subparsers.add_parser("diet", help="Diet tab refresh latency on a large meal table")
+    diet.add_argument("--years", type=int, default=5)
+    diet.add_argument("--items", type=int, default=300)
+    diet.add_argument("--repeat", type=int, default=200)
+    diet.set_defaults(func=bench_diet)
+
+    sleep = subparsers.add_parser("sleep", help="sleep analytics at increasing history sizes")
+    sleep.add_argument("--nights", type=int, nargs="+", default=[10000, 100000, 1000000])
+    sleep.add_argument("--repeat", type=int, default=5)
+    sleep.set_defaults(func=bench_sleep)
+
+    foods = subparsers.add_parser("foods", help="food catalog import and per-keystroke search latency")
+    foods.add_argument("--items", type=int, default=100000)
+    foods.set_defaults(func=bench_foods)
+
+    core = subparsers.add_parser("core", help="headless profile, workout, nutrition and sleep services")
+    core.add_argument("--nights", type=int, default=3650)
+    core.add_argument("--repeat", type=int, default=200)
+    core.set_defaults(func=bench_core)
+
+    batch = subparsers.add_parser("batch", help="per-user report throughput by worker count")
+    batch.add_argument("--users", type=int, default=2000)
+    batch.add_argument("--days", type=int, default=90)
+    batch.set_defaults(func=bench_batch)
+
+    export = subparsers.add_parser("export", help="per-user export rows/s and peak memory by format")
+    export.add_argument("--years", type=int, default=10)
+    export.add_argument("--meals-per-day", type=int, default=40)
+    export.set_defaults(func=bench_export)
+
+    activities = subparsers.add_parser("activities", help="GPX, TCX and FIT import files/s by format and worker count")
+    activities.add_argument("--files", type=int, default=300)
+    activities.add_argument("--points", type=int, default=3600)
+    activities.set_defaults(func=bench_activities)
+
+    frequency = subparsers.add_parser("frequency", help="Quick Add food list: GROUP BY scan vs maintained top foods")
+    frequency.add_argument("--years", type=int, default=5)
+    frequency.add_argument("--foods", type=int, default=2000)
+    frequency.add_argument("--repeat", type=int, default=200)
+    frequency.set_defaults(func=bench_frequency)
+
+    downsample = subparsers.add_parser("downsample", help="sleep duration plot with and without LTTB")
+    downsample.add_argument("--nights", type=int, nargs="+", default=[1000, 10000, 100000])
+    downsample.add_argument("--repeat", type=int, default=5)
+    downsample.set_defaults(func=bench_downsample)
+
+    render = subparsers.add_parser("render", help="sleep figure: in-process draw vs background render and cache")
+    render.add_argument("--nights", type=int, default=3650)
+    render.add_argument("--repeat", type=int, default=10)
+    render.set_defaults(func=bench_render)
+
+    leaks = subparsers.add_parser("leaks", help="chart memory regression check over repeated profile saves")
+    leaks.add_argument("--saves", type=int, default=1000)
+    leaks.add_argument("--distinct", type=int, default=25, help="distinct BMI values cycled through")
+    leaks.add_argument("--max-growth-bytes", type=int, default=1024, help="heap budget per save")
+    leaks.add_argument("--skip-legacy", action="store_true", help="only check the persistent gauge")
+    leaks.set_defaults(func=bench_leaks)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import tkinter as tk
+from PIL import Image, ImageTk
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import render_service
+from tk_async import call_when_done
+
+
+class ChartHost(tk.Frame):
+    """Owns one Figure and its Tk canvas for the life of a tab
+
+    The chart (a class from charts.py) builds its artists once; plot()
+    passes new data to chart.update() and schedules a redraw with
+    draw_idle(), so refreshing never creates another figure or canvas.
+    show_message() swaps the canvas for a placeholder label when there is
+    nothing to plot.
+    """
+
+    def __init__(self, master, chart_class, figsize, bg=None, dpi=100, **options):
+        super().__init__(master, bg=bg)
+        # Figure() rather than pyplot, so pyplot's figure registry never holds it
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        self.chart = chart_class(self.figure, **options)
+
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self)
+        self.canvas_widget = self.canvas.get_tk_widget()
+        self.message = tk.Label(self, bg=bg, font=("Arial", 12), fg="#7f8c8d")
+        self.canvas_widget.pack(fill=tk.BOTH, expand=True)
+        self.showing_chart = True
+
+    # Named plot() because tk.Frame.update() already means "process events"
+    def plot(self, *args, **kwargs):
+        """Move the chart's artists to the new data and redraw when idle"""
+        self.chart.update(*args, **kwargs)
+        if not self.showing_chart:
+            self.message.pack_forget()
+            self.canvas_widget.pack(fill=tk.BOTH, expand=True)
+            self.showing_chart = True
+        self.canvas.draw_idle()
+
+    def show_message(self, text):
+        """Hide the chart behind a text placeholder"""
+        self.canvas_widget.pack_forget()
+        self.showing_chart = False
+        self.message.config(text=text)
+        self.message.pack(pady=20)
+
+    def hide(self):
+        self.canvas_widget.pack_forget()
+        self.showing_chart = False
+        self.message.pack_forget()
+
+
+class BitmapChartHost(tk.Frame):
+    """Shows a chart rendered by render_service as a bitmap
+
+    Same interface as ChartHost, but plot() hands the data to the worker
+    process and the Tk thread only pastes the finished RGBA buffer into a
+    PhotoImage. Unchanged data is served from the render cache.
+    """
+
+    def __init__(self, master, chart_class, figsize, bg=None, dpi=100, **options):
+        super().__init__(master, bg=bg)
+        self.chart_name = chart_class.__name__
+        self.figsize = figsize
+        self.dpi = dpi
+        self.options = options
+
+        self.photo = None
+        self.image_label = tk.Label(self, bg=bg)
+        self.message = tk.Label(self, bg=bg, font=("Arial", 12), fg="#7f8c8d")
+        # Only the newest plot() is shown; slower, older renders are dropped
+        self.request = 0
+
+    def plot(self, *args):
+        """Render the chart for the new data in the background"""
+        self.request += 1
+        request = self.request
+        future = render_service.render(self.chart_name, self.figsize, args, self.dpi, self.options)
+        call_when_done(self, future, lambda result: self.show_bitmap(request, result),
+                       lambda e: self.render_failed(request, e))
+
+    def show_bitmap(self, request, result):
+        if request != self.request:
+            return
+        width, height, rgba = result
+        image = Image.frombuffer("RGBA", (width, height), rgba, "raw", "RGBA", 0, 1)
+        if self.photo is not None and (self.photo.width(), self.photo.height()) == (width, height):
+            # Blit into the existing image instead of creating a new one
+            self.photo.paste(image)
+        else:
+            self.photo = ImageTk.PhotoImage(image)
+            self.image_label.config(image=self.photo)
+
+        self.message.pack_forget()
+        self.image_label.pack(fill=tk.BOTH, expand=True)
+
+    def on_wheel(self, callback):
+        """Call callback(x_fraction, y_fraction, direction) when the wheel turns over the chart
+
+        Fractions are measured across the figure from its left and top edges;
+        direction is 1 for wheel up and -1 for wheel down.
+        """
+        def handle(event):
+            if self.photo is None:
+                return None
+            width, height = self.photo.width(), self.photo.height()
+            # The label centres the image when it has room to spare
+            x = event.x - (self.image_label.winfo_width() - width) / 2
+            y = event.y - (self.image_label.winfo_height() - height) / 2
+            up = getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0
+            callback(x / width, y / height, 1 if up else -1)
+            return "break"
+
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.image_label.bind(sequence, handle)
+
+    def render_failed(self, request, error):
+        if request == self.request:
+            self.show_message(f"Unable to create graph: {error}")
+
+    def show_message(self, text):
+        """Hide the chart behind a text placeholder"""
+        self.request += 1  # a render still in flight must not cover the message
+        self.image_label.pack_forget()
+        self.message.config(text=text)
+        self.message.pack(pady=20)
+
+    def hide(self):
+        self.request += 1
+        self.image_label.pack_forget()
+        self.message.pack_forget()
@@ -0,0 +1,221 @@
+import math
+import numpy as np
+import matplotlib.dates as mdates
+
+# Chart classes build their artists once on a Figure and then only mutate
+# them in update(). They never touch Tk, so the same classes draw into a
+# FigureCanvasTkAgg (see chart_host.py) or a plain Agg canvas.
+
+
+class BmiGauge:
+    """Horizontal BMI scale with a marker for the user's BMI"""
+
+    RANGES = [
+        (0, 18.5, "#3498db", "    Underweight"),
+        (18.5, 25, "#2ecc71", "Normal"),
+        (25, 30, "#f39c12", "Overweight"),
+        (30, 40, "#e74c3c", "Obese")
+    ]
+
+    def __init__(self, figure):
+        ax = figure.add_subplot(111)
+
+        # Create a horizontal BMI gauge
+        for start, end, color, label in self.RANGES:
+            ax.barh(0, end-start, left=start, height=0.5, color=color, alpha=0.7)
+
+            # Move "Underweight" slightly to the right so the 'w' isn't cut off
+            if label == "    Underweight":
+                ax.text((start + end) / 2 + 6, 0, label, ha='right', va='center', color='white', fontweight='bold')
+            else:
+                ax.text((start + end) / 2, 0, label, ha='center', va='center', color='white', fontweight='bold')
+
+        # Marker and label for the user's BMI, moved by update()
+        self.outer_marker, = ax.plot([], [], 'ko', markersize=12)
+        self.inner_marker, = ax.plot([], [], 'wo', markersize=8)
+        self.label = ax.text(0, 0.7, '', ha='center', fontweight='bold')
+
+        # Set up the plot
+        ax.set_xlim(10, 40)
+        ax.set_ylim(-1, 1)
+        ax.set_title('BMI Chart')
+        ax.set_yticks([])
+        ax.spines['left'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+        ax.spines['top'].set_visible(False)
+
+    def update(self, bmi):
+        self.outer_marker.set_data([bmi], [0])
+        self.inner_marker.set_data([bmi], [0])
+        self.label.set_position((bmi, 0.7))
+        self.label.set_text(f'Your BMI: {bmi:.1f}')
+
+
+class MacroPie:
+    """Protein/carbs/fats calorie split; wedges are re-angled in place"""
+
+    LABELS = ['Protein', 'Carbs', 'Fats']
+    COLORS = ['#ff9999', '#66b3ff', '#99ff99']
+    START_ANGLE = 90
+
+    def __init__(self, figure):
+        ax = figure.add_subplot(111)
+        self.wedges, self.texts, self.autotexts = ax.pie(
+            [1, 1, 1], labels=self.LABELS, colors=self.COLORS, autopct='%1.1f%%',
+            startangle=self.START_ANGLE, wedgeprops={'edgecolor': 'w'})
+        ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
+
+        # Make labels more readable
+        for text in self.texts:
+            text.set_fontsize(8)
+        for autotext in self.autotexts:
+            autotext.set_fontsize(8)
+            autotext.set_color('black')
+
+    def update(self, sizes):
+        """sizes: calories from protein, carbs and fats"""
+        total = float(sum(sizes))
+        theta = self.START_ANGLE
+        for wedge, text, autotext, size in zip(self.wedges, self.texts, self.autotexts, sizes):
+            fraction = size / total if total else 0
+            visible = fraction > 0
+            for artist in (wedge, text, autotext):
+                artist.set_visible(visible)
+            if not visible:
+                continue
+
+            # Same geometry ax.pie() uses: labels at 1.1 radii, percentages at 0.6
+            wedge.set_theta1(theta)
+            wedge.set_theta2(theta + 360 * fraction)
+            middle = math.radians(theta + 180 * fraction)
+            x, y = math.cos(middle), math.sin(middle)
+            text.set_position((1.1 * x, 1.1 * y))
+            text.set_horizontalalignment('left' if x > 0 else 'right')
+            autotext.set_position((0.6 * x, 0.6 * y))
+            autotext.set_text(f'{fraction * 100:.1f}%')
+            theta += 360 * fraction
+
+
+class BarSeries:
+    """Bar chart whose bars are re-heighted in place; recreated only when the count changes"""
+
+    def __init__(self, figure, color, title='', xlabel='', ylabel='', alpha=1.0,
+                 max_labels=None, rotation=0, label_size=None, title_size=10):
+        self.ax = figure.add_subplot(111)
+        self.color = color
+        self.alpha = alpha
+        self.bars = None
+        self.max_labels = max_labels
+        self.rotation = rotation
+        self.label_size = label_size
+        self.title_size = title_size
+        self.ax.set_title(title, fontsize=title_size)
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+
+    def update(self, labels, values, title=None, floor=0):
+        """Show values with their x labels; floor keeps the y-axis at least that tall"""
+        count = len(values)
+        if self.bars is None or len(self.bars) != count:
+            # Only a new number of bars needs new artists
+            if self.bars is not None:
+                self.bars.remove()
+            self.bars = self.ax.bar(range(count), values, color=self.color, alpha=self.alpha)
+            self.ax.set_xlim(-0.5, count - 0.5)
+        else:
+            for bar, value in zip(self.bars, values):
+                bar.set_height(value)
+
+        # Label at most about max_labels bars
+        step = max(1, count // self.max_labels) if self.max_labels else 1
+        ticks = list(range(0, count, step))
+        self.ax.set_xticks(ticks)
+        self.ax.set_xticklabels([labels[i] for i in ticks], rotation=self.rotation,
+                                ha='right' if self.rotation else 'center', fontsize=self.label_size)
+        self.ax.set_ylim(0, max(max(values, default=0), floor, 1) * 1.15)
+        if title is not None:
+            self.ax.set_title(title, fontsize=self.title_size)
+
+
+class IntakeBars(BarSeries):
+    """Daily calorie intake bars with a goal line"""
+
+    def __init__(self, figure, color):
+        super().__init__(figure, color, ylabel='Calories', alpha=0.7, max_labels=7, rotation=45, label_size=8)
+        figure.subplots_adjust(bottom=0.3)
+        self.goal_line = self.ax.axhline(0, color='r', linestyle='--')
+        self.legend = self.ax.legend([self.goal_line], [""], fontsize=8)
+
+    def update(self, labels, calories, goal, title=None):
+        super().update(labels, calories, title=title, floor=goal)
+        self.goal_line.set_ydata([goal, goal])
+        self.legend.get_texts()[0].set_text(f'Goal ({goal} kcal)')
+
+
+class WorkoutBars(BarSeries):
+    """Calories burned per workout"""
+
+    def __init__(self, figure, color):
+        super().__init__(figure, color, title='Calories Burned per Workout', xlabel='Date', ylabel='Calories',
+                         title_size='large')
+        # Tick labels change with the data, so lay out on every draw
+        figure.set_layout_engine('tight')
+
+
+class SleepCharts:
+    """Sleep duration over time plus the quality distribution"""
+
+    # Axes placement as a fraction of the figure (matplotlib's defaults, pinned
+    # so callers can size downsampling and map clicks without a live figure)
+    LEFT, RIGHT = 0.125, 0.9
+    # The duration plot fills the top of the figure down to this fraction from the top
+    DURATION_BOTTOM = 0.5
+
+    def __init__(self, figure, line_color, quality_colors):
+        figure.subplots_adjust(left=self.LEFT, right=self.RIGHT, hspace=0.5)
+
+        # First subplot - Sleep duration over time
+        self.duration_ax = figure.add_subplot(211)
+        self.line, = self.duration_ax.plot([], [], 'o-', color=line_color)
+        self.average_line = self.duration_ax.axhline(0, color='r', linestyle='--', alpha=0.7)
+        self.average_text = self.duration_ax.text(0, 0, '', color='r')
+        self.duration_ax.set_title('Sleep Duration Over Time')
+        self.duration_ax.set_ylabel('Hours')
+        self.duration_ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+        self.duration_ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %d'))
+
+        # Second subplot - Quality distribution
+        self.quality_ax = figure.add_subplot(212)
+        levels = list(quality_colors)
+        self.quality_levels = levels
+        self.quality_bars = self.quality_ax.bar(levels, [0] * len(levels),
+                                                color=[quality_colors[q] for q in levels])
+        self.quality_ax.set_title('Sleep Quality Distribution')
+        self.quality_ax.set_ylabel('Number of Days')
+
+    @classmethod
+    def duration_pixels(cls, figsize, dpi=100):
+        """Width in pixels of the duration plot's axis"""
+        return figsize[0] * dpi * (cls.RIGHT - cls.LEFT)
+
+    def update(self, dates, hours, avg_hours, quality_counts, view=None):
+        """dates: datetime64[D] array, hours: float array; view: (first, last) dates shown"""
+        x = mdates.date2num(np.asarray(dates, dtype='datetime64[D]'))
+        self.line.set_data(x, hours)
+        if view is not None:
+            self.duration_ax.set_xlim(*mdates.date2num(np.asarray(view, dtype='datetime64[D]')))
+        elif len(x) > 1:
+            self.duration_ax.set_xlim(x[0], x[-1])
+        elif len(x) == 1:
+            self.duration_ax.set_xlim(x[0] - 1, x[0] + 1)
+        self.duration_ax.set_ylim(0, max(12, float(np.max(hours)) + 1 if len(hours) else 12))
+
+        self.average_line.set_ydata([avg_hours, avg_hours])
+        if len(x):
+            self.average_text.set_position((x[0], avg_hours + 0.2))
+        self.average_text.set_text(f'Average ({avg_hours:.1f}h)')
+
+        counts = [quality_counts.get(level, 0) for level in self.quality_levels]
+        for bar, count in zip(self.quality_bars, counts):
+            bar.set_height(count)
+        self.quality_ax.set_ylim(0, max(max(counts), 1) * 1.1)
@@ -0,0 +1,256 @@
+import argparse
+import sqlite3
+import sys
+from database import DB_PATH
+
+# Per-user, per-day rollup of every fact table. Triggers keep it current on
+# insert, update and delete, so weekly/monthly/all-time views read one row per
+# day instead of re-aggregating meals, hydration, workouts and sleep.
+SUMMARY_TABLE = '''
+CREATE TABLE IF NOT EXISTS daily_summary (
+    username TEXT NOT NULL,
+    date TEXT NOT NULL,
+    calories_in INTEGER NOT NULL DEFAULT 0,
+    protein REAL NOT NULL DEFAULT 0,
+    carbs REAL NOT NULL DEFAULT 0,
+    fats REAL NOT NULL DEFAULT 0,
+    meal_count INTEGER NOT NULL DEFAULT 0,
+    water_ml INTEGER NOT NULL DEFAULT 0,
+    workout_minutes REAL NOT NULL DEFAULT 0,
+    calories_out REAL NOT NULL DEFAULT 0,
+    workout_count INTEGER NOT NULL DEFAULT 0,
+    sleep_hours REAL,
+    sleep_quality TEXT,
+    PRIMARY KEY (username, date)
+) WITHOUT ROWID
+'''
+
+SUMMARY_COLUMNS = [
+    "date", "calories_in", "protein", "carbs", "fats", "meal_count", "water_ml",
+    "workout_minutes", "calories_out", "workout_count", "sleep_hours", "sleep_quality",
+]
+
+# Tables whose rows add up into the rollup: table -> (day expression, backfill
+# name, columns updated on change, {summary column: value expression}).
+# {row} is replaced by NEW./OLD. inside triggers and dropped in plain queries.
+ADDITIVE_SOURCES = {
+    "meals": ("{row}date", "daily_summary_meals", "username, date, calories, protein, carbs, fats", {
+        "calories_in": "COALESCE({row}calories, 0)",
+        "protein": "COALESCE({row}protein, 0)",
+        "carbs": "COALESCE({row}carbs, 0)",
+        "fats": "COALESCE({row}fats, 0)",
+        "meal_count": "1",
+    }),
+    "hydration": ("{row}date", "daily_summary_hydration", "username, date, amount", {
+        "water_ml": "COALESCE({row}amount, 0)",
+    }),
+    # workouts.date is a full timestamp; the rollup is keyed by day
+    "workouts": ("substr({row}date, 1, 10)", "daily_summary_workouts",
+                 "username, date, duration, calories_burned", {
+        "workout_minutes": "COALESCE({row}duration, 0)",
+        "calories_out": "COALESCE({row}calories_burned, 0)",
+        "workout_count": "1",
+    }),
+}
+
+SLEEP_BACKFILL = "daily_summary_sleep"
+
+# The days of a chart or weekly view
+RANGE_QUERY = f'''
+SELECT {", ".join(SUMMARY_COLUMNS)} FROM daily_summary
+WHERE username = ? AND date >= ? AND date <= ?
+ORDER BY date
+'''
+
+
+def pending_backfill(backfill_name, row_id):
+    # Rows the initial backfill hasn't reached yet are not in the rollup, so
+    # triggers must neither subtract them nor add them a second time
+    return (f"EXISTS (SELECT 1 FROM schema_backfills WHERE name = '{backfill_name}' "
+            f"AND {row_id} > last_id AND {row_id} <= target_id)")
+
+
+def _upsert_values(table, row):
+    day, _, _, values = ADDITIVE_SOURCES[table]
+    columns = ", ".join(values)
+    exprs = ", ".join(expr.format(row=row) for expr in values.values())
+    updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in values)
+    return (f"INSERT INTO daily_summary (username, date, {columns}) "
+            f"VALUES ({row}username, {day.format(row=row)}, {exprs}) "
+            f"ON CONFLICT (username, date) DO UPDATE SET {updates};")
+
+
+def _subtract_values(table, row):
+    day, _, _, values = ADDITIVE_SOURCES[table]
+    updates = ", ".join(f"{column} = {column} - {expr.format(row=row)}" for column, expr in values.items())
+    return (f"UPDATE daily_summary SET {updates} "
+            f"WHERE username = {row}username AND date = {day.format(row=row)};")
+
+
+def create_daily_summary(conn):
+    """Create the rollup table and the triggers that maintain it"""
+    conn.execute(SUMMARY_TABLE)
+
+    for table, (_, backfill_name, watched, _) in ADDITIVE_SOURCES.items():
+        conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_summary_insert AFTER INSERT ON {table}
+        WHEN NOT {pending_backfill(backfill_name, "NEW.id")}
+        BEGIN
+            {_upsert_values(table, "NEW.")}
+        END
+        ''')
+        conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_summary_delete AFTER DELETE ON {table}
+        WHEN NOT {pending_backfill(backfill_name, "OLD.id")}
+        BEGIN
+            {_subtract_values(table, "OLD.")}
+        END
+        ''')
+        conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_summary_update AFTER UPDATE OF {watched} ON {table}
+        WHEN NOT {pending_backfill(backfill_name, "NEW.id")}
+        BEGIN
+            {_subtract_values(table, "OLD.")}
+            {_upsert_values(table, "NEW.")}
+        END
+        ''')
+
+    # Sleep is one row per night, so it is copied rather than summed
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS sleep_summary_insert AFTER INSERT ON sleep
+    BEGIN
+        INSERT INTO daily_summary (username, date, sleep_hours, sleep_quality)
+        VALUES (NEW.username, NEW.date, NEW.hours, NEW.quality)
+        ON CONFLICT (username, date) DO UPDATE
+        SET sleep_hours = excluded.sleep_hours, sleep_quality = excluded.sleep_quality;
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS sleep_summary_delete AFTER DELETE ON sleep
+    BEGIN
+        UPDATE daily_summary SET sleep_hours = NULL, sleep_quality = NULL
+        WHERE username = OLD.username AND date = OLD.date;
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS sleep_summary_update AFTER UPDATE OF username, date, hours, quality ON sleep
+    BEGIN
+        UPDATE daily_summary SET sleep_hours = NULL, sleep_quality = NULL
+        WHERE username = OLD.username AND date = OLD.date;
+        INSERT INTO daily_summary (username, date, sleep_hours, sleep_quality)
+        VALUES (NEW.username, NEW.date, NEW.hours, NEW.quality)
+        ON CONFLICT (username, date) DO UPDATE
+        SET sleep_hours = excluded.sleep_hours, sleep_quality = excluded.sleep_quality;
+    END
+    ''')
+
+
+def add_rows(conn, table, low_id, high_id):
+    """Fold the rows of one fact table with low_id < id <= high_id into the rollup"""
+    if table == "sleep":
+        conn.execute('''
+        INSERT INTO daily_summary (username, date, sleep_hours, sleep_quality)
+        SELECT username, date, hours, quality FROM sleep WHERE id > ? AND id <= ?
+        ON CONFLICT (username, date) DO UPDATE
+        SET sleep_hours = excluded.sleep_hours, sleep_quality = excluded.sleep_quality
+        ''', (low_id, high_id))
+        return
+
+    day, _, _, values = ADDITIVE_SOURCES[table]
+    day = day.format(row="")
+    columns = ", ".join(values)
+    sums = ", ".join(f"SUM({expr.format(row='')})" for expr in values.values())
+    updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in values)
+    conn.execute(f'''
+    INSERT INTO daily_summary (username, date, {columns})
+    SELECT username, {day}, {sums} FROM {table}
+    WHERE id > ? AND id <= ?
+    GROUP BY username, {day}
+    ON CONFLICT (username, date) DO UPDATE SET {updates}
+    ''', (low_id, high_id))
+
+
+def backfill_names():
+    """Backfill name -> fact table for the initial population of the rollup"""
+    names = {backfill_name: table for table, (_, backfill_name, _, _) in ADDITIVE_SOURCES.items()}
+    names[SLEEP_BACKFILL] = "sleep"
+    return names
+
+
+def rebuild_daily_summary(conn):
+    """Recompute the whole rollup from the fact tables"""
+    conn.execute("DELETE FROM daily_summary")
+    for backfill_name, table in backfill_names().items():
+        add_rows(conn, table, 0, sys.maxsize)
+        # Anything an unfinished backfill would still add is included now
+        conn.execute('''
+        UPDATE schema_backfills SET last_id = target_id, completed_at = CURRENT_TIMESTAMP
+        WHERE name = ? AND completed_at IS NULL
+        ''', (backfill_name,))
+
+
+def load_range(conn, username, start_date, end_date):
+    """Rollup rows for start_date..end_date (inclusive, YYYY-MM-DD), oldest first"""
+    cursor = conn.execute(RANGE_QUERY, (username, start_date, end_date))
+    return [dict(zip(SUMMARY_COLUMNS, row)) for row in cursor]
+
+
+def find_mismatches(conn):
+    """Compare the rollup with a fresh aggregate; returns [(username, date, column, stored, expected)]"""
+    numeric = [column for column in SUMMARY_COLUMNS[1:] if column != "sleep_quality"]
+
+    expected = {}
+    for table in ADDITIVE_SOURCES:
+        day, _, _, values = ADDITIVE_SOURCES[table]
+        day = day.format(row="")
+        sums = ", ".join(f"SUM({expr.format(row='')})" for expr in values.values())
+        for username, date, *totals in conn.execute(
+                f"SELECT username, {day}, {sums} FROM {table} GROUP BY username, {day}"):
+            expected.setdefault((username, date), {}).update(zip(values, totals))
+    for username, date, hours, quality in conn.execute("SELECT username, date, hours, quality FROM sleep"):
+        expected.setdefault((username, date), {}).update(sleep_hours=hours, sleep_quality=quality)
+
+    stored = {}
+    for row in conn.execute(f"SELECT username, {', '.join(SUMMARY_COLUMNS)} FROM daily_summary"):
+        stored[(row[0], row[1])] = dict(zip(SUMMARY_COLUMNS[1:], row[2:]))
+
+    mismatches = []
+    for key in expected.keys() | stored.keys():
+        want = expected.get(key, {})
+        have = stored.get(key, {})
+        for column in numeric + ["sleep_quality"]:
+            default = None if column in ("sleep_hours", "sleep_quality") else 0
+            a, b = have.get(column, default), want.get(column, default)
+            if column in numeric and a is not None and b is not None:
+                same = abs(a - b) < 1e-6
+            else:
+                same = a == b
+            if not same:
+                mismatches.append((key[0], key[1], column, a, b))
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check or rebuild the daily_summary rollup")
+    parser.add_argument("db", nargs="?", default=DB_PATH)
+    parser.add_argument("--rebuild", action="store_true", help="recompute the rollup from scratch")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.rebuild:
+            with conn:
+                rebuild_daily_summary(conn)
+        mismatches = find_mismatches(conn)
+    finally:
+        conn.close()
+
+    for username, date, column, stored, expected in mismatches[:20]:
+        print(f"{username} {date} {column}: stored {stored}, expected {expected}")
+    if not mismatches:
+        print("daily_summary matches the fact tables")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+import sqlite3
+import os
+import queue
+import atexit
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+# Default location of the TrackFit database
+DB_PATH = os.path.join('data', 'fitness_tracker.db')
+
+# Number of long-lived read connections kept in the pool
+READER_COUNT = 3
+
+# Storage engine tuning applied to every connection
+JOURNAL_MODE = "WAL"
+SYNCHRONOUS = "NORMAL"
+CACHE_SIZE_KB = 32 * 1024  # 32 MB page cache per connection
+MMAP_SIZE = 256 * 1024 * 1024  # 256 MB memory-mapped I/O
+
+
+class ConnectionPool:
+    """Small pool of long-lived SQLite connections: one writer, N readers"""
+
+    def __init__(self, path, readers=READER_COUNT):
+        self.path = path
+
+        # Create database directory if it doesn't exist
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # Single writer connection, serialised by a lock
+        self.writer_lock = threading.RLock()
+        self.writer_conn = self.connect()
+        
+        # WAL is persistent in the database file, so switching once is enough
+        self.writer_conn.execute(f"PRAGMA journal_mode = {JOURNAL_MODE}")
+
+        # Reader connections are handed out through a queue
+        self.readers = queue.Queue()
+        self.reader_conns = []
+        for _ in range(readers):
+            conn = self.connect()
+            self.reader_conns.append(conn)
+            self.readers.put(conn)
+
+        # Bumped after every committed write so views can tell when they are stale
+        self.data_version = 0
+        self.closed = False
+
+    def connect(self):
+        """Open a connection that may be shared between threads"""
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute(f"PRAGMA synchronous = {SYNCHRONOUS}")
+        conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """Borrow a read connection from the pool"""
+        conn = self.readers.get()
+        try:
+            yield conn
+        finally:
+            # Never hand back a connection with an open transaction
+            if conn.in_transaction:
+                conn.rollback()
+            self.readers.put(conn)
+
+    @contextmanager
+    def writer(self):
+        """Borrow the writer connection; commits on success, rolls back on error"""
+        with self.writer_lock:
+            conn = self.writer_conn
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            self.data_version += 1
+
+    def close(self):
+        """Close every connection owned by the pool"""
+        if self.closed:
+            return
+        self.closed = True
+        with self.writer_lock:
+            self.writer_conn.close()
+        for conn in self.reader_conns:
+            conn.close()
+
+
+class WriterThread(threading.Thread):
+    """Background thread that applies queued writes one transaction at a time"""
+
+    def __init__(self, pool):
+        super().__init__(name="trackfit-db-writer", daemon=True)
+        self.pool = pool
+        self.jobs = queue.Queue()
+
+    def submit(self, work, *args):
+        """Queue work(conn, *args) and return a Future for its result"""
+        future = Future()
+        self.jobs.put((work, args, future))
+        return future
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            work, args, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with self.pool.writer() as conn:
+                    result = work(conn, *args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def stop(self):
+        """Finish every queued write, then stop the thread"""
+        self.jobs.put(None)
+        self.join()
+
+
+_pool = None
+_writer = None
+_pool_lock = threading.Lock()
+
+
+def configure(path=DB_PATH, readers=READER_COUNT):
+    """Point the shared pool at a database file, replacing any existing pool"""
+    global _pool
+    close()
+    with _pool_lock:
+        _pool = ConnectionPool(path, readers)
+    return _pool
+
+
+def get_pool():
+    """Return the shared pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+
+def read_connection():
+    """Context manager yielding a pooled read connection"""
+    return get_pool().reader()
+
+
+def write_connection():
+    """Context manager yielding the pooled writer connection inside a transaction"""
+    return get_pool().writer()
+
+
+def data_version():
+    """Counter that changes whenever a write has been committed"""
+    return get_pool().data_version
+
+
+def get_writer():
+    """Return the background writer thread, starting it on first use"""
+    global _writer
+    pool = get_pool()
+    if _writer is None:
+        with _pool_lock:
+            if _writer is None:
+                _writer = WriterThread(pool)
+                _writer.start()
+    return _writer
+
+
+def submit_write(work, *args):
+    """Run work(conn, *args) in a transaction on the writer thread; returns a Future"""
+    return get_writer().submit(work, *args)
+
+
+def flush_writes():
+    """Block until every write queued so far has been applied"""
+    if _writer is not None:
+        _writer.submit(lambda conn: None).result()
+
+
+def close():
+    """Drain pending writes and close the shared pool (e.g. at exit)"""
+    global _pool, _writer
+    with _pool_lock:
+        if _writer is not None:
+            _writer.stop()
+            _writer = None
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+# Make sure queued writes reach the disk before the interpreter exits
+atexit.register(close)
@@ -0,0 +1,52 @@
+# One round trip for everything the Diet tab shows for a day: the meal rows,
+# followed by a single totals row with the day's calorie/macro sums and its
+# hydration total. Both halves are answered from the (username, date) indexes;
+# a window SUM() OVER () was measured slower here because of its extra sort.
+DAY_SUMMARY_QUERY = '''
+SELECT 0 AS totals_row, id, meal_type, food_name, calories, protein, carbs, fats, NULL
+FROM meals
+WHERE username = :username AND date = :date
+UNION ALL
+SELECT 1, NULL, NULL, NULL,
+       COALESCE(SUM(calories), 0), COALESCE(SUM(protein), 0),
+       COALESCE(SUM(carbs), 0), COALESCE(SUM(fats), 0),
+       (SELECT COALESCE(SUM(amount), 0) FROM hydration
+        WHERE username = :username AND date = :date)
+FROM meals
+WHERE username = :username AND date = :date
+ORDER BY totals_row, meal_type
+'''
+
+# The day's water total alone, refreshed after each drink is logged
+DAY_WATER_QUERY = '''
+SELECT SUM(amount) FROM hydration
+WHERE username = ? AND date = ?
+'''
+
+
+def load_day(conn, username, date_str):
+    """Return the meals and nutrition/hydration totals for one day"""
+    rows = conn.execute(DAY_SUMMARY_QUERY, {"username": username, "date": date_str}).fetchall()
+
+    # The totals row always sorts last
+    _, _, _, _, calories, protein, carbs, fats, hydration = rows[-1]
+    day = {
+        'meals': [],
+        'calories': calories,
+        'protein': protein,
+        'carbs': carbs,
+        'fats': fats,
+        'hydration': hydration,
+    }
+
+    for _, meal_id, meal_type, food_name, calories, protein, carbs, fats, _ in rows[:-1]:
+        day['meals'].append({
+            'id': meal_id,
+            'meal_type': meal_type,
+            'food_name': food_name,
+            'calories': calories,
+            'protein': protein,
+            'carbs': carbs,
+            'fats': fats
+        })
+    return day
@@ -3,11 +3,22 @@ from tkinter import ttk, messagebox, simpledialog
 import sqlite3
 import datetime
 from tkcalendar import DateEntry
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
 from collections import defaultdict
-from matplotlib.figure import Figure
+from database import read_connection, submit_write
+from diet_queries import DAY_WATER_QUERY, load_day
+import food_catalog
+import food_frequency
+import nutrition
+from daily_summary import load_range
+from streaks import get_streaks
+from tk_async import call_when_done
+from refresh_scheduler import scheduler_for
+from chart_host import ChartHost, BitmapChartHost
+from charts import MacroPie, IntakeBars
+
+# Day ranges offered for the intake graph
+GRAPH_RANGES = (7, 14, 30)
 
 class DietTab:
     def __init__(self, parent, bg_color, username):
@@ -24,6 +35,9 @@ class DietTab:
         self.today = datetime.date.today()
         self.selected_date = self.today
         
+        # Views are re-rendered through the shared scheduler, once per idle cycle
+        self.scheduler = scheduler_for(parent)
+        
         # Set default goals
         self.default_calorie_goal = 2000
         self.default_hydration_goal = 2000  # ml
@@ -44,7 +58,7 @@ class DietTab:
         # Fill the sections with content
         self.setup_diet_tracker()
         self.setup_hydration_tracker()
-        # self.setup_weekly_summary()
+        self.setup_weekly_summary()
         
         # Load data for current date
         self.refresh_data()
@@ -81,26 +95,14 @@ class DietTab:
     
     def load_user_goals(self):
         try:
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
-            
-            # Check if goals table exists, if not create it
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS diet_goals (
-                id INTEGER PRIMARY KEY,
-                username TEXT UNIQUE,
-                calorie_goal INTEGER,
-                hydration_goal INTEGER,
-                protein_goal INTEGER,
-                carbs_goal INTEGER,
-                fats_goal INTEGER
-            )
-            ''')
-            
-            # Get user's goals
-            cursor.execute('SELECT calorie_goal, hydration_goal FROM diet_goals WHERE username = ?', 
-                          (self.username,))
-            result = cursor.fetchone()
+            # The diet_goals table itself is created by the startup migrations
+            with read_connection() as conn:
+                cursor = conn.cursor()
+                
+                # Get user's goals
+                cursor.execute('SELECT calorie_goal, hydration_goal FROM diet_goals WHERE username = ?', 
+                              (self.username,))
+                result = cursor.fetchone()
             
             if result:
                 self.calorie_goal, self.hydration_goal = result
@@ -109,13 +111,13 @@ class DietTab:
                 self.calorie_goal = self.default_calorie_goal
                 self.hydration_goal = self.default_hydration_goal
                 
-                cursor.execute('''
-                INSERT INTO diet_goals (username, calorie_goal, hydration_goal, protein_goal, carbs_goal, fats_goal)
-                VALUES (?, ?, ?, ?, ?, ?)
-                ''', (self.username, self.calorie_goal, self.hydration_goal, 50, 250, 70))
+                def insert_goals(conn):
+                    conn.execute('''
+                    INSERT OR IGNORE INTO diet_goals (username, calorie_goal, hydration_goal, protein_goal, carbs_goal, fats_goal)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ''', (self.username, self.calorie_goal, self.hydration_goal, 50, 250, 70))
                 
-            conn.commit()
-            conn.close()
+                submit_write(insert_goals)
             
         except sqlite3.Error as e:
             print(f"Database error: {e}")
@@ -164,6 +166,8 @@ class DietTab:
         # Macronutrient Frame for Pie Chart (make it smaller)
         self.macro_frame = tk.Frame(diet_frame, bg=self.bg_color, height=180)  # Reduced height
         self.macro_frame.pack(fill=tk.X, expand=False, pady=5)
+        self.macro_chart = BitmapChartHost(self.macro_frame, MacroPie, figsize=(3, 1.25), bg=self.bg_color)
+        self.macro_chart.pack(fill=tk.BOTH, expand=True)
         
         log_frame = tk.LabelFrame(diet_frame, text="Today's Meals", padx=10, pady=10, bg=self.bg_color)
         log_frame.pack(fill=tk.BOTH, expand=True, pady=5)
@@ -260,9 +264,24 @@ class DietTab:
         summary_right = tk.Frame(summary_frame, bg=self.bg_color)
         summary_right.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10)
         
+        # Range selector for the intake graph
+        range_frame = tk.Frame(summary_left, bg=self.bg_color)
+        range_frame.pack(fill=tk.X)
+        
+        tk.Label(range_frame, text="Show last", bg=self.bg_color).pack(side=tk.LEFT)
+        self.graph_days = tk.IntVar(value=GRAPH_RANGES[0])
+        days_combo = ttk.Combobox(range_frame, textvariable=self.graph_days, values=GRAPH_RANGES,
+                                  width=4, state="readonly")
+        days_combo.pack(side=tk.LEFT, padx=5)
+        days_combo.bind("<<ComboboxSelected>>", lambda e: self.update_weekly_graph())
+        tk.Label(range_frame, text="days", bg=self.bg_color).pack(side=tk.LEFT)
+        
         # Graph frame for weekly calorie trends
         self.graph_frame = tk.Frame(summary_left, bg=self.bg_color)
         self.graph_frame.pack(fill=tk.BOTH, expand=True)
+        self.weekly_chart = ChartHost(self.graph_frame, IntakeBars, figsize=(6, 2.5), bg=self.bg_color,
+                                      color=self.primary_color)
+        self.weekly_chart.pack(fill=tk.BOTH, expand=True)
         
         # Insights text box
         tk.Label(summary_right, text="Nutritional Insights", bg=self.bg_color, font=('Helvetica', 12, 'bold')).pack(anchor=tk.W, pady=5)
@@ -281,16 +300,30 @@ class DietTab:
         self.achievement_label.pack(anchor=tk.W, pady=5)
     
     def refresh_data(self):
-        """Refresh all data displays for the selected date"""
-        self.load_meals()
-        self.load_hydration()
-        self.update_macronutrient_chart()
-        # self.update_weekly_graph()
-        # self.update_insights()
+        """Refresh all data displays for the selected date (coalesced until idle)"""
+        self.scheduler.mark_dirty(self.render_data)
+    
+    def render_data(self):
+        """Re-query and redraw every display for the selected date"""
+        # Meals, totals and hydration come back in a single query
+        meals_loaded = self.load_meals()
+        if meals_loaded:
+            self.update_hydration_progress(self.day_totals['hydration'])
+            self.update_macronutrient_chart()
+        
+        # The N-day graph reads the daily rollup; insights reuse both results
+        self.update_weekly_graph()
+        if meals_loaded:
+            self.update_insights()
+            self.update_achievements()
         
         # Always keep the persistent buttons visible
         self.persistent_button_frame.lift()
     
+    def refresh(self):
+        """Reload the selected date when the tab is shown again after a write"""
+        self.refresh_data()
+    
     def date_changed(self, event=None):
         """Handle date change event"""
         self.selected_date = self.date_picker.get_date()
@@ -298,49 +331,33 @@ class DietTab:
         self.refresh_data()
     
     def load_meals(self):
-        """Load meals for the selected date"""
+        """Load meals and the day's totals for the selected date; returns False on error"""
         try:
             # Clear existing items
             for item in self.meal_log.get_children():
                 self.meal_log.delete(item)
             
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
-            
             date_str = self.selected_date.strftime('%Y-%m-%d')
             
-            cursor.execute('''
-            SELECT id, meal_type, food_name, calories, protein, carbs, fats
-            FROM meals
-            WHERE username = ? AND date = ?
-            ORDER BY meal_type
-            ''', (self.username, date_str))
+            with read_connection() as conn:
+                day = load_day(conn, self.username, date_str)
             
-            total_calories = 0
-            self.meals_data = []
+            self.meals_data = day['meals']
+            self.day_totals = day
             
-            for row in cursor.fetchall():
-                meal_id, meal_type, food_name, calories, protein, carbs, fats = row
-                self.meal_log.insert('', 'end', iid=meal_id, values=(meal_type, food_name, calories, protein, carbs, fats))
-                total_calories += calories
-                self.meals_data.append({
-                    'id': meal_id,
-                    'meal_type': meal_type,
-                    'food_name': food_name,
-                    'calories': calories,
-                    'protein': protein,
-                    'carbs': carbs,
-                    'fats': fats
-                })
+            for meal in self.meals_data:
+                self.meal_log.insert('', 'end', iid=meal['id'], values=(
+                    meal['meal_type'], meal['food_name'], meal['calories'],
+                    meal['protein'], meal['carbs'], meal['fats']))
             
             # Update progress
-            self.update_calorie_progress(total_calories)
-            
-            conn.close()
+            self.update_calorie_progress(day['calories'])
+            return True
             
         except sqlite3.Error as e:
             print(f"Database error: {e}")
             messagebox.showerror("Database Error", "Error loading meals from database.")
+            return False
     
     def update_calorie_progress(self, total_calories):
         """Update the calorie progress display"""
@@ -373,6 +390,7 @@ class DietTab:
         food_name_var = tk.StringVar()
         food_name_entry = tk.Entry(add_meal_window, textvariable=food_name_var, width=30)
         food_name_entry.grid(row=1, column=1, padx=10, pady=10, sticky=tk.W)
+        food_name_entry.focus_set()
         
         # Calories entry
         tk.Label(add_meal_window, text="Calories:", bg=self.bg_color).grid(row=2, column=0, padx=10, pady=10, sticky=tk.W)
@@ -412,30 +430,82 @@ class DietTab:
             fats_var.get(), 
             add_meal_window
         ), bg=self.secondary_color, fg="white").pack(side=tk.LEFT, padx=10)
+        
+        # Picking a catalog suggestion fills in its nutrients
+        def fill_nutrients(food):
+            calories_var.set(int(round(food["calories"])))
+            protein_var.set(food["protein"])
+            carbs_var.set(food["carbs"])
+            fats_var.set(food["fats"])
+        
+        self.attach_food_suggestions(food_name_entry, food_name_var, fill_nutrients)
+    
+    def attach_food_suggestions(self, entry, name_var, on_pick):
+        """Drop a list of catalog matches under entry as the user types"""
+        suggestions = tk.Listbox(entry.winfo_toplevel(), height=6, activestyle="dotbox")
+        matches = []
+        picking = False
+        
+        def hide():
+            suggestions.place_forget()
+        
+        def update_suggestions(*_):
+            if picking:
+                return
+            # Each keystroke is one indexed lookup (a few ms even on a 100k catalog)
+            with read_connection() as conn:
+                matches[:] = food_catalog.search(conn, name_var.get(), limit=6)
+            suggestions.delete(0, tk.END)
+            for food in matches:
+                suggestions.insert(tk.END, f"{food['name']}  ({food['calories']:.0f} kcal)")
+            if matches:
+                suggestions.place(in_=entry, relx=0, rely=1, relwidth=1.4)
+                suggestions.lift()
+            else:
+                hide()
+        
+        def pick(index):
+            nonlocal picking
+            if not 0 <= index < len(matches):
+                return
+            food = matches[index]
+            picking = True
+            name_var.set(food["name"])
+            picking = False
+            on_pick(food)
+            hide()
+            entry.icursor(tk.END)
+        
+        def focus_list(event):
+            if matches:
+                suggestions.focus_set()
+                suggestions.selection_set(0)
+                suggestions.activate(0)
+            return "break"
+        
+        name_var.trace_add("write", update_suggestions)
+        entry.bind("<Down>", focus_list)
+        entry.bind("<Escape>", lambda e: hide())
+        suggestions.bind("<ButtonRelease-1>", lambda e: pick(suggestions.nearest(e.y)))
+        suggestions.bind("<Return>", lambda e: pick(suggestions.index(tk.ACTIVE)))
+        suggestions.bind("<Escape>", lambda e: (hide(), entry.focus_set()))
     
     def quick_add_meal(self):
-        """Open dialog with common foods for quick adding"""
+        """Open dialog with the user's frequent foods and common foods for quick adding"""
         quick_add_window = tk.Toplevel(self.parent)
         quick_add_window.title("Quick Add Meal")
-        quick_add_window.geometry("500x400")
+        quick_add_window.geometry("500x440")
         quick_add_window.resizable(False, False)
         quick_add_window.configure(bg=self.bg_color)
         quick_add_window.transient(self.parent)
         quick_add_window.grab_set()
         
-        # Common foods with nutritional info
-        common_foods = [
-            {"name": "Chicken Breast (100g)", "calories": 165, "protein": 31, "carbs": 0, "fats": 3.6},
-            {"name": "Brown Rice (100g cooked)", "calories": 112, "protein": 2.6, "carbs": 23, "fats": 0.9},
-            {"name": "Egg (large)", "calories": 70, "protein": 6, "carbs": 0.6, "fats": 5},
-            {"name": "Banana (medium)", "calories": 105, "protein": 1.3, "carbs": 27, "fats": 0.4},
-            {"name": "Greek Yogurt (100g)", "calories": 59, "protein": 10, "carbs": 3.6, "fats": 0.4},
-            {"name": "Oatmeal (100g cooked)", "calories": 71, "protein": 2.5, "carbs": 12, "fats": 1.5},
-            {"name": "Salmon (100g)", "calories": 206, "protein": 22, "carbs": 0, "fats": 13},
-            {"name": "Apple (medium)", "calories": 95, "protein": 0.5, "carbs": 25, "fats": 0.3},
-            {"name": "Avocado (half)", "calories": 160, "protein": 2, "carbs": 8.5, "fats": 15},
-            {"name": "Whole Wheat Bread (slice)", "calories": 81, "protein": 4, "carbs": 13.8, "fats": 1.1}
-        ]
+        # The user's most logged foods, then the built-in ones, until they search the catalog
+        with read_connection() as conn:
+            common_foods = food_frequency.top_foods(conn, self.username)
+            listed = {food["name"].casefold() for food in common_foods}
+            common_foods += [food for food in food_catalog.common_foods(conn)
+                             if food["name"].casefold() not in listed]
         
         # Meal type selection
         tk.Label(quick_add_window, text="Meal Type:", bg=self.bg_color).grid(row=0, column=0, padx=10, pady=10, sticky=tk.W)
@@ -444,9 +514,16 @@ class DietTab:
         meal_type_dropdown = ttk.Combobox(quick_add_window, textvariable=meal_type_var, values=meal_types, state="readonly")
         meal_type_dropdown.grid(row=0, column=1, padx=10, pady=10, sticky=tk.W)
         
+        # Search box for the food catalog
+        tk.Label(quick_add_window, text="Search:", bg=self.bg_color).grid(row=1, column=0, padx=10, sticky=tk.W)
+        search_var = tk.StringVar()
+        search_entry = tk.Entry(quick_add_window, textvariable=search_var, width=40)
+        search_entry.grid(row=1, column=1, padx=10, sticky=tk.W)
+        search_entry.focus_set()
+        
         # Create a frame for the food list
         list_frame = tk.Frame(quick_add_window, bg=self.bg_color)
-        list_frame.grid(row=1, column=0, columnspan=2, padx=10, pady=10, sticky=tk.NSEW)
+        list_frame.grid(row=2, column=0, columnspan=2, padx=10, pady=10, sticky=tk.NSEW)
         
         # Create treeview for foods
         food_list = ttk.Treeview(list_frame, columns=("name", "calories", "protein", "carbs", "fats"), show="headings", height=10)
@@ -462,21 +539,39 @@ class DietTab:
         food_list.column("carbs", width=70, anchor=tk.CENTER)
         food_list.column("fats", width=70, anchor=tk.CENTER)
         
-        # Add foods to the list
-        for i, food in enumerate(common_foods):
-            food_list.insert('', 'end', iid=i, values=(
-                food["name"], 
-                food["calories"], 
-                food["protein"], 
-                food["carbs"], 
-                food["fats"]
-            ))
+        # The list shows whatever foods holds; searching replaces its contents
+        foods = list(common_foods)
+        
+        def show_foods():
+            food_list.delete(*food_list.get_children())
+            for i, food in enumerate(foods):
+                food_list.insert('', 'end', iid=i, values=(
+                    food["name"], 
+                    f"{food['calories']:g}", 
+                    f"{food['protein']:g}", 
+                    f"{food['carbs']:g}", 
+                    f"{food['fats']:g}"
+                ))
+            if foods:
+                food_list.selection_set(0)
+        
+        def search_foods(*_):
+            text = search_var.get()
+            if text.strip():
+                with read_connection() as conn:
+                    foods[:] = food_catalog.search(conn, text)
+            else:
+                foods[:] = common_foods
+            show_foods()
+        
+        show_foods()
+        search_var.trace_add("write", search_foods)
         
         food_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # Buttons
         button_frame = tk.Frame(quick_add_window, bg=self.bg_color)
-        button_frame.grid(row=2, column=0, columnspan=2, pady=20)
+        button_frame.grid(row=3, column=0, columnspan=2, pady=20)
         
         tk.Button(button_frame, text="Cancel", command=quick_add_window.destroy, 
                  bg="#e74c3c", fg="white").pack(side=tk.LEFT, padx=10)
@@ -484,11 +579,11 @@ class DietTab:
         tk.Button(button_frame, text="Add Selected", command=lambda: self.add_selected_food(
             meal_type_var.get(), 
             food_list.selection(), 
-            common_foods, 
+            foods, 
             quick_add_window
         ), bg=self.secondary_color, fg="white").pack(side=tk.LEFT, padx=10)
     
-    def add_selected_food(self, meal_type, selection, common_foods, window):
+    def add_selected_food(self, meal_type, selection, foods, window):
         """Add the selected food from the quick add list"""
         if not selection:
             messagebox.showwarning("No Selection", "Please select a food item.")
@@ -496,7 +591,7 @@ class DietTab:
         
         try:
             selected_index = int(selection[0])
-            food = common_foods[selected_index]
+            food = foods[selected_index]
             
             self.save_meal(
                 meal_type, 
@@ -519,32 +614,23 @@ class DietTab:
             messagebox.showwarning("Validation Error", "Please enter a food name.")
             return
         
-        try:
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
-            
-            date_str = self.selected_date.strftime('%Y-%m-%d')
-            
-            cursor.execute('''
-            INSERT INTO meals (username, date, meal_type, food_name, calories, protein, carbs, fats)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (self.username, date_str, meal_type, food_name, calories, protein, carbs, fats))
-            
-            conn.commit()
-            conn.close()
-            
-            # Close the window
-            window.destroy()
-            
+        date_str = self.selected_date.strftime('%Y-%m-%d')
+        
+        def insert_meal(conn):
+            nutrition.add_meal(conn, self.username, date_str, meal_type, food_name, calories, protein, carbs, fats)
+        
+        def on_saved(_):
             # Refresh the display
             self.refresh_data()
             
             # Make sure the persistent buttons are still visible
             self.persistent_button_frame.lift()
-            
-        except sqlite3.Error as e:
-            print(f"Database error: {e}")
-            messagebox.showerror("Database Error", "Error saving meal to database.")
+        
+        # Close the window right away; the insert runs on the writer thread
+        window.destroy()
+        
+        call_when_done(self.parent, submit_write(insert_meal), on_saved,
+                       self.database_error("Error saving meal to database."))
     
     def delete_meal(self):
         """Delete the selected meal"""
@@ -557,22 +643,12 @@ class DietTab:
         confirmed = messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this meal?")
         
         if confirmed:
-            try:
-                conn = sqlite3.connect('data/fitness_tracker.db')
-                cursor = conn.cursor()
-                
-                for meal_id in selection:
-                    cursor.execute('DELETE FROM meals WHERE id = ?', (meal_id,))
-                
-                conn.commit()
-                conn.close()
-                
-                # Refresh the display
-                self.refresh_data()
-                
-            except sqlite3.Error as e:
-                print(f"Database error: {e}")
-                messagebox.showerror("Database Error", "Error deleting meal from database.")
+            def delete_rows(conn):
+                nutrition.delete_meals(conn, selection)
+            
+            # Refresh the display once the delete has been applied
+            call_when_done(self.parent, submit_write(delete_rows), lambda _: self.refresh_data(),
+                           self.database_error("Error deleting meal from database."))
     
     def set_calorie_goal(self):
         """Open dialog to set calorie goal"""
@@ -606,324 +682,140 @@ class DietTab:
             messagebox.showwarning("Validation Error", "Please enter a positive calorie goal.")
             return
         
-        try:
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+        def update_goal(conn):
+            conn.execute('''
             UPDATE diet_goals SET calorie_goal = ? WHERE username = ?
             ''', (goal, self.username))
-            
-            conn.commit()
-            conn.close()
-            
-            # Update local variable
-            self.calorie_goal = goal
-            self.calorie_goal_label.config(text=f"{self.calorie_goal} kcal")
-            
-            # Close window
-            window.destroy()
-            
-            # Refresh data
-            self.refresh_data()
-            
-        except sqlite3.Error as e:
+        
+        call_when_done(self.parent, submit_write(update_goal), None,
+                       self.database_error("Error saving calorie goal to database."))
+        
+        # Update local variable
+        self.calorie_goal = goal
+        self.calorie_goal_label.config(text=f"{self.calorie_goal} kcal")
+        
+        # Close window
+        window.destroy()
+        
+        # Refresh data
+        self.refresh_data()
+    
+    def database_error(self, message):
+        """Build the error callback for a failed background write"""
+        def on_error(e):
             print(f"Database error: {e}")
-            messagebox.showerror("Database Error", "Error saving calorie goal to database.")
+            messagebox.showerror("Database Error", message)
+        return on_error
     
     def update_macronutrient_chart(self):
         """Update the macronutrient pie chart"""
-        # Clear previous chart
-        for widget in self.macro_frame.winfo_children():
-            widget.destroy()
-        
-        # Calculate total macros for the day
-        total_protein = sum(meal['protein'] for meal in self.meals_data)
-        total_carbs = sum(meal['carbs'] for meal in self.meals_data)
-        total_fats = sum(meal['fats'] for meal in self.meals_data)
+        # Total macros for the day (summed by the database in load_meals)
+        total_protein = self.day_totals['protein']
+        total_carbs = self.day_totals['carbs']
+        total_fats = self.day_totals['fats']
         
         # If no data, show placeholder
         if total_protein == 0 and total_carbs == 0 and total_fats == 0:
-            tk.Label(self.macro_frame, text="No macronutrient data for today", 
-                    bg=self.bg_color).pack(expand=True)
+            self.macro_chart.show_message("No macronutrient data for today")
             return
         
-        # Calculate calories from each macro
-        protein_cals = total_protein * 4
-        carbs_cals = total_carbs * 4
-        fats_cals = total_fats * 9
-        total_cals = protein_cals + carbs_cals + fats_cals
-        
-        # If no calories, skip chart
-        if total_cals == 0:
-            return
-            
-        # Create pie chart using matplotlib
-        try:
-            # Create a figure and axis
-            figure = Figure(figsize=(3, 1.25), dpi=100)
-            ax = figure.add_subplot(111)
-            
-            # Data for pie chart
-            labels = ['Protein', 'Carbs', 'Fats']
-            sizes = [protein_cals, carbs_cals, fats_cals]
-            colors = ['#ff9999','#66b3ff','#99ff99']
-            
-            # Plot
-            wedges, texts, autotexts = ax.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', 
-                                             startangle=90, wedgeprops={'edgecolor': 'w'})
-            ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
-            
-            # Make labels more readable
-            for text in texts:
-                text.set_fontsize(8)
-            for autotext in autotexts:
-                autotext.set_fontsize(8)
-                autotext.set_color('black')
-            
-            # Add title
-            ax.set_title("", fontsize=10)
-            
-            # Create canvas
-            canvas = FigureCanvasTkAgg(figure, master=self.macro_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-            
-        except Exception as e:
-            print(f"Error creating chart: {e}")
-            tk.Label(self.macro_frame, text="Error creating macronutrient chart", 
-                    bg=self.bg_color).pack(expand=True)
+        # Calories from each macro; the pie's wedges are re-angled in place
+        self.macro_chart.plot(nutrition.macro_calories(self.day_totals))
     
-    # def update_weekly_graph(self):
-    #     """Update the weekly calorie graph"""
-    #     try:
-    #         # Clear previous chart
-    #         for widget in self.graph_frame.winfo_children():
-    #             widget.destroy()
-                
-    #         # Get data for the past 7 days
-    #         end_date = self.selected_date
-    #         start_date = end_date - datetime.timedelta(days=6)
-            
-    #         conn = sqlite3.connect('data/fitness_tracker.db')
-    #         cursor = conn.cursor()
-            
-    #         dates = []
-    #         calories = []
-    #         goal_line = []
-            
-    #         current_date = start_date
-    #         while current_date <= end_date:
-    #             date_str = current_date.strftime('%Y-%m-%d')
-    #             dates.append(date_str)
-                
-    #             # Get total calories for the day
-    #             cursor.execute('''
-    #             SELECT SUM(calories) FROM meals 
-    #             WHERE username = ? AND date = ?
-    #             ''', (self.username, date_str))
-                
-    #             result = cursor.fetchone()[0]
-    #             day_calories = result if result else 0
-    #             calories.append(day_calories)
-                
-    #             # Add goal for comparison
-    #             goal_line.append(self.calorie_goal)
-                
-    #             current_date += datetime.timedelta(days=1)
-            
-    #         conn.close()
-            
-    #         # Create bar chart
-    #         figure = Figure(figsize=(8, 3), dpi=100)
-    #         ax = figure.add_subplot(111)
-            
-    #         # Convert dates to shorter format for display
-    #         short_dates = [datetime.datetime.strptime(date, '%Y-%m-%d').strftime('%a %d') for date in dates]
-            
-    #         # Plot bars
-    #         bars = ax.bar(short_dates, calories, color=self.primary_color, alpha=0.7)
-            
-    #         # Plot goal line
-    #         ax.plot(short_dates, goal_line, 'r--', label=f'Goal ({self.calorie_goal} kcal)')
-            
-    #         # Set labels and title
-    #         ax.set_ylabel('Calories')
-    #         ax.set_title('Weekly Calorie Intake')
-            
-    #         # Rotate x-axis labels for readability
-    #         plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+    def update_weekly_graph(self):
+        """Update the calorie graph for the N days ending at the selected date"""
+        try:
+            days = self.graph_days.get()
+            end_date = self.selected_date
+            start_date = end_date - datetime.timedelta(days=days - 1)
             
-    #         # Add legend
-    #         ax.legend()
+            # The whole range comes from the daily rollup in one query
+            with read_connection() as conn:
+                self.weekly_rows = load_range(conn, self.username, start_date.strftime('%Y-%m-%d'),
+                                              end_date.strftime('%Y-%m-%d'))
             
-    #         # Adjust layout
-    #         figure.tight_layout()
+            by_date = {row['date']: row['calories_in'] for row in self.weekly_rows}
+            dates = [start_date + datetime.timedelta(days=i) for i in range(days)]
+            calories = [by_date.get(date.strftime('%Y-%m-%d'), 0) for date in dates]
             
-    #         # Create canvas
-    #         canvas = FigureCanvasTkAgg(figure, master=self.graph_frame)
-    #         canvas.draw()
-    #         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            self.weekly_chart.plot([date.strftime('%a %d') for date in dates], calories, self.calorie_goal,
+                                   title=f'Calorie Intake (last {days} days)')
             
-    #     except Exception as e:
-    #         print(f"Error creating weekly graph: {e}")
-    #         tk.Label(self.graph_frame, text="Error creating weekly graph", 
-    #                 bg=self.bg_color).pack(expand=True)
+        except sqlite3.Error as e:
+            print(f"Error creating weekly graph: {e}")
+            self.weekly_rows = []
     
-    # def update_insights(self):
-    #     """Update the nutritional insights section"""
-    #     try:
-    #         # Clear current insights
-    #         self.insights_text.config(state=tk.NORMAL)
-    #         self.insights_text.delete(1.0, tk.END)
-            
-    #         # If no meals data, show default message
-    #         if not self.meals_data:
-    #             self.insights_text.insert(tk.END, "No meal data available for the selected date. Add meals to see nutritional insights.")
-    #             self.insights_text.config(state=tk.DISABLED)
-    #             return
-            
-    #         # Calculate totals
-    #         total_calories = sum(meal['calories'] for meal in self.meals_data)
-    #         total_protein = sum(meal['protein'] for meal in self.meals_data)
-    #         total_carbs = sum(meal['carbs'] for meal in self.meals_data)
-    #         total_fats = sum(meal['fats'] for meal in self.meals_data)
-            
-    #         # Calculate calorie breakdown
-    #         protein_cals = total_protein * 4
-    #         carbs_cals = total_carbs * 4
-    #         fats_cals = total_fats * 9
-            
-    #         # Check if data for weekly analysis
-    #         end_date = self.selected_date
-    #         start_date = end_date - datetime.timedelta(days=6)
-            
-    #         conn = sqlite3.connect('data/fitness_tracker.db')
-    #         cursor = conn.cursor()
-            
-    #         # Get average calories for the past week
-    #         cursor.execute('''
-    #         SELECT AVG(daily_total) FROM (
-    #             SELECT date, SUM(calories) as daily_total 
-    #             FROM meals 
-    #             WHERE username = ? AND date BETWEEN ? AND ?
-    #             GROUP BY date
-    #         )
-    #         ''', (self.username, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')))
-            
-    #         avg_calories = cursor.fetchone()[0]
-    #         avg_calories = avg_calories if avg_calories else 0
-            
-    #         # Generate insights text
-    #         insights = "Nutritional Analysis:\n\n"
-            
-    #         # Calorie insights
-    #         insights += f"• Daily Calories: {total_calories} kcal"
-            
-    #         if total_calories > self.calorie_goal:
-    #             insights += f" (↑ {total_calories - self.calorie_goal} above goal)\n"
-    #         elif total_calories < self.calorie_goal:
-    #             insights += f" (↓ {self.calorie_goal - total_calories} below goal)\n"
-    #         else:
-    #             insights += " (exactly at goal)\n"
-                
-    #         insights += f"• Weekly Average: {avg_calories:.0f} kcal\n\n"
-            
-    #         # Macro breakdown
-    #         insights += "Macronutrient Breakdown:\n"
-    #         if total_calories > 0:
-    #             insights += f"• Protein: {total_protein:.1f}g ({(protein_cals/total_calories*100):.1f}%)\n"
-    #             insights += f"• Carbs: {total_carbs:.1f}g ({(carbs_cals/total_calories*100):.1f}%)\n"
-    #             insights += f"• Fats: {total_fats:.1f}g ({(fats_cals/total_calories*100):.1f}%)\n\n"
-    #         else:
-    #             insights += "• No calorie data available\n\n"
-            
-    #         # Recommendations
-    #         insights += "Recommendations:\n"
-            
-    #         # Protein recommendation (0.8g per kg body weight minimum)
-    #         ideal_protein = 50  # Default recommendation
-    #         if total_protein < ideal_protein:
-    #             insights += f"• Consider increasing protein intake (current: {total_protein:.1f}g)\n"
+    def update_insights(self):
+        """Update the nutritional insights section"""
+        try:
+            # Clear current insights
+            self.insights_text.config(state=tk.NORMAL)
+            self.insights_text.delete(1.0, tk.END)
             
-    #         # Balance recommendation
-    #         if total_calories > 0:
-    #             if (protein_cals/total_calories*100) < 10:
-    #                 insights += "• Your protein intake seems low relative to total calories\n"
-    #             if (fats_cals/total_calories*100) > 40:
-    #                 insights += "• Your fat intake is high relative to total calories\n"
-    #             if (carbs_cals/total_calories*100) > 70:
-    #                 insights += "• Your carbohydrate intake is very high\n"
+            # If no meals data, show default message
+            if not self.meals_data:
+                self.insights_text.insert(tk.END, "No meal data available for the selected date. Add meals to see nutritional insights.")
+                self.insights_text.config(state=tk.DISABLED)
+                return
             
-    #         # Add insights to text widget
-    #         self.insights_text.insert(tk.END, insights)
-    #         self.insights_text.config(state=tk.DISABLED)
+            # Average over the logged days of the graph range (already loaded by the graph)
+            logged_days = [row['calories_in'] for row in self.weekly_rows if row['meal_count'] > 0]
+            avg_calories = sum(logged_days) / len(logged_days) if logged_days else 0
             
-    #         # Update achievements
-    #         self.update_achievements()
+            # Totals were already loaded with the meals
+            insights = nutrition.insights(self.day_totals, self.calorie_goal, avg_calories, self.graph_days.get())
             
-    #         conn.close()
+            # Add insights to text widget
+            self.insights_text.insert(tk.END, insights)
+            self.insights_text.config(state=tk.DISABLED)
             
-    #     except Exception as e:
-    #         print(f"Error generating insights: {e}")
-    #         self.insights_text.insert(tk.END, "Error generating nutritional insights.")
-    #         self.insights_text.config(state=tk.DISABLED)
+        except Exception as e:
+            print(f"Error generating insights: {e}")
+            self.insights_text.insert(tk.END, "Error generating nutritional insights.")
+            self.insights_text.config(state=tk.DISABLED)
     
-    # def update_achievements(self):
-    #     """Update the achievements and streaks section"""
-    #     try:
-    #         # Check how many days in a row the user has logged meals
-    #         streak = 0
-    #         check_date = self.selected_date
-            
-    #         conn = sqlite3.connect('data/fitness_tracker.db')
-    #         cursor = conn.cursor()
-            
-    #         while True:
-    #             date_str = check_date.strftime('%Y-%m-%d')
-                
-    #             cursor.execute('''
-    #             SELECT COUNT(*) FROM meals 
-    #             WHERE username = ? AND date = ?
-    #             ''', (self.username, date_str))
-                
-    #             count = cursor.fetchone()[0]
-                
-    #             if count > 0:
-    #                 streak += 1
-    #                 check_date -= datetime.timedelta(days=1)
-    #             else:
-    #                 break
-            
-    #         conn.close()
-            
-    #         # Generate achievement text
-    #         achievement_text = ""
-            
-    #         if streak > 1:
-    #             achievement_text += f"🔥 {streak}-day logging streak!\n"
-            
-    #         # Check for tracking achievements
-    #         total_meals = len(self.meals_data)
-    #         if total_meals >= 3:
-    #             achievement_text += "✅ Tracked all main meals today\n"
-            
-    #         # Check for goal achievements
-    #         if self.selected_date == self.today:  # Only show for today
-    #             total_calories = sum(meal['calories'] for meal in self.meals_data)
-    #             if abs(total_calories - self.calorie_goal) <= 100:
-    #                 achievement_text += "🎯 Hit calorie goal (±100 kcal)\n"
-            
-    #         # If no achievements, show a message
-    #         if not achievement_text:
-    #             achievement_text = "Keep tracking your meals to earn achievements!"
-            
-    #         # Update label
-    #         self.achievement_label.config(text=achievement_text)
+    def update_achievements(self):
+        """Update the achievements and streaks section"""
+        try:
+            # Streaks come from one gaps-and-islands query, cached until the next write
+            streaks = get_streaks(self.username, self.selected_date)
+            
+            # Generate achievement text
+            achievement_text = ""
+            
+            meal_streak = streaks['meals']['current']
+            if meal_streak > 1:
+                achievement_text += f"🔥 {meal_streak}-day logging streak!\n"
+            if streaks['hydration']['current'] > 1:
+                achievement_text += f"💧 {streaks['hydration']['current']} days in a row at your water goal\n"
+            if streaks['workouts']['current'] > 1:
+                achievement_text += f"💪 {streaks['workouts']['current']}-day workout streak\n"
+            if streaks['sleep']['current'] > 1:
+                achievement_text += f"😴 {streaks['sleep']['current']} nights of sleep logged in a row\n"
+            if streaks['meals']['longest'] > max(meal_streak, 1):
+                achievement_text += f"🏆 Longest logging streak: {streaks['meals']['longest']} days\n"
+            
+            # Check for tracking achievements
+            total_meals = len(self.meals_data)
+            if total_meals >= 3:
+                achievement_text += "✅ Tracked all main meals today\n"
+            
+            # Check for goal achievements
+            if self.selected_date == self.today:  # Only show for today
+                total_calories = self.day_totals['calories']
+                if abs(total_calories - self.calorie_goal) <= 100:
+                    achievement_text += "🎯 Hit calorie goal (±100 kcal)\n"
+            
+            # If no achievements, show a message
+            if not achievement_text:
+                achievement_text = "Keep tracking your meals to earn achievements!"
+            
+            # Update label
+            self.achievement_label.config(text=achievement_text, justify=tk.LEFT)
             
-    #     except Exception as e:
-    #         print(f"Error updating achievements: {e}")
-    #         self.achievement_label.config(text="Error updating achievements")
+        except Exception as e:
+            print(f"Error updating achievements: {e}")
+            self.achievement_label.config(text="Error updating achievements")
     
     def setup_hydration_tracker(self):
         # Create a frame for the hydration tracker
@@ -972,20 +864,17 @@ class DietTab:
     def load_hydration(self):
         """Load hydration data for the selected date"""
         try:
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
-            
             date_str = self.selected_date.strftime('%Y-%m-%d')
             
-            cursor.execute('''
-            SELECT SUM(amount) FROM hydration
-            WHERE username = ? AND date = ?
-            ''', (self.username, date_str))
+            with read_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(DAY_WATER_QUERY, (self.username, date_str))
+                
+                result = cursor.fetchone()
             
-            result = cursor.fetchone()
             total_hydration = result[0] if result[0] else 0
-            
-            conn.close()
+            self.day_totals['hydration'] = total_hydration
             
             # Update hydration progress
             self.update_hydration_progress(total_hydration)
@@ -1033,26 +922,15 @@ class DietTab:
     
     def add_water(self, amount):
         """Add water to the hydration tracker"""
-        try:
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
-            
-            date_str = self.selected_date.strftime('%Y-%m-%d')
-            
-            cursor.execute('''
-            INSERT INTO hydration (username, date, amount)
-            VALUES (?, ?, ?)
-            ''', (self.username, date_str, amount))
-            
-            conn.commit()
-            conn.close()
-            
-            # Refresh the display
-            self.load_hydration()
-            
-        except sqlite3.Error as e:
-            print(f"Database error: {e}")
-            messagebox.showerror("Database Error", "Error adding water to database.")
+        date_str = self.selected_date.strftime('%Y-%m-%d')
+        
+        def insert_water(conn):
+            nutrition.add_water(conn, self.username, date_str, amount)
+        
+        # The click returns immediately; the display refreshes once the row lands
+        call_when_done(self.parent, submit_write(insert_water),
+                       lambda _: self.scheduler.mark_dirty(self.load_hydration, self.update_achievements),
+                       self.database_error("Error adding water to database."))
     
     def add_custom_water(self):
         """Add custom amount of water"""
@@ -1069,23 +947,24 @@ class DietTab:
             self.hydration_goal = new_goal
             self.hydration_goal_label.config(text=f"{self.hydration_goal} ml")
             self.save_user_goals()
-            self.refresh_data()
+            
+            # Only the hydration display depends on this goal; no need to re-query the day
+            self.scheduler.mark_dirty(self.render_hydration)
+    
+    def render_hydration(self):
+        """Redraw the hydration progress from the already-loaded totals"""
+        self.update_hydration_progress(self.day_totals['hydration'])
             
     def save_user_goals(self):
         """Save user goals to database"""
-        try:
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+        def update_goals(conn, calorie_goal, hydration_goal):
+            conn.execute('''
             UPDATE diet_goals
             SET calorie_goal = ?, hydration_goal = ?
             WHERE username = ?
-            ''', (self.calorie_goal, self.hydration_goal, self.username))
-            
-            conn.commit()
-            conn.close()
-            
-        except sqlite3.Error as e:
-            print(f"Database error: {e}")
-            messagebox.showerror("Database Error", "Error saving user goals to database.")
\ No newline at end of file
+            ''', (calorie_goal, hydration_goal, self.username))
+        
+        # The hydration streak depends on the stored goal, so recheck it once saved
+        future = submit_write(update_goals, self.calorie_goal, self.hydration_goal)
+        call_when_done(self.parent, future, lambda _: self.scheduler.mark_dirty(self.update_achievements),
+                       self.database_error("Error saving user goals to database."))
\ No newline at end of file
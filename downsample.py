@@ -0,0 +1,63 @@
+import numpy as np
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: pick threshold points that keep the series' shape
+
+    x must be increasing (numbers or datetime64); y numeric. The first and
+    last points are always kept. Returns (x, y) unchanged when there are
+    already threshold points or fewer.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    x, y = np.asarray(x), np.asarray(y)
+    # Work in float; datetime64 becomes its integer count of days (or seconds)
+    xf = (x.astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x).astype(np.float64)
+    yf = y.astype(np.float64)
+
+    # threshold - 2 buckets between the fixed first and last points
+    edges = np.floor(np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(xf[:n - 1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(yf[:n - 1], edges[:-1]) / counts
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        low, high = edges[i], edges[i + 1]
+        # The triangle's third corner is the next bucket's average (the last point for the last bucket)
+        if i + 1 < threshold - 2:
+            next_x, next_y = mean_x[i + 1], mean_y[i + 1]
+        else:
+            next_x, next_y = xf[n - 1], yf[n - 1]
+        area = np.abs((xf[a] - next_x) * (yf[low:high] - yf[a]) - (xf[a] - xf[low:high]) * (next_y - yf[a]))
+        a = low + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return x[selected], y[selected]
+
+
+def for_width(x, y, pixels, points_per_pixel=0.5):
+    """Downsample a series for an axis pixels wide
+
+    Markers a couple of pixels apart are already indistinguishable, so the
+    default keeps one point per two pixels.
+    """
+    return lttb(x, y, max(3, int(pixels * points_per_pixel)))
+
+
+if __name__ == "__main__":
+    # Sanity check: extremes survive and the size is bounded
+    rng = np.random.default_rng(1)
+    days = np.datetime64("2000-01-01") + np.arange(100000)
+    hours = rng.uniform(4, 10, len(days))
+    hours[54321] = 14
+    dx, dy = for_width(days, hours, 775)
+    assert len(dx) == 387 and dx[0] == days[0] and dx[-1] == days[-1]
+    assert 14 in dy and np.all(np.diff(dx.astype(np.int64)) > 0)
+    print(f"{len(days)} points -> {len(dx)}")
@@ -0,0 +1,192 @@
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+
+# Per-user export of everything TrackFit stores. Each table is read through a
+# cursor FETCH_SIZE rows at a time and every chunk is written out before the
+# next is fetched, so memory stays flat however much history a user has.
+
+FETCH_SIZE = 5000
+
+FORMATS = ["csv", "jsonl", "parquet"]
+COMPRESSIONS = ["none", "gzip", "zstd"]
+
+# gzip's default of 9 costs several times the CPU of 6 for a few percent smaller files
+GZIP_LEVEL = 6
+
+# Column types for Parquet; CSV and JSON Lines write the values as SQLite returns them
+TEXT, INTEGER, REAL = "string", "int64", "float64"
+
+# table -> (columns with types, query). Queries take :username, :start and
+# :end (YYYY-MM-DD, inclusive); tables without dates ignore the range. Rows
+# come out in (date, id) order from the (username, date) indexes.
+EXPORT_TABLES = {
+    "profile": (
+        [("name", TEXT), ("age", INTEGER), ("gender", TEXT), ("height", REAL), ("weight", REAL),
+         ("daily_workout_goal", INTEGER)],
+        "SELECT name, age, gender, height, weight, daily_workout_goal FROM profile WHERE username = :username",
+    ),
+    "meals": (
+        [("id", INTEGER), ("date", TEXT), ("meal_type", TEXT), ("food_name", TEXT), ("calories", REAL),
+         ("protein", REAL), ("carbs", REAL), ("fats", REAL)],
+        '''
+        SELECT id, date, meal_type, food_name, calories, protein, carbs, fats FROM meals
+        WHERE username = :username AND date BETWEEN :start AND :end ORDER BY date, id
+        ''',
+    ),
+    "hydration": (
+        [("id", INTEGER), ("date", TEXT), ("amount", REAL)],
+        '''
+        SELECT id, date, amount FROM hydration
+        WHERE username = :username AND date BETWEEN :start AND :end ORDER BY date, id
+        ''',
+    ),
+    # workouts.date is a timestamp; the range applies to its day
+    "workouts": (
+        [("id", INTEGER), ("date", TEXT), ("level", TEXT), ("duration", REAL), ("calories_burned", REAL),
+         ("completed", INTEGER)],
+        '''
+        SELECT id, date, level, duration, calories_burned, completed FROM workouts
+        WHERE username = :username AND date BETWEEN :start AND :end || ' 99' ORDER BY date, id
+        ''',
+    ),
+    "workout_exercises": (
+        [("workout_id", INTEGER), ("exercise_name", TEXT), ("sets", INTEGER), ("reps", INTEGER)],
+        '''
+        SELECT e.workout_id, e.exercise_name, e.sets, e.reps FROM workouts w
+        JOIN workout_exercises e ON e.workout_id = w.id
+        WHERE w.username = :username AND w.date BETWEEN :start AND :end || ' 99' ORDER BY w.date, w.id, e.id
+        ''',
+    ),
+    "workout_tracks": (
+        [("workout_id", INTEGER), ("sport", TEXT), ("distance_m", REAL), ("moving_seconds", REAL),
+         ("elapsed_seconds", REAL), ("elevation_gain_m", REAL), ("points", INTEGER), ("polyline", TEXT)],
+        '''
+        SELECT t.workout_id, t.sport, t.distance_m, t.moving_seconds, t.elapsed_seconds, t.elevation_gain_m,
+               t.points, t.polyline FROM workouts w
+        JOIN workout_tracks t ON t.workout_id = w.id
+        WHERE w.username = :username AND w.date BETWEEN :start AND :end || ' 99' ORDER BY w.date, w.id
+        ''',
+    ),
+    "sleep": (
+        [("id", INTEGER), ("date", TEXT), ("hours", REAL), ("quality", TEXT), ("notes", TEXT)],
+        '''
+        SELECT id, date, hours, quality, notes FROM sleep
+        WHERE username = :username AND date BETWEEN :start AND :end ORDER BY date, id
+        ''',
+    ),
+}
+
+# Open-ended ranges still compare as dates
+FIRST_DATE, LAST_DATE = "0000-00-00", "9999-99-99"
+
+
+def fetch_chunks(conn, sql, params, size=FETCH_SIZE):
+    """Yield lists of at most size rows from a query"""
+    cursor = conn.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+
+def _open_text(path, compression):
+    if compression == "gzip":
+        return gzip.open(path, "wt", compresslevel=GZIP_LEVEL, encoding="utf-8", newline="")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd compression needs the zstandard package (pip install zstandard)") from None
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(open(path, "wb")),
+                                encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def write_csv(path, columns, chunks, compression):
+    with _open_text(path, compression) as out:
+        writer = csv.writer(out)
+        writer.writerow([name for name, _ in columns])
+        count = 0
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def write_jsonl(path, columns, chunks, compression):
+    names = [name for name, _ in columns]
+    with _open_text(path, compression) as out:
+        count = 0
+        for rows in chunks:
+            out.write("".join(json.dumps(dict(zip(names, row))) + "\n" for row in rows))
+            count += len(rows)
+    return count
+
+
+def write_parquet(path, columns, chunks, compression):
+    """One row group per fetched chunk, so only a chunk is ever held as Arrow arrays"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet export needs the pyarrow package (pip install pyarrow)") from None
+
+    schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in columns])
+    count = 0
+    with pq.ParquetWriter(path, schema, compression=None if compression == "none" else compression) as writer:
+        for rows in chunks:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            count += len(rows)
+        if count == 0:
+            writer.write_table(schema.empty_table())
+    return count
+
+
+WRITERS = {"csv": write_csv, "jsonl": write_jsonl, "parquet": write_parquet}
+
+
+def user_folder(username):
+    """Folder name for a user's export: the username made filesystem-safe plus a short hash of it
+
+    The hash keeps names that sanitize alike ("a b" and "a_b") apart.
+    """
+    if username in ("", ".", ".."):
+        raise ValueError(f"cannot export user {username!r}: not usable as a folder name")
+    safe_user = re.sub(r"[^\w.-]", "_", username)
+    digest = hashlib.blake2b(username.encode("utf-8"), digest_size=4).hexdigest()
+    return f"{safe_user}-{digest}"
+
+
+def export_path(directory, username, table, fmt, compression):
+    """Where a table's export goes: <directory>/<user folder>/<table>.<format>[.gz|.zst]"""
+    suffix = {"none": "", "gzip": ".gz", "zstd": ".zst"}[compression] if fmt != "parquet" else ""
+    return os.path.join(directory, user_folder(username), f"{table}.{fmt}{suffix}")
+
+
+def export_user(conn, username, directory, fmt="csv", compression="none", start=None, end=None,
+                tables=None):
+    """Export one user's tables; returns {table: rows written}
+
+    Parquet compresses inside the file, so compression selects its codec
+    instead of wrapping the file.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"unknown export format {fmt!r}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"unknown compression {compression!r}")
+
+    params = {"username": username, "start": start or FIRST_DATE, "end": end or LAST_DATE}
+    os.makedirs(os.path.dirname(export_path(directory, username, "x", fmt, compression)), exist_ok=True)
+    counts = {}
+    for table in tables or EXPORT_TABLES:
+        columns, sql = EXPORT_TABLES[table]
+        path = export_path(directory, username, table, fmt, compression)
+        counts[table] = WRITERS[fmt](path, columns, fetch_chunks(conn, sql, params), compression)
+    return counts
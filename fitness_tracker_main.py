@@ -1,15 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, font
-import sqlite3
-import os
-from profile_tab import ProfileTab
-from workout_tab import WorkoutTab
-from diet_tab import DietTab
-from sleep_tab import SleepTab
-from about_tab import AboutTab
+from migrations import migrate
+from lazy_loader import load_tab_class
+from tab_cache import TabCache
 
 class FitnessTrackerApp:
-    def __init__(self, root, username=None):
+    def __init__(self, root, username=None, max_cached_tabs=None):
         self.root = root
         self.root.title("TrackFit")
         self.root.geometry("900x700")
@@ -39,112 +35,17 @@ class FitnessTrackerApp:
         # Create navigation bar
         self.setup_navbar()
         
+        # Built tabs are kept alive and only re-query when the data changed;
+        # max_cached_tabs caps how many stay in memory (None keeps all five)
+        self.tab_cache = TabCache(self.content_frame, self.create_tab, self.bg_color, max_cached_tabs)
+        
         # Initialize content (default to Profile tab)
         self.current_tab = None
         self.show_tab("Profile")
         
     def initialize_database(self):
-        # Create database directory if it doesn't exist
-        if not os.path.exists('data'):
-            os.makedirs('data')
-            
-        # Connect to SQLite database
-        conn = sqlite3.connect('data/fitness_tracker.db')
-        cursor = conn.cursor()
-        
-        # Create necessary tables if they don't exist
-        
-        # Profile table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS profile (
-            id INTEGER PRIMARY KEY,
-            username TEXT,
-            name TEXT,
-            age INTEGER,
-            gender TEXT,
-            height REAL,
-            weight REAL,
-            daily_workout_goal INTEGER,
-            UNIQUE(username)
-        )
-        ''')
-        
-        # Workout table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS workouts (
-            id INTEGER PRIMARY KEY,
-            username TEXT,
-            date TEXT,
-            level TEXT,
-            duration INTEGER,
-            calories_burned INTEGER,
-            completed INTEGER
-        )
-        ''')
-        
-        # Workout exercises table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS workout_exercises (
-            id INTEGER PRIMARY KEY,
-            workout_id INTEGER,
-            exercise_name TEXT,
-            sets INTEGER,
-            reps INTEGER,
-            FOREIGN KEY (workout_id) REFERENCES workouts (id)
-        )
-        ''')
-        
-        # Diet table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS meals (
-            id INTEGER PRIMARY KEY,
-            username TEXT,
-            date TEXT,
-            meal_type TEXT,
-            food_name TEXT,
-            calories INTEGER,
-            protein REAL,
-            carbs REAL,
-            fats REAL
-        )
-        ''')
-        
-        # Hydration table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS hydration (
-            id INTEGER PRIMARY KEY,
-            username TEXT,
-            date TEXT,
-            amount INTEGER
-        )
-        ''')
-        
-        # # Sleep table
-        # cursor.execute('''
-        # CREATE TABLE IF NOT EXISTS sleep (
-        #     id INTEGER PRIMARY KEY,
-        #     username TEXT,
-        #     date TEXT,
-        #     hours REAL,
-        #     quality TEXT
-        # )
-        # ''')
-         # Sleep table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sleep (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT NOT NULL,
-            date TEXT NOT NULL,
-            hours REAL NOT NULL,
-            quality TEXT NOT NULL,
-            notes TEXT,
-            UNIQUE(username, date)
-        )
-        ''')
-        
-        # Commit changes and close connection
-        conn.commit()
-        conn.close()
+        # Bring the schema up to date (a no-op if the login screen already did)
+        migrate()
     
     def setup_fonts(self):
         # Define custom fonts
@@ -239,10 +140,6 @@ class FitnessTrackerApp:
         new_root.mainloop()
     
     def show_tab(self, tab_name):
-        # Clear current content
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
-        
         # Update button styles
         for tab, button in self.nav_buttons.items():
             if tab == tab_name:
@@ -250,17 +147,15 @@ class FitnessTrackerApp:
             else:
                 button.configure(bg=self.primary_color)
         
-        # Create new content based on selected tab
-        if tab_name == "Profile":
-            self.current_tab = ProfileTab(self.content_frame, self.bg_color, self.username)
-        elif tab_name == "Workout":
-            self.current_tab = WorkoutTab(self.content_frame, self.bg_color, self.username)
-        elif tab_name == "Diet":
-            self.current_tab = DietTab(self.content_frame, self.bg_color, self.username)
-        elif tab_name == "Sleep":
-            self.current_tab = SleepTab(self.content_frame, self.bg_color, self.username)
-        elif tab_name == "About":
-            self.current_tab = AboutTab(self.content_frame, self.bg_color)
+        # Show the cached tab, building it the first time it is opened
+        self.current_tab = self.tab_cache.show(tab_name)
+    
+    def create_tab(self, tab_name, host_frame):
+        # The tab module is imported on first use
+        tab_class = load_tab_class(tab_name)
+        if tab_name == "About":
+            return tab_class(host_frame, self.bg_color)
+        return tab_class(host_frame, self.bg_color, self.username)
     
 
 if __name__ == "__main__":
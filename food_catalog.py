@@ -0,0 +1,311 @@
+import argparse
+import csv
+import difflib
+import re
+import sys
+import time
+from database import DB_PATH
+
+# Foods offered by meal entry. Names are unique (case-insensitive), so
+# importing a newer catalog updates nutrients in place.
+FOODS_TABLE = '''
+CREATE TABLE IF NOT EXISTS foods (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    calories REAL NOT NULL DEFAULT 0,
+    protein REAL NOT NULL DEFAULT 0,
+    carbs REAL NOT NULL DEFAULT 0,
+    fats REAL NOT NULL DEFAULT 0,
+    source TEXT NOT NULL DEFAULT 'user'
+)
+'''
+
+# Word index over foods.name, with prefix indexes for search-as-you-type
+FOODS_FTS = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS foods_fts USING fts5(
+    name, content = 'foods', content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3'
+)
+'''
+
+# Distinct words of every food name, trigram-indexed for typo correction. A
+# few thousand words instead of 100k+ names keeps fuzzy lookups cheap.
+TERMS_TABLE = '''
+CREATE TABLE IF NOT EXISTS food_terms (
+    id INTEGER PRIMARY KEY,
+    term TEXT NOT NULL UNIQUE
+)
+'''
+TERMS_TRIGRAM = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS food_terms_trigram USING fts5(
+    term, content = 'food_terms', content_rowid = 'id', tokenize = 'trigram'
+)
+'''
+
+# The foods Quick Add has always offered
+COMMON_FOODS = [
+    {"name": "Chicken Breast (100g)", "calories": 165, "protein": 31, "carbs": 0, "fats": 3.6},
+    {"name": "Brown Rice (100g cooked)", "calories": 112, "protein": 2.6, "carbs": 23, "fats": 0.9},
+    {"name": "Egg (large)", "calories": 70, "protein": 6, "carbs": 0.6, "fats": 5},
+    {"name": "Banana (medium)", "calories": 105, "protein": 1.3, "carbs": 27, "fats": 0.4},
+    {"name": "Greek Yogurt (100g)", "calories": 59, "protein": 10, "carbs": 3.6, "fats": 0.4},
+    {"name": "Oatmeal (100g cooked)", "calories": 71, "protein": 2.5, "carbs": 12, "fats": 1.5},
+    {"name": "Salmon (100g)", "calories": 206, "protein": 22, "carbs": 0, "fats": 13},
+    {"name": "Apple (medium)", "calories": 95, "protein": 0.5, "carbs": 25, "fats": 0.3},
+    {"name": "Avocado (half)", "calories": 160, "protein": 2, "carbs": 8.5, "fats": 15},
+    {"name": "Whole Wheat Bread (slice)", "calories": 81, "protein": 4, "carbs": 13.8, "fats": 1.1}
+]
+
+# CSV headers accepted for each column (USDA exports and simple hand-made files)
+COLUMN_ALIASES = {
+    "name": ("name", "description", "food", "food_name"),
+    "calories": ("calories", "energy_kcal", "energy (kcal)", "kcal"),
+    "protein": ("protein", "protein_g", "protein (g)"),
+    "carbs": ("carbs", "carbohydrate", "carbohydrates", "carbohydrate_g", "carbohydrate, by difference (g)"),
+    "fats": ("fats", "fat", "total_fat", "fat_g", "total lipid (fat) (g)"),
+}
+
+FOOD_COLUMNS = ["name", "calories", "protein", "carbs", "fats"]
+
+UPSERT_FOOD = '''
+INSERT INTO foods (name, calories, protein, carbs, fats, source)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (name) DO UPDATE SET
+    calories = excluded.calories, protein = excluded.protein,
+    carbs = excluded.carbs, fats = excluded.fats, source = excluded.source
+'''
+
+# Foods whose whole name starts with the text, straight off the name index
+NAME_PREFIX_QUERY = '''
+SELECT id, name, calories, protein, carbs, fats FROM foods
+WHERE name >= ? AND name < ? ORDER BY name LIMIT ?
+'''
+
+# Word matches fetched before ranking; broad prefixes ("c") stop here
+SEARCH_CANDIDATES = 300
+# Below this many results, misspelled words are corrected and searched again
+FUZZY_MIN_RESULTS = 5
+# Corrections tried per misspelled word, and how close they must be
+FUZZY_TERMS = 3
+FUZZY_CUTOFF = 0.6
+FUZZY_MARGIN = 0.1
+
+
+def _sync_triggers(conn, index, table, column, key):
+    """Keep an external-content FTS5 index in step with its table"""
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO {index} (rowid, {column}) VALUES (NEW.{key}, NEW.{column});
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table} BEGIN
+        INSERT INTO {index} ({index}, rowid, {column}) VALUES ('delete', OLD.{key}, OLD.{column});
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF {column} ON {table} BEGIN
+        INSERT INTO {index} ({index}, rowid, {column}) VALUES ('delete', OLD.{key}, OLD.{column});
+        INSERT INTO {index} (rowid, {column}) VALUES (NEW.{key}, NEW.{column});
+    END
+    ''')
+
+
+def create_food_catalog(conn):
+    """Create the foods table, its search indexes and the triggers that sync them"""
+    conn.execute(FOODS_TABLE)
+    conn.execute(FOODS_FTS)
+    _sync_triggers(conn, "foods_fts", "foods", "name", "id")
+    conn.execute(TERMS_TABLE)
+    conn.execute(TERMS_TRIGRAM)
+    _sync_triggers(conn, "food_terms_trigram", "food_terms", "term", "id")
+
+
+def _vocab(conn):
+    """Name of this connection's view of the words in foods_fts (temp tables are per connection)"""
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.foods_vocab USING fts5vocab(main, foods_fts, 'row')")
+    return "temp.foods_vocab"
+
+
+def refresh_terms(conn):
+    """Add words of newly added foods to the typo-correction index"""
+    conn.execute(f"INSERT OR IGNORE INTO food_terms (term) SELECT term FROM {_vocab(conn)}")
+
+
+def seed_common_foods(conn):
+    conn.executemany(UPSERT_FOOD, ([food[column] for column in FOOD_COLUMNS] + ["builtin"]
+                                   for food in COMMON_FOODS))
+    refresh_terms(conn)
+
+
+def _number(value):
+    try:
+        return float(value) if value not in (None, "") else 0.0
+    except ValueError:
+        return 0.0
+
+
+def read_csv(path):
+    """Yield (name, calories, protein, carbs, fats) rows from a catalog CSV, one at a time"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        headers = [header.strip().lower() for header in next(reader)]
+        positions = {}
+        for column, aliases in COLUMN_ALIASES.items():
+            for alias in aliases:
+                if alias in headers:
+                    positions[column] = headers.index(alias)
+                    break
+        if "name" not in positions:
+            raise ValueError(f"{path}: no food name column (expected one of {COLUMN_ALIASES['name']})")
+
+        for row in reader:
+            name = row[positions["name"]].strip() if len(row) > positions["name"] else ""
+            if not name:
+                continue
+            yield (name, *(_number(row[positions[c]]) if c in positions and len(row) > positions[c] else 0.0
+                           for c in FOOD_COLUMNS[1:]))
+
+
+def import_csv(conn, path, source=None):
+    """Stream a catalog CSV into foods in the caller's transaction; returns rows read
+
+    Rows are fed straight from the reader to executemany, so memory stays flat
+    however large the file is.
+    """
+    source = source or path
+    count = 0
+
+    def rows():
+        nonlocal count
+        for row in read_csv(path):
+            count += 1
+            yield (*row, source)
+
+    conn.executemany(UPSERT_FOOD, rows())
+    refresh_terms(conn)
+    return count
+
+
+def _words(text):
+    return re.findall(r"\w+", text.lower())
+
+
+def _match_query(alternatives):
+    """[['chick'], ['bre', 'brie']] -> '("chick"*) AND ("bre"* OR "brie"*)'
+
+    Every typed word must prefix a word of the name; the last one is usually
+    still being typed, and earlier ones may be abbreviations.
+    """
+    return " AND ".join("(" + " OR ".join(f'"{word}"*' for word in words) + ")" for words in alternatives)
+
+
+def _corrections(conn, word):
+    """Known words that look like a misspelled word, closest first"""
+    trigrams = {word[i:i + 3] for i in range(len(word) - 2)}
+    if not trigrams:
+        return []
+    candidates = [term for (term,) in conn.execute('''
+    SELECT term FROM food_terms_trigram WHERE food_terms_trigram MATCH ? ORDER BY rank LIMIT 50
+    ''', (" OR ".join(f'"{t}"' for t in trigrams),))]
+    # Compare against the start of each word, since the word may still be being typed
+    scored = sorted(((difflib.SequenceMatcher(None, word, term[:len(word) + 1]).ratio(), term)
+                     for term in candidates), reverse=True)
+    if not scored:
+        return []
+    # Near-ties only: "salmn" should become salmon, not also salad and almond
+    cutoff = max(FUZZY_CUTOFF, scored[0][0] - FUZZY_MARGIN)
+    return [term for score, term in scored[:FUZZY_TERMS] if score >= cutoff]
+
+
+def _is_known(conn, word):
+    """Whether any word in the catalog starts with word"""
+    return conn.execute(f"SELECT 1 FROM {_vocab(conn)} WHERE term >= ? AND term < ? LIMIT 1",
+                        (word, word + "\U0010ffff")).fetchone() is not None
+
+
+def _find(conn, match, text, limit):
+    rows = conn.execute('''
+    SELECT f.id, f.name, f.calories, f.protein, f.carbs, f.fats
+    FROM (SELECT rowid FROM foods_fts WHERE foods_fts MATCH ? LIMIT ?) m
+    JOIN foods f ON f.id = m.rowid
+    ''', (match, SEARCH_CANDIDATES)).fetchall()
+
+    # Names that start with the text come straight off the name index, however broad it is
+    rows += conn.execute(NAME_PREFIX_QUERY, (text, text + "\U0010ffff", limit)).fetchall()
+
+    # Rank: whole-name prefix first, then shorter (more generic) names
+    needle = text.lower()
+    best = {}
+    for row in rows:
+        best[row[0]] = row
+    return sorted(best.values(), key=lambda row: (not row[1].lower().startswith(needle), len(row[1]), row[1]))[:limit]
+
+
+def search(conn, text, limit=20):
+    """Foods matching text as you type, best first: [dict(name, calories, protein, carbs, fats)]
+
+    Every word of the query must prefix a word of the name. When that finds
+    fewer than FUZZY_MIN_RESULTS foods, words the catalog doesn't know are
+    swapped for their closest known spellings (trigram lookup over the
+    catalog's distinct words), so "brocoli" still finds broccoli.
+    """
+    words = _words(text)
+    if not words:
+        return []
+    text = text.strip()
+
+    rows = _find(conn, _match_query([[word] for word in words]), text, limit)
+    if len(rows) < FUZZY_MIN_RESULTS:
+        alternatives = []
+        for word in words:
+            corrected = [] if _is_known(conn, word) else _corrections(conn, word)
+            alternatives.append([word] + corrected)
+        if any(len(words) > 1 for words in alternatives):
+            seen = {row[0] for row in rows}
+            rows += [row for row in _find(conn, _match_query(alternatives), text, limit)
+                     if row[0] not in seen][:limit - len(rows)]
+
+    return [dict(zip(FOOD_COLUMNS, row[1:])) for row in rows]
+
+
+def common_foods(conn):
+    """The built-in foods, in their original order"""
+    rows = conn.execute(f"SELECT {', '.join(FOOD_COLUMNS)} FROM foods WHERE source = 'builtin' ORDER BY id")
+    return [dict(zip(FOOD_COLUMNS, row)) for row in rows]
+
+
+def main(argv=None):
+    import database
+    from migrations import migrate
+
+    parser = argparse.ArgumentParser(description="Import or search the food catalog")
+    parser.add_argument("--db", default=DB_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    load = subparsers.add_parser("import", help="load foods from a CSV file (one transaction)")
+    load.add_argument("csv")
+    find = subparsers.add_parser("search", help="search the catalog")
+    find.add_argument("text")
+    find.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    database.configure(args.db)
+    migrate(run_backfills=False)
+    try:
+        if args.command == "import":
+            start = time.perf_counter()
+            with database.write_connection() as conn:
+                count = import_csv(conn, args.csv)
+            print(f"Imported {count} foods in {time.perf_counter() - start:.1f}s")
+        else:
+            with database.read_connection() as conn:
+                for food in search(conn, args.text, args.limit):
+                    print(f"{food['name']:<50} {food['calories']:>6.0f} kcal  "
+                          f"P {food['protein']:.1f}  C {food['carbs']:.1f}  F {food['fats']:.1f}")
+    finally:
+        database.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
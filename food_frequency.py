@@ -0,0 +1,271 @@
+import argparse
+import heapq
+import math
+import sqlite3
+import sys
+from datetime import date
+from database import DB_PATH
+from daily_summary import pending_backfill
+
+# Each user's most-logged foods, ranked by a decayed count: every meal adds
+# 2 ** (days since EPOCH / HALF_LIFE_DAYS), so a meal counts half as much as
+# one logged HALF_LIFE_DAYS later. Anchoring the weight to the meal's date
+# instead of "now" means scores never need re-decaying and a delete can
+# subtract exactly what the insert added. Scores are stored as log2 so they
+# cannot overflow however far the dates run.
+FREQUENCY_TABLE = '''
+CREATE TABLE IF NOT EXISTS food_frequency (
+    username TEXT NOT NULL,
+    food_name TEXT NOT NULL COLLATE NOCASE,
+    log_score REAL NOT NULL,
+    uses INTEGER NOT NULL,
+    last_date TEXT NOT NULL,
+    calories REAL NOT NULL DEFAULT 0,
+    protein REAL NOT NULL DEFAULT 0,
+    carbs REAL NOT NULL DEFAULT 0,
+    fats REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (username, food_name)
+) WITHOUT ROWID
+'''
+FREQUENCY_INDEX = "CREATE INDEX IF NOT EXISTS idx_food_frequency_rank ON food_frequency (username, log_score)"
+
+EPOCH = date(2020, 1, 1)
+HALF_LIFE_DAYS = 30
+
+# Folds the existing meals in after the migration, in id-range chunks
+FREQUENCY_BACKFILL = "food_frequency"
+
+# Foods kept per user. A food pushed out starts from zero if it is logged again.
+TOP_K = 50
+
+FOOD_COLUMNS = ["name", "calories", "protein", "carbs", "fats"]
+
+TOP_FOODS_QUERY = '''
+SELECT food_name, calories, protein, carbs, fats FROM food_frequency
+WHERE username = ? ORDER BY log_score DESC LIMIT ?
+'''
+
+
+def weight(day):
+    """log2 of one meal's contribution on day (a 'YYYY-MM-DD' string)"""
+    return (date.fromisoformat(day) - EPOCH).days / HALF_LIFE_DAYS
+
+
+def _log2_add(a, b):
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def _log2_subtract(a, b):
+    return a + math.log2(max(1 - 2 ** (b - a), 2 ** -50))
+
+
+def create_food_frequency(conn):
+    conn.execute(FREQUENCY_TABLE)
+    conn.execute(FREQUENCY_INDEX)
+
+
+def _prune(conn, username):
+    """Drop the user's foods below the top TOP_K"""
+    conn.execute('''
+    DELETE FROM food_frequency WHERE username = ? AND food_name IN (
+        SELECT food_name FROM food_frequency WHERE username = ?
+        ORDER BY log_score DESC LIMIT -1 OFFSET ?)
+    ''', (username, username, TOP_K))
+
+
+def _merge(conn, username, food_name, log_score, uses, day, calories, protein, carbs, fats):
+    """Add uses meals worth log_score, the newest logged on day; returns True if the food was new"""
+    row = conn.execute("SELECT log_score, last_date FROM food_frequency WHERE username = ? AND food_name = ?",
+                       (username, food_name)).fetchone()
+    if row is None:
+        conn.execute('''
+        INSERT INTO food_frequency (username, food_name, log_score, uses, last_date, calories, protein, carbs, fats)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (username, food_name, log_score, uses, day, calories, protein, carbs, fats))
+        return True
+
+    stored_score, last_date = row
+    conn.execute("UPDATE food_frequency SET log_score = ?, uses = uses + ? WHERE username = ? AND food_name = ?",
+                 (_log2_add(stored_score, log_score), uses, username, food_name))
+    # The macros offered are the ones from the most recent meal of that food
+    if day >= last_date:
+        conn.execute('''
+        UPDATE food_frequency SET last_date = ?, calories = ?, protein = ?, carbs = ?, fats = ?
+        WHERE username = ? AND food_name = ?
+        ''', (day, calories, protein, carbs, fats, username, food_name))
+    return False
+
+
+def record_meal(conn, username, day, food_name, calories, protein, carbs, fats):
+    """Count one logged meal; call in the same transaction as the INSERT INTO meals"""
+    if _merge(conn, username, food_name, weight(day), 1, day, calories, protein, carbs, fats):
+        _prune(conn, username)
+
+
+def add_meals(conn, low_id, high_id):
+    """Fold the meals with low_id < id <= high_id into the counts (the migration's backfill chunks)"""
+    foods = {}
+    for user, day, food_name, calories, protein, carbs, fats in conn.execute('''
+    SELECT username, date, food_name, calories, protein, carbs, fats FROM meals
+    WHERE id > ? AND id <= ? ORDER BY id
+    ''', (low_id, high_id)):
+        key = (user, food_name.casefold())
+        entry = foods.get(key)
+        if entry is None:
+            foods[key] = [weight(day), 1, day, calories, protein, carbs, fats, food_name]
+        else:
+            entry[0] = _log2_add(entry[0], weight(day))
+            entry[1] += 1
+            if day >= entry[2]:
+                entry[2:7] = [day, calories, protein, carbs, fats]
+
+    for (user, _), (log_score, uses, day, calories, protein, carbs, fats, food_name) in foods.items():
+        _merge(conn, user, food_name, log_score, uses, day, calories, protein, carbs, fats)
+    for user in {user for user, _ in foods}:
+        _prune(conn, user)
+
+
+def forget_meal(conn, meal_id):
+    """Take a meal back out of the counts; call before it is deleted from meals"""
+    if conn.execute(f"SELECT {pending_backfill(FREQUENCY_BACKFILL, '?')}", (meal_id, meal_id)).fetchone()[0]:
+        return  # the backfill has not counted it yet
+    meal = conn.execute("SELECT username, date, food_name FROM meals WHERE id = ?", (meal_id,)).fetchone()
+    if meal is None:
+        return
+    username, day, food_name = meal
+    row = conn.execute("SELECT log_score, uses, last_date FROM food_frequency WHERE username = ? AND food_name = ?",
+                       (username, food_name)).fetchone()
+    if row is None:
+        return  # already pushed out of the top K
+
+    log_score, uses, last_date = row
+    if uses <= 1:
+        conn.execute("DELETE FROM food_frequency WHERE username = ? AND food_name = ?", (username, food_name))
+        return
+    conn.execute("UPDATE food_frequency SET log_score = ?, uses = uses - 1 WHERE username = ? AND food_name = ?",
+                 (_log2_subtract(log_score, weight(day)), username, food_name))
+    if day == last_date:
+        # The newest meal may be going away; fall back to the newest one left
+        latest = conn.execute('''
+        SELECT date, calories, protein, carbs, fats FROM meals
+        WHERE username = ? AND food_name = ? COLLATE NOCASE AND id != ? ORDER BY date DESC, id DESC LIMIT 1
+        ''', (username, food_name, meal_id)).fetchone()
+        if latest is not None:
+            conn.execute('''
+            UPDATE food_frequency SET last_date = ?, calories = ?, protein = ?, carbs = ?, fats = ?
+            WHERE username = ? AND food_name = ?
+            ''', (*latest, username, food_name))
+
+
+def rebuild_food_frequency(conn, username=None):
+    """Recompute the top foods from meals, for one user or everyone
+
+    Streams the meals in (username, date) order, so only one user's foods
+    are held in memory at a time. A full rebuild also completes the initial
+    backfill; rebuild single users only once it has finished.
+    """
+    if username is None:
+        conn.execute("DELETE FROM food_frequency")
+        rows = conn.execute('''
+        SELECT username, date, food_name, calories, protein, carbs, fats FROM meals ORDER BY username, date, id
+        ''')
+    else:
+        conn.execute("DELETE FROM food_frequency WHERE username = ?", (username,))
+        rows = conn.execute('''
+        SELECT username, date, food_name, calories, protein, carbs, fats FROM meals
+        WHERE username = ? ORDER BY date, id
+        ''', (username,))
+
+    def flush(user, foods):
+        top = heapq.nlargest(TOP_K, foods.values(), key=lambda entry: entry[0])
+        conn.executemany('''
+        INSERT INTO food_frequency (username, food_name, log_score, uses, last_date, calories, protein, carbs, fats)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(user, entry[7], *entry[:7]) for entry in top])
+
+    current, foods = None, {}
+    for user, day, food_name, calories, protein, carbs, fats in rows:
+        if user != current:
+            if current is not None:
+                flush(current, foods)
+            current, foods = user, {}
+        # Names match case-insensitively, like the table's key
+        key = food_name.casefold()
+        entry = foods.get(key)
+        if entry is None:
+            foods[key] = [weight(day), 1, day, calories, protein, carbs, fats, food_name]
+        else:
+            entry[0] = _log2_add(entry[0], weight(day))
+            entry[1] += 1
+            entry[2:7] = [day, calories, protein, carbs, fats]
+    if current is not None:
+        flush(current, foods)
+    if username is None:
+        conn.execute('''
+        UPDATE schema_backfills SET last_id = target_id, completed_at = CURRENT_TIMESTAMP
+        WHERE name = ? AND completed_at IS NULL
+        ''', (FREQUENCY_BACKFILL,))
+
+
+def top_foods(conn, username, limit=TOP_K):
+    """The user's foods, most logged (recently) first, as food dicts"""
+    rows = conn.execute(TOP_FOODS_QUERY, (username, limit))
+    return [dict(zip(FOOD_COLUMNS, row)) for row in rows]
+
+
+def find_drift(conn, tolerance=1e-6):
+    """Compare the stored top foods with a fresh recompute; returns [(username, food, stored, expected)]
+
+    A food that was pushed out of a user's top K and logged again restarts
+    from zero, so a stored count below the recompute (or a stored food the
+    recompute ranks lower) is expected; only counts above it are reported.
+    """
+    query = "SELECT username, food_name, log_score, uses FROM food_frequency"
+    stored = {(row[0], row[1].casefold()): row[2:] for row in conn.execute(query)}
+
+    # Recompute inside a savepoint and roll it back, leaving the table untouched
+    conn.execute("SAVEPOINT drift_check")
+    try:
+        rebuild_food_frequency(conn)
+        expected = {(row[0], row[1].casefold()): row[2:] for row in conn.execute(query)}
+    finally:
+        conn.execute("ROLLBACK TO drift_check")
+        conn.execute("RELEASE drift_check")
+
+    drift = []
+    for key, have in stored.items():
+        want = expected.get(key)
+        if want is not None and (have[1] > want[1] or have[0] - want[0] > tolerance * max(1.0, abs(want[0]))):
+            drift.append((*key, have, want))
+    return drift
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check or rebuild the per-user frequent foods")
+    parser.add_argument("db", nargs="?", default=DB_PATH)
+    parser.add_argument("--rebuild", action="store_true", help="recompute the frequent foods from scratch")
+    parser.add_argument("--user", help="list this user's frequent foods")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.rebuild:
+            with conn:
+                rebuild_food_frequency(conn)
+        if args.user:
+            for food in top_foods(conn, args.user, 20):
+                print(f"{food['name']:<40} {food['calories']:>6.0f} kcal")
+        drift = find_drift(conn)
+    finally:
+        conn.close()
+
+    for username, food_name, stored, expected in drift[:20]:
+        print(f"{username} {food_name}: stored {stored}, expected {expected}")
+    if not drift:
+        print("food_frequency matches the meals table")
+    return 1 if drift else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,438 @@
+import codecs
+import datetime
+import json
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+# Imports sleep, workouts and water from an Apple Health export (export.xml,
+# or the export.zip around it) or a Google Takeout Fit folder/zip. Files are
+# parsed incrementally: the XML with iterparse, clearing every element once
+# handled, and Google's large data point files by decoding one array element
+# at a time. Sleep is held per night only until the export has moved
+# SLEEP_SETTLE_DAYS past it, so memory does not grow with the file size.
+
+# Rows per write transaction
+BATCH_ROWS = 20000
+
+# Report progress every this many parsed records
+PROGRESS_EVERY = 50000
+
+# A night is written once a sleep interval this many days later has been read.
+# Exports list sleep in time order per source; an interval arriving for a
+# night already written is skipped like any other duplicate.
+SLEEP_SETTLE_DAYS = 2
+
+# Nights are rated from their length, as the exports carry no quality score
+QUALITY_HOURS = [(7, "Good"), (6, "Average"), (0, "Poor")]
+
+APPLE_SLEEP = "HKCategoryTypeIdentifierSleepAnalysis"
+APPLE_WATER = "HKQuantityTypeIdentifierDietaryWater"
+APPLE_ENERGY = "HKQuantityTypeIdentifierActiveEnergyBurned"
+APPLE_IN_BED = "HKCategoryValueSleepAnalysisInBed"
+APPLE_AWAKE = "HKCategoryValueSleepAnalysisAwake"
+
+# Water units Apple Health uses -> millilitres
+WATER_ML = {"mL": 1, "ml": 1, "L": 1000, "l": 1000, "fl_oz_us": 29.5735, "fl_oz_imp": 28.4131, "cup_us": 236.588}
+
+GOOGLE_SLEEP_ACTIVITIES = {"sleep", "72"}
+GOOGLE_CALORIES = "com.google.calories.expended"
+GOOGLE_HYDRATION = "com.google.hydration"
+
+# Rows already stored under the same natural key are left alone: sleep by
+# (username, date), workouts by (username, start time), water by
+# (username, recorded_at).
+INSERT_SQL = {
+    "sleep": '''
+    INSERT INTO sleep (username, date, hours, quality, notes) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (username, date) DO NOTHING
+    ''',
+    "workouts": '''
+    INSERT INTO workouts (username, date, day, level, duration, calories_burned, completed)
+    SELECT ?1, ?2, substr(?2, 1, 10), ?3, ?4, ?5, 1
+    WHERE NOT EXISTS (SELECT 1 FROM workouts WHERE username = ?1 AND date = ?2)
+    ''',
+    "hydration": '''
+    INSERT INTO hydration (username, date, amount, recorded_at) VALUES (?, ?, ?, ?)
+    ON CONFLICT (username, recorded_at) WHERE recorded_at IS NOT NULL DO NOTHING
+    ''',
+}
+
+
+def _quality(hours):
+    for minimum, quality in QUALITY_HOURS:
+        if hours >= minimum:
+            return quality
+    return QUALITY_HOURS[-1][1]
+
+
+class Progress:
+    """Counts bytes read from a stream for progress reports"""
+
+    def __init__(self, stream, total):
+        self.stream = stream
+        self.total = total
+        self.done = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.done += len(data)
+        return data
+
+    def fraction(self):
+        return self.done / self.total if self.total else 0.0
+
+
+class Nights:
+    """Sleep intervals grouped by night, merged so overlapping sources count once
+
+    A night belongs to the day it ends on. Asleep segments are used when a
+    night has any; otherwise its in-bed time is.
+    """
+
+    def __init__(self):
+        self.asleep = {}
+        self.in_bed = {}
+
+    def add(self, start, end, in_bed=False):
+        if end <= start:
+            return
+        nights = self.in_bed if in_bed else self.asleep
+        nights.setdefault(end.date().isoformat(), []).append((start, end))
+
+    def rows(self, username, source, before=None):
+        """Yield and forget the nights ending before the given YYYY-MM-DD (all of them by default)"""
+        for day in sorted(self.asleep.keys() | self.in_bed.keys()):
+            if before is not None and day >= before:
+                break
+            intervals = sorted(self.asleep.pop(day, None) or self.in_bed[day])
+            self.in_bed.pop(day, None)
+            seconds = 0.0
+            current_start, current_end = intervals[0]
+            for start, end in intervals[1:]:
+                if start > current_end:
+                    seconds += (current_end - current_start).total_seconds()
+                    current_start, current_end = start, end
+                else:
+                    current_end = max(current_end, end)
+            seconds += (current_end - current_start).total_seconds()
+            hours = round(seconds / 3600, 2)
+            yield (username, day, hours, _quality(hours), f"Imported from {source}")
+
+
+class Importer:
+    """Buffers rows per table and writes them BATCH_ROWS at a time"""
+
+    def __init__(self, write, username, progress=None):
+        # write(sql, rows) runs one transaction and returns the rows inserted
+        self.write = write
+        self.username = username
+        self.progress = progress
+        self.pending = {table: [] for table in INSERT_SQL}
+        self.parsed = 0
+        self.inserted = {table: 0 for table in INSERT_SQL}
+        self.skipped = {table: 0 for table in INSERT_SQL}
+        self.nights = Nights()
+
+    def add(self, table, row):
+        rows = self.pending[table]
+        rows.append(row)
+        if len(rows) >= BATCH_ROWS:
+            self.flush(table)
+
+    def counted(self, reader):
+        """Call once per parsed record; reports progress every PROGRESS_EVERY"""
+        self.parsed += 1
+        if self.progress and self.parsed % PROGRESS_EVERY == 0:
+            self.progress(self, reader)
+
+    def flush(self, table):
+        rows = self.pending[table]
+        if rows:
+            inserted = self.write(INSERT_SQL[table], rows)
+            self.inserted[table] += inserted
+            self.skipped[table] += len(rows) - inserted
+            self.pending[table] = []
+
+    def sleep(self, start, end, source, in_bed=False):
+        """Add a sleep interval; nights SLEEP_SETTLE_DAYS behind it are written out"""
+        self.nights.add(start, end, in_bed)
+        settled = (end.date() - datetime.timedelta(days=SLEEP_SETTLE_DAYS)).isoformat()
+        for row in self.nights.rows(self.username, source, before=settled):
+            self.add("sleep", row)
+
+    def finish(self, source):
+        for row in self.nights.rows(self.username, source):
+            self.add("sleep", row)
+        for table in INSERT_SQL:
+            self.flush(table)
+
+
+# ---------------------------------------------------------------------------
+# Apple Health
+# ---------------------------------------------------------------------------
+
+def _apple_time(text):
+    """'2024-01-05 23:10:00 -0800' -> naive local datetime (the offset is the phone's own)"""
+    return datetime.datetime.strptime(text[:19], "%Y-%m-%d %H:%M:%S")
+
+
+def _apple_activity(kind):
+    """'HKWorkoutActivityTypeTraditionalStrengthTraining' -> 'Traditional Strength Training'"""
+    name = kind.replace("HKWorkoutActivityType", "")
+    return "".join(f" {c}" if c.isupper() and i else c for i, c in enumerate(name)) or "Workout"
+
+
+def _apple_minutes(value, unit):
+    minutes = float(value)
+    return minutes * 60 if unit == "hr" else minutes / 60 if unit == "s" else minutes
+
+
+def _apple_workout(elem):
+    calories = elem.get("totalEnergyBurned")
+    unit = elem.get("totalEnergyBurnedUnit", "kcal")
+    if calories is None:
+        # Newer exports keep the totals in child statistics elements
+        for stat in elem.iter("WorkoutStatistics"):
+            if stat.get("type") == APPLE_ENERGY:
+                calories, unit = stat.get("sum"), stat.get("unit", "kcal")
+    calories = float(calories or 0)
+    if unit == "kJ":
+        calories /= 4.184
+
+    start = _apple_time(elem.get("startDate"))
+    if elem.get("duration"):
+        minutes = _apple_minutes(elem.get("duration"), elem.get("durationUnit", "min"))
+    else:
+        minutes = (_apple_time(elem.get("endDate")) - start).total_seconds() / 60
+    return (start.strftime("%Y-%m-%d %H:%M:%S"), _apple_activity(elem.get("workoutActivityType", "")),
+            round(minutes, 2), round(calories, 1))
+
+
+def import_apple(importer, stream):
+    """Stream Apple Health export.xml records into the importer"""
+    username = importer.username
+    depth = 0
+    root = None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 1:
+            continue  # only whole top-level records are handled
+
+        if elem.tag == "Record":
+            kind = elem.get("type")
+            if kind == APPLE_SLEEP:
+                value = elem.get("value", "")
+                if value != APPLE_AWAKE:
+                    importer.sleep(_apple_time(elem.get("startDate")), _apple_time(elem.get("endDate")),
+                                   "Apple Health", in_bed=value == APPLE_IN_BED)
+            elif kind == APPLE_WATER:
+                amount = float(elem.get("value", 0)) * WATER_ML.get(elem.get("unit", "mL"), 1)
+                recorded_at = _apple_time(elem.get("startDate")).strftime("%Y-%m-%d %H:%M:%S")
+                importer.add("hydration", (username, recorded_at[:10], round(amount), recorded_at))
+        elif elem.tag == "Workout":
+            importer.add("workouts", (username, *_apple_workout(elem)))
+
+        # ExportDate, Me and the like are metadata, not records
+        if elem.tag in ("Record", "Workout"):
+            importer.counted(stream)
+        # Drop the handled record (and its children) from the tree
+        root.clear()
+    importer.finish("Apple Health")
+
+
+# ---------------------------------------------------------------------------
+# Google Fit (Takeout)
+# ---------------------------------------------------------------------------
+
+def _google_time(text):
+    """ISO time in UTC ('2024-01-05T23:10:00.000Z') -> naive local datetime"""
+    moment = datetime.datetime.fromisoformat(text.replace("Z", "+00:00"))
+    return moment.astimezone().replace(tzinfo=None)
+
+
+def _nanos_time(nanos):
+    return datetime.datetime.fromtimestamp(int(nanos) / 1e9)
+
+
+# What may still follow a number that ends at the end of the buffer: more digits, a fraction or an exponent
+NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+
+def iter_json_array(stream, key, chunk_size=1 << 16):
+    """Yield the elements of the array under "key" in a JSON object, one at a time
+
+    Only the current element and one read chunk are held in memory. Bytes
+    are decoded incrementally, so characters split across chunks survive.
+    """
+    decode = codecs.getincrementaldecoder("utf-8")().decode
+    eof = False
+
+    def read():
+        nonlocal eof
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        return decode(chunk, final=eof) if isinstance(chunk, bytes) else chunk
+
+    decoder = json.JSONDecoder()
+    marker = json.dumps(key)
+    buffer = read()
+    # Find '"key" : [', reading on while the marker or what follows it is cut off
+    while True:
+        at = buffer.find(marker)
+        if at < 0:
+            if eof:
+                return
+            buffer = buffer[-len(marker) + 1:] + read()
+            continue
+        rest = buffer[at + len(marker):].lstrip()
+        if rest.startswith(":") and rest[1:].lstrip():
+            if rest[1:].lstrip().startswith("["):
+                buffer = rest[1:].lstrip()[1:]
+                break
+            buffer = rest  # the key holds something else
+        elif rest and not rest.startswith(":"):
+            buffer = rest  # the marker was a string value, not the key
+        elif eof:
+            return
+        else:
+            buffer = buffer[at:] + read()
+
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,")
+        if buffer.startswith("]"):
+            return
+        try:
+            element, end = decoder.raw_decode(buffer)
+            # Whole only once a ',' or ']' follows: a number cut off at the buffer's end
+            # ('-25000000000' of '-25000000000.0') may continue in the next chunk
+            tail = buffer[end:].lstrip()
+            if tail.startswith((",", "]")):
+                complete = True
+            elif NUMBER_TAIL.fullmatch(tail) and not eof:
+                complete = False
+            elif tail:
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, end)
+            else:
+                complete = True  # end of file without the closing ']'
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            # The element continues past the buffer; read more
+            buffer += read()
+            continue
+        yield element
+        buffer = buffer[end:]
+
+
+def import_google_session(importer, session):
+    """One Takeout 'All Sessions' file: a sleep session or a workout"""
+    start = _google_time(session["startTime"])
+    end = _google_time(session["endTime"])
+    activity = str(session.get("fitnessActivity", ""))
+    if activity in GOOGLE_SLEEP_ACTIVITIES:
+        importer.sleep(start, end, "Google Fit")
+        return
+    calories = sum(float(metric.get("floatValue", 0)) for metric in session.get("aggregate", [])
+                   if metric.get("metricName") == GOOGLE_CALORIES)
+    minutes = float(str(session.get("duration", "0")).rstrip("s") or 0) / 60 or (end - start).total_seconds() / 60
+    importer.add("workouts", (importer.username, start.strftime("%Y-%m-%d %H:%M:%S"),
+                              activity.replace("_", " ").title() or "Workout", round(minutes, 2), round(calories, 1)))
+
+
+def import_google_water(importer, stream):
+    """A Takeout 'All Data' hydration file; values are litres"""
+    for point in iter_json_array(stream, "Data Points"):
+        if point.get("dataTypeName") == GOOGLE_HYDRATION:
+            litres = point["fitValue"][0]["value"]["fpVal"]
+            recorded_at = _nanos_time(point["startTimeNanos"]).strftime("%Y-%m-%d %H:%M:%S")
+            importer.add("hydration", (importer.username, recorded_at[:10], round(litres * 1000), recorded_at))
+        importer.counted(stream)
+
+
+def _google_kind(name):
+    """'session', 'water' or None for a path inside a Takeout Fit export"""
+    parts = name.replace("\\", "/").split("/")
+    if not name.endswith(".json"):
+        return None
+    if "All Sessions" in parts:
+        return "session"
+    if "All Data" in parts and "hydration" in parts[-1]:
+        return "water"
+    return None
+
+
+def import_google(importer, files):
+    """files: iterable of (name, size, opener) for every file of the export"""
+    for name, size, opener in files:
+        kind = _google_kind(name)
+        if kind is None:
+            continue
+        with opener() as raw:
+            stream = Progress(raw, size)
+            if kind == "session":
+                import_google_session(importer, json.load(stream))
+                importer.counted(stream)
+            else:
+                import_google_water(importer, stream)
+    importer.finish("Google Fit")
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+def _zip_files(archive):
+    for info in archive.infolist():
+        if not info.is_dir():
+            yield info.filename, info.file_size, lambda info=info: archive.open(info)
+
+
+def _folder_files(folder):
+    for directory, _, names in os.walk(folder):
+        for name in sorted(names):
+            path = os.path.join(directory, name)
+            yield path, os.path.getsize(path), lambda path=path: open(path, "rb")
+
+
+def import_health(write, username, path, progress=None):
+    """Import an Apple Health or Google Takeout export for username; returns the Importer
+
+    write(sql, rows) must insert rows in one transaction and return how many
+    were inserted. progress(importer, reader), if given, is called every
+    PROGRESS_EVERY records. Raises ValueError for a file that is not an
+    export.
+    """
+    importer = Importer(write, username, progress)
+    try:
+        _import_path(importer, path)
+    except (ET.ParseError, KeyError, IndexError, TypeError) as e:
+        # Batches already written stay; importing the file again skips them
+        raise ValueError(f"{path}: not a readable health export ({e!r})") from None
+    return importer
+
+
+def _import_path(importer, path):
+    if os.path.isdir(path):
+        import_google(importer, _folder_files(path))
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            apple = [info for info in archive.infolist() if info.filename.endswith("export.xml")]
+            if apple:
+                with archive.open(apple[0]) as raw:
+                    import_apple(importer, Progress(raw, apple[0].file_size))
+            else:
+                import_google(importer, _zip_files(archive))
+    elif path.endswith(".json"):
+        import_google(importer, [(path, os.path.getsize(path), lambda: open(path, "rb"))])
+    else:
+        with open(path, "rb") as raw:
+            import_apple(importer, Progress(raw, os.path.getsize(path)))
@@ -0,0 +1,42 @@
+class KeysetSource:
+    """Pages through one user's rows of a table, newest first, keyed on (date, id)
+
+    Neighbouring pages are fetched with keyset conditions on the (username,
+    date) index, so scrolling costs the same at any depth; OFFSET is only used
+    when the scrollbar jumps straight to a position.
+    """
+
+    def __init__(self, table, columns, username):
+        self.username = username
+        # The key columns ride along at the end of every row
+        select = f"SELECT {columns}, date, id FROM {table} WHERE username = ?"
+        self.count_query = f"SELECT COUNT(*) FROM {table} WHERE username = ?"
+        self.page_at_query = f"{select} ORDER BY date DESC, id DESC LIMIT ? OFFSET ?"
+        self.page_after_query = f"{select} AND (date, id) < (?, ?) ORDER BY date DESC, id DESC LIMIT ?"
+        self.page_before_query = f"{select} AND (date, id) > (?, ?) ORDER BY date ASC, id ASC LIMIT ?"
+
+    def count(self, conn):
+        return conn.execute(self.count_query, (self.username,)).fetchone()[0]
+
+    def page_at(self, conn, offset, limit):
+        return conn.execute(self.page_at_query, (self.username, limit, offset)).fetchall()
+
+    def page_after(self, conn, key, limit):
+        """Rows that follow key in newest-first order"""
+        return conn.execute(self.page_after_query, (self.username, *key, limit)).fetchall()
+
+    def page_before(self, conn, key, limit):
+        """Rows that precede key in newest-first order (returned newest first)"""
+        rows = conn.execute(self.page_before_query, (self.username, *key, limit)).fetchall()
+        rows.reverse()
+        return rows
+
+    def queries(self):
+        """{name: (sql, sample params)} for every query the source runs, for schema.py's plan check"""
+        key = ("2024-01-01", 1)
+        return {
+            "count": (self.count_query, (self.username,)),
+            "page_at": (self.page_at_query, (self.username, 50, 100)),
+            "page_after": (self.page_after_query, (self.username, *key, 50)),
+            "page_before": (self.page_before_query, (self.username, *key, 50)),
+        }
@@ -0,0 +1,47 @@
+import importlib
+import threading
+
+# Tab name -> (module, class). Tab modules pull in matplotlib, numpy, PIL and
+# tkcalendar, so they are only imported when the tab is first shown.
+TAB_CLASSES = {
+    "Profile": ("profile_tab", "ProfileTab"),
+    "Workout": ("workout_tab", "WorkoutTab"),
+    "Diet": ("diet_tab", "DietTab"),
+    "Sleep": ("sleep_tab", "SleepTab"),
+    "About": ("about_tab", "AboutTab"),
+}
+
+_preload_thread = None
+
+
+def load_tab_class(tab_name):
+    """Import the module for a tab on first use and return its class"""
+    module_name, class_name = TAB_CLASSES[tab_name]
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)
+
+
+def preload_tabs(tab_names=None):
+    """Import tab modules in order; errors are left for load_tab_class to report"""
+    for tab_name in tab_names or TAB_CLASSES:
+        module_name, _ = TAB_CLASSES[tab_name]
+        try:
+            importlib.import_module(module_name)
+        except Exception as e:
+            print(f"Preloading {module_name} failed: {e}")
+
+
+def preload_in_background(tab_names=None):
+    """Warm up the tab modules on a background thread (e.g. while the user logs in)
+
+    Only imports happen here, never widget creation, so Tk stays on the main
+    thread. If a tab is shown before its module finished loading, the import
+    lock makes the main thread wait for the in-flight import instead of
+    starting a second one.
+    """
+    global _preload_thread
+    if _preload_thread is None:
+        _preload_thread = threading.Thread(target=preload_tabs, args=(tab_names,),
+                                           name="trackfit-preload", daemon=True)
+        _preload_thread.start()
+    return _preload_thread
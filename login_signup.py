@@ -1,10 +1,14 @@
 import tkinter as tk
 from tkinter import ttk, font, messagebox
 import sqlite3
-import hashlib
-import os
 import re
 from functools import *
+import passwords
+import render_service
+from database import read_connection, submit_write
+from migrations import migrate
+from lazy_loader import preload_in_background
+from tk_async import call_when_done
 
 class AuthenticationSystem:
     def __init__(self, root, app_callback):
@@ -38,31 +42,16 @@ class AuthenticationSystem:
         
         # Start with login form
         self.show_login_form()
+        
+        # Import the tab modules (matplotlib, numpy, ...), calibrate the
+        # password hashing cost and start the chart renderer while the user types
+        preload_in_background()
+        passwords.warm_up()
+        render_service.warm_up()
     
     def initialize_auth_database(self):
-        # Create database directory if it doesn't exist
-        if not os.path.exists('data'):
-            os.makedirs('data')
-            
-        # Connect to SQLite database
-        conn = sqlite3.connect('data/fitness_tracker.db')
-        cursor = conn.cursor()
-        
-        # Create users table if it doesn't exist
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY,
-            username TEXT UNIQUE,
-            email TEXT UNIQUE,
-            password_hash TEXT,
-            salt TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-        
-        # Commit changes and close connection
-        conn.commit()
-        conn.close()
+        # Create or upgrade the schema once, before anything reads the users table
+        migrate()
     
     def show_login_form(self):
         # Clear current content
@@ -120,6 +109,10 @@ class AuthenticationSystem:
         )
         login_button.pack(pady=10)
         
+        # Shown while the password is being checked
+        self.action_button = login_button
+        self.progress_bar = ttk.Progressbar(button_frame, mode="indeterminate", length=200)
+        
         # Signup link
         signup_frame = tk.Frame(self.main_frame, bg=self.bg_color)
         signup_frame.pack(fill=tk.X, pady=10)
@@ -214,6 +207,10 @@ class AuthenticationSystem:
         )
         register_button.pack(pady=10)
         
+        # Shown while the password is being hashed
+        self.action_button = register_button
+        self.progress_bar = ttk.Progressbar(button_frame, mode="indeterminate", length=200)
+        
         # Login link
         login_frame = tk.Frame(self.main_frame, bg=self.bg_color)
         login_frame.pack(fill=tk.X, pady=10)
@@ -228,19 +225,19 @@ class AuthenticationSystem:
         login_link.pack(side=tk.LEFT, padx=5)
         login_link.bind("<Button-1>", lambda e: self.show_login_form())
     
-    def generate_salt(self):
-        """Generate a random salt for password hashing"""
-        return os.urandom(32).hex()
+    def start_progress(self):
+        """Show the progress bar and block resubmits while hashing runs"""
+        self.action_button.configure(state=tk.DISABLED)
+        self.progress_bar.pack(pady=(0, 10))
+        self.progress_bar.start(10)
     
-    def hash_password(self, password, salt):
-        """Hash password with the given salt"""
-        key = hashlib.pbkdf2_hmac(
-            'sha256',
-            password.encode('utf-8'),
-            salt.encode('utf-8'),
-            100000
-        )
-        return key.hex()
+    def stop_progress(self):
+        """Hide the progress bar (if the form is still showing)"""
+        if not self.progress_bar.winfo_exists():
+            return
+        self.progress_bar.stop()
+        self.progress_bar.pack_forget()
+        self.action_button.configure(state=tk.NORMAL)
     
     def validate_email(self, email):
         """Validate email format"""
@@ -271,34 +268,40 @@ class AuthenticationSystem:
             messagebox.showerror("Error", "Password must be at least 8 characters long")
             return
         
-        # Hash password with salt
-        salt = self.generate_salt()
-        password_hash = self.hash_password(password, salt)
-        
-        # Save user to database
-        try:
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
+        # Hash password with salt at this machine's calibrated cost (on the hashing thread)
+        def create_account():
+            salt = passwords.generate_salt()
+            iterations = passwords.current_iterations()
+            password_hash = passwords.hash_password(password, salt, iterations)
             
-            cursor.execute(
-                "INSERT INTO users (username, email, password_hash, salt) VALUES (?, ?, ?, ?)",
-                (username, email, password_hash, salt)
-            )
-            
-            conn.commit()
-            conn.close()
+            # Save user to database
+            def insert_user(conn):
+                conn.execute(
+                    "INSERT INTO users (username, email, password_hash, salt, iterations) VALUES (?, ?, ?, ?, ?)",
+                    (username, email, password_hash, salt, iterations)
+                )
             
+            submit_write(insert_user).result()
+        
+        def on_registered(_):
+            self.stop_progress()
             messagebox.showinfo("Success", "Account created successfully! You can now login.")
             self.show_login_form()
-            
-        except sqlite3.IntegrityError as e:
+        
+        self.start_progress()
+        call_when_done(self.root, passwords.submit(create_account), on_registered, self.show_register_error)
+    
+    def show_register_error(self, e):
+        """Report a failed registration"""
+        self.stop_progress()
+        if isinstance(e, sqlite3.IntegrityError):
             if "username" in str(e):
                 messagebox.showerror("Error", "Username already exists")
             elif "email" in str(e):
                 messagebox.showerror("Error", "Email already exists")
             else:
                 messagebox.showerror("Error", "An error occurred")
-        except Exception as e:
+        else:
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
     
     def login(self):
@@ -312,37 +315,72 @@ class AuthenticationSystem:
             return
         
         try:
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
-            
-            # Get user from database
-            cursor.execute(
-                "SELECT password_hash, salt FROM users WHERE username = ?",
-                (username,)
-            )
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            if not result:
+            with read_connection() as conn:
+                cursor = conn.cursor()
+                
+                # Get user from database
+                cursor.execute(
+                    "SELECT password_hash, salt, iterations FROM users WHERE username = ?",
+                    (username,)
+                )
+                
+                result = cursor.fetchone()
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+            return
+        
+        # Verify password on the hashing thread
+        def on_checked(outcome):
+            self.stop_progress()
+            valid, upgrade = outcome
+            if not valid:
                 messagebox.showerror("Error", "Invalid username or password")
                 return
             
-            stored_hash, salt = result
+            if upgrade:
+                self.store_rehash(username, *upgrade)
             
-            # Verify password
-            input_hash = self.hash_password(password, salt)
+            messagebox.showinfo("Success", "Login successful!")
             
-            if input_hash == stored_hash:
-                messagebox.showinfo("Success", "Login successful!")
-                
-                # Initialize main app
-                self.initialize_main_app(username)
-            else:
-                messagebox.showerror("Error", "Invalid username or password")
-                
-        except Exception as e:
+            # Initialize main app
+            self.initialize_main_app(username)
+        
+        def on_error(e):
+            self.stop_progress()
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        
+        self.start_progress()
+        call_when_done(self.root, passwords.submit(self.check_password, password, result), on_checked, on_error)
+    
+    def check_password(self, password, result):
+        """Verify a login (runs on the hashing thread); returns (valid, upgraded hash or None)"""
+        if not result:
+            # Hash anyway so an unknown username takes as long as a wrong password
+            passwords.hash_password(password, passwords.generate_salt(), passwords.current_iterations())
+            return False, None
+        
+        stored_hash, salt, iterations = result
+        if not passwords.verify_password(password, salt, stored_hash, iterations):
+            return False, None
+        if not passwords.needs_rehash(iterations):
+            return True, None
+        
+        # Older, cheaper hash: recompute at the calibrated cost while we have the password
+        new_salt = passwords.generate_salt()
+        new_iterations = passwords.current_iterations()
+        new_hash = passwords.hash_password(password, new_salt, new_iterations)
+        return True, (stored_hash, new_hash, new_salt, new_iterations)
+    
+    def store_rehash(self, username, old_hash, new_hash, salt, iterations):
+        """Replace a user's hash unless it changed since it was verified"""
+        def update_hash(conn):
+            conn.execute(
+                "UPDATE users SET password_hash = ?, salt = ?, iterations = ? WHERE username = ? AND password_hash = ?",
+                (new_hash, salt, iterations, username, old_hash)
+            )
+        
+        # The old hash still works, so a failure here is only logged
+        call_when_done(self.root, submit_write(update_hash))
     
     def initialize_main_app(self, username):
         """Initialize the main application after successful login"""
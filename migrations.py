@@ -0,0 +1,370 @@
+import atexit
+import threading
+from database import get_pool, write_connection, submit_write
+from schema import INDEXES
+from passwords import LEGACY_ITERATIONS
+from daily_summary import create_daily_summary, backfill_names, add_rows
+from sleep_accumulators import ACCUMULATOR_BACKFILL, create_sleep_accumulators, add_nights
+from food_catalog import create_food_catalog, seed_common_foods
+from food_frequency import FREQUENCY_BACKFILL, create_food_frequency, add_meals
+
+# Rows per backfill transaction; keeps each hold on the writer lock to a few milliseconds
+BACKFILL_CHUNK_SIZE = 2000
+
+# Ordered list of (version, name, function) applied by migrate()
+MIGRATIONS = []
+
+# Backfills by name: (table, function(conn, low_id, high_id))
+BACKFILLS = {}
+
+
+def migration(version, name):
+    """Register a schema migration; each one runs exactly once per database"""
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+def backfill(name, table):
+    """Register a chunked backfill over table, processed in id ranges"""
+    def register(fn):
+        BACKFILLS[name] = (table, fn)
+        return fn
+    return register
+
+
+def schedule_backfill(conn, name):
+    """Queue a registered backfill; only rows that exist now need processing"""
+    table, _ = BACKFILLS[name]
+    target_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+    conn.execute('''
+    INSERT OR IGNORE INTO schema_backfills (name, last_id, target_id)
+    VALUES (?, 0, ?)
+    ''', (name, target_id))
+
+
+# ---------------------------------------------------------------------------
+# Migrations
+# ---------------------------------------------------------------------------
+
+@migration(1, "base tables")
+def create_base_tables(conn):
+    cursor = conn.cursor()
+
+    # Users table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        username TEXT UNIQUE,
+        email TEXT UNIQUE,
+        password_hash TEXT,
+        salt TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # Profile table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS profile (
+        id INTEGER PRIMARY KEY,
+        username TEXT,
+        name TEXT,
+        age INTEGER,
+        gender TEXT,
+        height REAL,
+        weight REAL,
+        daily_workout_goal INTEGER,
+        UNIQUE(username)
+    )
+    ''')
+
+    # Workout table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS workouts (
+        id INTEGER PRIMARY KEY,
+        username TEXT,
+        date TEXT,
+        level TEXT,
+        duration INTEGER,
+        calories_burned INTEGER,
+        completed INTEGER
+    )
+    ''')
+
+    # Workout exercises table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS workout_exercises (
+        id INTEGER PRIMARY KEY,
+        workout_id INTEGER,
+        exercise_name TEXT,
+        sets INTEGER,
+        reps INTEGER,
+        FOREIGN KEY (workout_id) REFERENCES workouts (id)
+    )
+    ''')
+
+    # Diet table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS meals (
+        id INTEGER PRIMARY KEY,
+        username TEXT,
+        date TEXT,
+        meal_type TEXT,
+        food_name TEXT,
+        calories INTEGER,
+        protein REAL,
+        carbs REAL,
+        fats REAL
+    )
+    ''')
+
+    # Hydration table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS hydration (
+        id INTEGER PRIMARY KEY,
+        username TEXT,
+        date TEXT,
+        amount INTEGER
+    )
+    ''')
+
+    # Sleep table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sleep (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL,
+        date TEXT NOT NULL,
+        hours REAL NOT NULL,
+        quality TEXT NOT NULL,
+        notes TEXT,
+        UNIQUE(username, date)
+    )
+    ''')
+
+    # Diet goals table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS diet_goals (
+        id INTEGER PRIMARY KEY,
+        username TEXT UNIQUE,
+        calorie_goal INTEGER,
+        hydration_goal INTEGER,
+        protein_goal INTEGER,
+        carbs_goal INTEGER,
+        fats_goal INTEGER
+    )
+    ''')
+
+
+@migration(2, "username/date indexes")
+def create_indexes(conn):
+    for name, table, columns in INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+    # Refresh planner statistics for the new indexes (sampled, so it stays fast)
+    conn.execute("PRAGMA analysis_limit = 1000")
+    conn.execute("ANALYZE")
+
+
+@migration(3, "workouts.day column")
+def add_workout_day(conn):
+    # workouts.date holds a full timestamp; day is the plain YYYY-MM-DD used by every other table
+    conn.execute("ALTER TABLE workouts ADD COLUMN day TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_workouts_user_day ON workouts (username, day)")
+    schedule_backfill(conn, "workouts_day")
+
+
+@migration(4, "users.iterations column")
+def add_user_iterations(conn):
+    # Existing hashes were all made with the old fixed cost; login upgrades them
+    conn.execute(f"ALTER TABLE users ADD COLUMN iterations INTEGER NOT NULL DEFAULT {LEGACY_ITERATIONS}")
+
+
+@migration(5, "daily_summary rollup")
+def add_daily_summary(conn):
+    # Triggers cover every row written from now on; existing rows are folded in by the backfills
+    create_daily_summary(conn)
+    for name in backfill_names():
+        schedule_backfill(conn, name)
+
+
+@migration(6, "sleep accumulators")
+def add_sleep_accumulators(conn):
+    # Triggers keep new nights counted; existing ones are merged in by the backfill
+    create_sleep_accumulators(conn)
+    schedule_backfill(conn, ACCUMULATOR_BACKFILL)
+
+
+@migration(7, "food catalog")
+def add_food_catalog(conn):
+    # Starts with the foods Quick Add used to hard-code; larger catalogs come from food_catalog.py import
+    create_food_catalog(conn)
+    seed_common_foods(conn)
+
+
+@migration(8, "food frequency")
+def add_food_frequency(conn):
+    # Meals logged from now on are counted by nutrition.add_meal; existing ones by the backfill
+    create_food_frequency(conn)
+    schedule_backfill(conn, FREQUENCY_BACKFILL)
+
+
+@migration(9, "hydration.recorded_at column")
+def add_hydration_recorded_at(conn):
+    # Time a drink was taken, for entries imported from a health export; re-imports skip ones already stored.
+    # Entries made in the app leave it NULL and are not constrained.
+    conn.execute("ALTER TABLE hydration ADD COLUMN recorded_at TEXT")
+    conn.execute('''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_hydration_user_recorded ON hydration (username, recorded_at)
+    WHERE recorded_at IS NOT NULL
+    ''')
+
+
+@migration(10, "workout tracks")
+def add_workout_tracks(conn):
+    # Imported here: activity_import needs numpy, which the login screen does not load
+    from activity_import import create_workout_tracks
+    create_workout_tracks(conn)
+
+
+# ---------------------------------------------------------------------------
+# Backfills
+# ---------------------------------------------------------------------------
+
+@backfill("workouts_day", "workouts")
+def backfill_workout_day(conn, low_id, high_id):
+    conn.execute('''
+    UPDATE workouts SET day = substr(date, 1, 10)
+    WHERE id > ? AND id <= ? AND day IS NULL
+    ''', (low_id, high_id))
+
+
+def register_summary_backfills():
+    # One backfill per fact table, all handled by daily_summary.add_rows
+    for name, table in backfill_names().items():
+        backfill(name, table)(lambda conn, low_id, high_id, table=table: add_rows(conn, table, low_id, high_id))
+
+
+register_summary_backfills()
+backfill(ACCUMULATOR_BACKFILL, "sleep")(add_nights)
+backfill(FREQUENCY_BACKFILL, "meals")(add_meals)
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+_migrated_path = None
+_migrate_lock = threading.Lock()
+_backfill_thread = None
+_stop_backfills = threading.Event()
+
+
+def create_version_tables(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_backfills (
+        name TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL,
+        target_id INTEGER NOT NULL,
+        completed_at TIMESTAMP
+    )
+    ''')
+
+
+def apply_migrations(conn):
+    """Apply every migration newer than the database's schema_version"""
+    create_version_tables(conn)
+    current = conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+    applied = []
+    for version, name, fn in MIGRATIONS:
+        if version <= current:
+            continue
+        
+        # Each migration (DDL included) commits atomically with its version row
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        fn(conn)
+        conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+        conn.commit()
+        applied.append(version)
+    return applied
+
+
+def migrate(run_backfills=True):
+    """Bring the schema up to date once per process, then resume pending backfills"""
+    global _migrated_path
+    with _migrate_lock:
+        path = get_pool().path
+        if _migrated_path != path:
+            # Schema changes are quick DDL; the heavy lifting is left to the backfills
+            with write_connection() as conn:
+                apply_migrations(conn)
+            _migrated_path = path
+
+    if run_backfills:
+        start_backfills()
+
+
+def run_backfill_chunk(conn):
+    """Process one chunk of the oldest unfinished backfill; returns False when idle"""
+    row = conn.execute('''
+    SELECT name, last_id, target_id FROM schema_backfills
+    WHERE completed_at IS NULL ORDER BY rowid LIMIT 1
+    ''').fetchone()
+    if row is None:
+        return False
+
+    name, last_id, target_id = row
+    if name not in BACKFILLS:
+        # Registered by a newer version of the app; leave it for that version
+        return False
+
+    _, fn = BACKFILLS[name]
+    high_id = min(last_id + BACKFILL_CHUNK_SIZE, target_id)
+    fn(conn, last_id, high_id)
+
+    # Progress is saved in the same transaction as the chunk, so a restart resumes here
+    if high_id >= target_id:
+        conn.execute('''
+        UPDATE schema_backfills SET last_id = ?, completed_at = CURRENT_TIMESTAMP WHERE name = ?
+        ''', (high_id, name))
+    else:
+        conn.execute("UPDATE schema_backfills SET last_id = ? WHERE name = ?", (high_id, name))
+    return True
+
+
+def run_backfills():
+    """Run backfill chunks until none are left, yielding the writer between chunks"""
+    while not _stop_backfills.is_set():
+        if not submit_write(run_backfill_chunk).result():
+            break
+
+
+def start_backfills():
+    """Run pending backfills on a background thread so the UI stays responsive"""
+    global _backfill_thread
+    if _backfill_thread is not None and _backfill_thread.is_alive():
+        return
+    _stop_backfills.clear()
+    _backfill_thread = threading.Thread(target=run_backfills, name="trackfit-backfill", daemon=True)
+    _backfill_thread.start()
+
+
+def stop_backfills():
+    """Stop after the current chunk; the remaining work resumes on next start"""
+    _stop_backfills.set()
+    if _backfill_thread is not None:
+        _backfill_thread.join()
+
+
+# Registered after the database module's handler, so it runs first at exit
+atexit.register(stop_backfills)
@@ -0,0 +1,82 @@
+import food_frequency
+
+# Nutrition and hydration rules without any Tk. The day's rows and totals are
+# read with diet_queries.load_day; DietTab formats what these return.
+
+# Calories per gram of each macronutrient
+MACRO_CALORIES = {"protein": 4, "carbs": 4, "fats": 9}
+
+# Default daily protein recommendation in grams
+IDEAL_PROTEIN = 50
+
+
+def macro_calories(totals):
+    """[protein, carbs, fats] calories for a dict holding grams of each"""
+    return [totals[macro] * per_gram for macro, per_gram in MACRO_CALORIES.items()]
+
+
+def insights(totals, calorie_goal, average_calories, average_days):
+    """The Diet tab's nutritional analysis for one day's totals, as text"""
+    total_calories = totals['calories']
+    protein_cals, carbs_cals, fats_cals = macro_calories(totals)
+
+    text = "Nutritional Analysis:\n\n"
+
+    # Calorie insights
+    text += f"• Daily Calories: {total_calories} kcal"
+    if total_calories > calorie_goal:
+        text += f" (↑ {total_calories - calorie_goal} above goal)\n"
+    elif total_calories < calorie_goal:
+        text += f" (↓ {calorie_goal - total_calories} below goal)\n"
+    else:
+        text += " (exactly at goal)\n"
+    text += f"• {average_days}-Day Average: {average_calories:.0f} kcal\n\n"
+
+    # Macro breakdown
+    text += "Macronutrient Breakdown:\n"
+    if total_calories > 0:
+        text += f"• Protein: {totals['protein']:.1f}g ({(protein_cals/total_calories*100):.1f}%)\n"
+        text += f"• Carbs: {totals['carbs']:.1f}g ({(carbs_cals/total_calories*100):.1f}%)\n"
+        text += f"• Fats: {totals['fats']:.1f}g ({(fats_cals/total_calories*100):.1f}%)\n\n"
+    else:
+        text += "• No calorie data available\n\n"
+
+    # Recommendations
+    text += "Recommendations:\n"
+    if totals['protein'] < IDEAL_PROTEIN:
+        text += f"• Consider increasing protein intake (current: {totals['protein']:.1f}g)\n"
+
+    # Balance recommendation
+    if total_calories > 0:
+        if (protein_cals/total_calories*100) < 10:
+            text += "• Your protein intake seems low relative to total calories\n"
+        if (fats_cals/total_calories*100) > 40:
+            text += "• Your fat intake is high relative to total calories\n"
+        if (carbs_cals/total_calories*100) > 70:
+            text += "• Your carbohydrate intake is very high\n"
+    return text
+
+
+def add_meal(conn, username, date, meal_type, food_name, calories, protein, carbs, fats):
+    """Log a meal and count it towards the user's frequent foods; returns the meal id"""
+    cursor = conn.execute('''
+    INSERT INTO meals (username, date, meal_type, food_name, calories, protein, carbs, fats)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (username, date, meal_type, food_name, calories, protein, carbs, fats))
+    food_frequency.record_meal(conn, username, date, food_name, calories, protein, carbs, fats)
+    return cursor.lastrowid
+
+
+def delete_meals(conn, meal_ids):
+    """Delete meals by id, taking them out of the frequent foods first"""
+    for meal_id in meal_ids:
+        food_frequency.forget_meal(conn, meal_id)
+    conn.executemany('DELETE FROM meals WHERE id = ?', [(meal_id,) for meal_id in meal_ids])
+
+
+def add_water(conn, username, date, amount):
+    """Log a drink of amount ml"""
+    conn.execute('''
+    INSERT INTO hydration (username, date, amount)
+    VALUES (?, ?, ?)
+    ''', (username, date, amount))
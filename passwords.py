@@ -0,0 +1,93 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Cost every account created before per-user iterations existed
+LEGACY_ITERATIONS = 100000
+
+# Calibration never goes below the legacy cost and aims for this much CPU per hash
+MIN_ITERATIONS = 100000
+TARGET_SECONDS = 0.25
+CALIBRATION_ITERATIONS = 20000
+
+# Stored costs within this fraction of the calibrated cost are left alone, so
+# timing noise between runs doesn't rehash every account on every login
+REHASH_TOLERANCE = 0.9
+
+_iterations = None
+_calibrate_lock = threading.Lock()
+_executor = None
+
+
+def generate_salt():
+    """Generate a random salt for password hashing"""
+    return os.urandom(32).hex()
+
+
+def hash_password(password, salt, iterations):
+    """Hash password with the given salt and PBKDF2 cost"""
+    key = hashlib.pbkdf2_hmac(
+        'sha256',
+        password.encode('utf-8'),
+        salt.encode('utf-8'),
+        iterations
+    )
+    return key.hex()
+
+
+def verify_password(password, salt, stored_hash, iterations):
+    """Check a password against a stored hash in constant time"""
+    return hmac.compare_digest(hash_password(password, salt, iterations), stored_hash)
+
+
+def calibrate_iterations(target_seconds=TARGET_SECONDS):
+    """Iteration count that takes about target_seconds on this machine"""
+    start = time.perf_counter()
+    hash_password("calibration", "calibration", CALIBRATION_ITERATIONS)
+    elapsed = time.perf_counter() - start
+
+    iterations = int(CALIBRATION_ITERATIONS * target_seconds / max(elapsed, 1e-6))
+    # Round to a multiple of 10,000 so repeated runs settle on the same value
+    iterations = round(iterations, -4)
+    return max(iterations, MIN_ITERATIONS)
+
+
+def current_iterations():
+    """Calibrated cost for new hashes, measured once per process"""
+    global _iterations
+    with _calibrate_lock:
+        if _iterations is None:
+            _iterations = calibrate_iterations()
+        return _iterations
+
+
+def needs_rehash(iterations):
+    """Whether a hash stored with this cost should be upgraded"""
+    return iterations < current_iterations() * REHASH_TOLERANCE
+
+
+def submit(work, *args):
+    """Run hashing work off the Tk thread; returns a Future
+
+    hashlib releases the GIL while PBKDF2 runs, so a thread keeps the
+    window responsive without the startup cost of a process pool.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trackfit-hash")
+    return _executor.submit(work, *args)
+
+
+def warm_up():
+    """Calibrate in the background so the first login doesn't pay for it"""
+    return submit(current_iterations)
+
+
+if __name__ == "__main__":
+    iterations = current_iterations()
+    start = time.perf_counter()
+    hash_password("password", generate_salt(), iterations)
+    print(f"{iterations} iterations, {(time.perf_counter() - start) * 1000:.0f} ms per hash")
@@ -1,11 +1,14 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, font
-import sqlite3
 from PIL import Image, ImageTk
 import os
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from database import read_connection, submit_write
+from tk_async import call_when_done
+from refresh_scheduler import scheduler_for
+from chart_host import ChartHost
+from charts import BmiGauge
+import profiles
 
 class ProfileTab:
     def __init__(self, parent, bg_color, username):
@@ -107,6 +110,11 @@ class ProfileTab:
         # BMI gauge frame (will contain the matplotlib figure)
         self.bmi_frame = tk.Frame(self.display_frame, bg=self.bg_color)
         self.bmi_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+        
+        # One figure for the life of the tab; it stays hidden until there is a BMI to show
+        self.bmi_chart = ChartHost(self.bmi_frame, BmiGauge, figsize=(6, 3), bg=self.bg_color)
+        self.bmi_chart.pack(fill=tk.BOTH, expand=True)
+        self.bmi_chart.hide()
     
     def update_profile_display(self, profile_data):
         # Clear existing widgets
@@ -119,6 +127,7 @@ class ProfileTab:
                                       text="No profile saved yet. Please fill in your details.",
                                       font=self.normal_font, bg=self.bg_color)
             no_profile_label.pack(anchor="w", pady=10)
+            self.bmi_chart.hide()
             return
         
         # Profile frame with border
@@ -148,187 +157,55 @@ class ProfileTab:
         goal_label.pack(anchor="w", pady=2)
         
         # Calculate and display BMI
-        bmi = self.calculate_bmi(float(profile_data['weight']), float(profile_data['height']))
+        bmi = profiles.calculate_bmi(float(profile_data['weight']), float(profile_data['height']))
         bmi_label = tk.Label(profile_frame, 
-                           text=f"BMI: {bmi:.1f} - {self.get_bmi_category(bmi)}", 
-                           font=self.header_font, bg=self.bg_color, fg=self.get_bmi_color(bmi))
+                           text=f"BMI: {bmi:.1f} - {profiles.bmi_category(bmi)}", 
+                           font=self.header_font, bg=self.bg_color, fg=profiles.bmi_color(bmi))
         bmi_label.pack(anchor="w", pady=(10, 2))
         
         # Create BMI visualization
         self.create_bmi_gauge(bmi)
     
-    def calculate_bmi(self, weight, height):
-        # BMI = weight(kg) / height(m)²
-        height_m = height / 100  # Convert cm to m
-        return weight / (height_m * height_m)
-    
-    def get_bmi_category(self, bmi):
-        if bmi < 18.5:
-            return "    Underweight"
-        elif bmi < 25:
-            return "Normal weight"
-        elif bmi < 30:
-            return "Overweight"
-        else:
-            return "Obese"
-    
-    def get_bmi_color(self, bmi):
-        if bmi < 18.5:
-            return "#3498db"  # Blue for underweight
-        elif bmi < 25:
-            return "#2ecc71"  # Green for normal
-        elif bmi < 30:
-            return "#f39c12"  # Orange for overweight
-        else:
-            return "#e74c3c"  # Red for obese
-    
     def create_bmi_gauge(self, bmi):
-        # Clear existing widgets
-        for widget in self.bmi_frame.winfo_children():
-            widget.destroy()
-        
-        # Create matplotlib figure
-        fig, ax = plt.subplots(figsize=(6, 3), dpi=100)
-        
-        # BMI ranges
-        bmi_ranges = [
-            (0, 18.5, "#3498db", "    Underweight"),
-            (18.5, 25, "#2ecc71", "Normal"),
-            (25, 30, "#f39c12", "Overweight"),
-            (30, 40, "#e74c3c", "Obese")
-        ]
-        
-        # Create a horizontal BMI gauge
-        for start, end, color, label in bmi_ranges:
-            ax.barh(0, end-start, left=start, height=0.5, color=color, alpha=0.7)
-            
-            # Adjust position of "Underweight" text to move it slightly to the right
-            if label == "    Underweight":
-                # Move the text slightly to the right to avoid the 'w' being cut off
-                ax.text((start + end) / 2 + 6, 0, label, ha='right', va='center', color='white', fontweight='bold')
-            else:
-                ax.text((start + end) / 2, 0, label, ha='center', va='center', color='white', fontweight='bold')
-        
-        # Add a marker for the user's BMI
-        ax.plot(bmi, 0, 'ko', markersize=12)
-        ax.plot(bmi, 0, 'wo', markersize=8)
-        
-        # Add text indicating the exact BMI value
-        ax.text(bmi, 0.7, f'Your BMI: {bmi:.1f}', ha='center', fontweight='bold')
-        
-        # Set up the plot
-        ax.set_xlim(10, 40)
-        ax.set_ylim(-1, 1)
-        ax.set_title('BMI Chart')
-        ax.set_yticks([])
-        ax.spines['left'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.spines['top'].set_visible(False)
-        
-        # Embed the plot in the Tkinter frame
-        canvas = FigureCanvasTkAgg(fig, master=self.bmi_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        # Move the marker on the gauge built in create_display_area
+        self.bmi_chart.plot(bmi)
     
     def save_profile(self):
         # Validate form
         try:
-            name = self.entries["name"].get().strip()
-            age = int(self.entries["age"].get())
-            gender = self.entries["gender"].get()
-            height = float(self.entries["height"].get())
-            weight = float(self.entries["weight"].get())
-            daily_workout_goal = int(self.entries["daily_workout_goal"].get())
-            
-            if not name:
-                raise ValueError("Name cannot be empty")
-            
-            if age <= 0:
-                raise ValueError("Age must be positive")
-            
-            if not gender:
-                raise ValueError("Please select a gender")
-            
-            if height <= 0:
-                raise ValueError("Height must be positive")
-            
-            if weight <= 0:
-                raise ValueError("Weight must be positive")
-            
-            if daily_workout_goal < 0:
-                raise ValueError("Daily workout goal cannot be negative")
-            
+            profile = profiles.parse_profile({field: var.get() for field, var in self.entries.items()})
         except ValueError as e:
             messagebox.showerror("Input Error", str(e))
             return
         
         # Save to database
-        try:
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
-            
-            # Check if profile already exists for this username
-            cursor.execute("SELECT id FROM profile WHERE username=?", (self.username,))
-            profile_id = cursor.fetchone()
-            
-            if profile_id:
-                # Update existing profile
-                cursor.execute("""
-                UPDATE profile 
-                SET name=?, age=?, gender=?, height=?, weight=?, daily_workout_goal=?
-                WHERE username=?
-                """, (name, age, gender, height, weight, daily_workout_goal, self.username))
-            else:
-                # Insert new profile
-                cursor.execute("""
-                INSERT INTO profile (username, name, age, gender, height, weight, daily_workout_goal)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (self.username, name, age, gender, height, weight, daily_workout_goal))
-            
-            conn.commit()
-            conn.close()
-            
+        def upsert_profile(conn):
+            profiles.save_profile(conn, self.username, profile)
+        
+        def on_saved(_):
             messagebox.showinfo("Success", "Profile saved successfully!")
             
             # Update profile display
-            self.load_profile()
-            
-        except Exception as e:
+            self.refresh()
+        
+        def on_error(e):
             messagebox.showerror("Database Error", f"Could not save profile: {str(e)}")
+        
+        call_when_done(self.parent, submit_write(upsert_profile), on_saved, on_error)
+    
+    def refresh(self):
+        """Reload the profile when the tab is shown again after a write"""
+        scheduler_for(self.parent).mark_dirty(self.load_profile)
     
     def load_profile(self):
         try:
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-            SELECT name, age, gender, height, weight, daily_workout_goal
-            FROM profile
-            WHERE username=?
-            LIMIT 1
-            """, (self.username,))
+            with read_connection() as conn:
+                profile_dict = profiles.load_profile(conn, self.username)
             
-            profile_data = cursor.fetchone()
-            conn.close()
-            
-            if profile_data:
-                # Create dictionary from profile data
-                profile_dict = {
-                    "name": profile_data[0],
-                    "age": profile_data[1],
-                    "gender": profile_data[2],
-                    "height": profile_data[3],
-                    "weight": profile_data[4],
-                    "daily_workout_goal": profile_data[5]
-                }
-                
+            if profile_dict:
                 # Update form fields
-                self.entries["name"].set(profile_data[0])
-                self.entries["age"].set(str(profile_data[1]))
-                self.entries["gender"].set(profile_data[2])
-                self.entries["height"].set(str(profile_data[3]))
-                self.entries["weight"].set(str(profile_data[4]))
-                self.entries["daily_workout_goal"].set(str(profile_data[5]))
+                for field, var in self.entries.items():
+                    var.set(str(profile_dict[field]))
                 
                 # Update display
                 self.update_profile_display(profile_dict)
@@ -0,0 +1,82 @@
+# Profile rules without any Tk: BMI, input validation and storage. ProfileTab
+# only collects the form values and draws the results.
+
+PROFILE_FIELDS = ["name", "age", "gender", "height", "weight", "daily_workout_goal"]
+
+# (upper bound, category, colour) in increasing BMI order
+BMI_CATEGORIES = [
+    (18.5, "    Underweight", "#3498db"),  # Blue for underweight
+    (25, "Normal weight", "#2ecc71"),      # Green for normal
+    (30, "Overweight", "#f39c12"),         # Orange for overweight
+    (float("inf"), "Obese", "#e74c3c"),    # Red for obese
+]
+
+
+def calculate_bmi(weight, height):
+    """BMI = weight(kg) / height(m)²; height is in cm"""
+    height_m = height / 100
+    return weight / (height_m * height_m)
+
+
+def _bmi_category(bmi):
+    for upper, category, color in BMI_CATEGORIES:
+        if bmi < upper:
+            return category, color
+    return BMI_CATEGORIES[-1][1:]
+
+
+def bmi_category(bmi):
+    return _bmi_category(bmi)[0]
+
+
+def bmi_color(bmi):
+    return _bmi_category(bmi)[1]
+
+
+def parse_profile(values):
+    """Validate form values (strings) and return the typed profile dict
+
+    Raises ValueError with a message fit to show the user.
+    """
+    profile = {
+        "name": values["name"].strip(),
+        "age": int(values["age"]),
+        "gender": values["gender"],
+        "height": float(values["height"]),
+        "weight": float(values["weight"]),
+        "daily_workout_goal": int(values["daily_workout_goal"]),
+    }
+
+    if not profile["name"]:
+        raise ValueError("Name cannot be empty")
+    if profile["age"] <= 0:
+        raise ValueError("Age must be positive")
+    if not profile["gender"]:
+        raise ValueError("Please select a gender")
+    if profile["height"] <= 0:
+        raise ValueError("Height must be positive")
+    if profile["weight"] <= 0:
+        raise ValueError("Weight must be positive")
+    if profile["daily_workout_goal"] < 0:
+        raise ValueError("Daily workout goal cannot be negative")
+    return profile
+
+
+def load_profile(conn, username):
+    """The user's profile as a dict, or None if they have not saved one"""
+    row = conn.execute(f'''
+    SELECT {', '.join(PROFILE_FIELDS)} FROM profile WHERE username = ? LIMIT 1
+    ''', (username,)).fetchone()
+    return dict(zip(PROFILE_FIELDS, row)) if row else None
+
+
+def save_profile(conn, username, profile):
+    """Insert or update the user's profile (a dict from parse_profile)"""
+    values = [profile[field] for field in PROFILE_FIELDS]
+    updated = conn.execute(f'''
+    UPDATE profile SET {', '.join(f"{field} = ?" for field in PROFILE_FIELDS)} WHERE username = ?
+    ''', (*values, username)).rowcount
+    if not updated:
+        conn.execute(f'''
+        INSERT INTO profile (username, {', '.join(PROFILE_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (username, *values))
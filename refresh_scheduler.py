@@ -0,0 +1,69 @@
+import os
+
+# Set TRACKFIT_REFRESH_STATS=1 to print the counters after every flush
+LOG_STATS = os.environ.get("TRACKFIT_REFRESH_STATS") == "1"
+
+
+class RefreshScheduler:
+    """Coalesces view refreshes so each view re-renders at most once per idle cycle
+
+    Views are plain callables (usually bound methods such as
+    self.update_analytics). mark_dirty() queues a view and arranges a single
+    after_idle() flush; marking an already-queued view again is counted as
+    coalesced instead of rendering twice.
+    """
+
+    def __init__(self, widget):
+        self.widget = widget
+        # Dirty views in the order they were first marked (dict keeps insertion order)
+        self.pending = {}
+        self.flush_id = None
+
+        # Counters for spotting redundant refreshes
+        self.requested = 0
+        self.coalesced = 0
+        self.rendered = 0
+
+    def mark_dirty(self, *views):
+        """Queue views for the next idle flush"""
+        for view in views:
+            self.requested += 1
+            if view in self.pending:
+                self.coalesced += 1
+                continue
+            self.pending[view] = True
+
+        if self.pending and self.flush_id is None:
+            self.flush_id = self.widget.after_idle(self.flush)
+
+    def flush(self):
+        """Render every dirty view once"""
+        self.flush_id = None
+        pending, self.pending = self.pending, {}
+        for view in pending:
+            # A view may belong to a tab that was destroyed while queued
+            owner = getattr(view, "__self__", None)
+            parent = getattr(owner, "parent", None)
+            if parent is not None and not parent.winfo_exists():
+                continue
+            self.rendered += 1
+            try:
+                view()
+            except Exception as e:
+                print(f"Error refreshing {getattr(view, '__qualname__', view)}: {e}")
+
+        if LOG_STATS:
+            print(f"Refresh flush: {len(pending)} views; totals {self.stats()}")
+
+    def stats(self):
+        """Counters since the scheduler was created"""
+        return {"requested": self.requested, "coalesced": self.coalesced, "rendered": self.rendered}
+
+
+def scheduler_for(widget):
+    """The refresh scheduler shared by every view in widget's window"""
+    top = widget.winfo_toplevel()
+    scheduler = getattr(top, "refresh_scheduler", None)
+    if scheduler is None:
+        scheduler = top.refresh_scheduler = RefreshScheduler(top)
+    return scheduler
@@ -0,0 +1,147 @@
+import hashlib
+import multiprocessing
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Finished bitmaps kept in memory, least recently used dropped first
+CACHE_SIZE = 32
+
+_pool = None
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+# Worker side: one persistent chart per (chart, size, options), reused across renders
+_charts = {}
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def render_chart(chart_name, figsize, dpi, options, args):
+    """Draw a charts.py chart with Agg and return (width, height, RGBA bytes)
+
+    Runs in the worker process. The chart's artists are built on the first
+    request and updated in place afterwards, as ChartHost does in the GUI.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import charts
+
+    key = (chart_name, figsize, dpi, repr(options))
+    entry = _charts.get(key)
+    if entry is None:
+        figure = Figure(figsize=figsize, dpi=dpi)
+        canvas = FigureCanvasAgg(figure)
+        entry = _charts[key] = (canvas, getattr(charts, chart_name)(figure, **options))
+    canvas, chart = entry
+
+    chart.update(*args)
+    canvas.draw()
+    width, height = canvas.get_width_height()
+    return width, height, bytes(canvas.buffer_rgba())
+
+
+def content_key(chart_name, figsize, dpi, options, args):
+    """Hash of everything that affects the picture: chart, size and input series"""
+    payload = pickle.dumps((chart_name, tuple(figsize), dpi, options, args), protocol=4)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the parent has Tk and a thread pool that must not be copied
+        _pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                    initializer=_init_worker)
+    return _pool
+
+
+def render(chart_name, figsize, args, dpi=100, options=None):
+    """Render a chart off the Tk thread; returns a Future of (width, height, RGBA bytes)
+
+    Identical requests share one result: a cached bitmap comes back as an
+    already-finished Future, and a request that is still rendering is
+    joined instead of queued twice.
+    """
+    options = options or {}
+    key = content_key(chart_name, figsize, dpi, options, args)
+    with _lock:
+        future = _cache.get(key)
+        if future is not None:
+            _cache.move_to_end(key)
+            return future
+
+        future = _cache[key] = Future()
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    # Failed renders are not worth remembering
+    future.add_done_callback(lambda f: (f.cancelled() or f.exception() is not None) and _forget(key, f))
+    _run(future, (chart_name, tuple(figsize), dpi, options, args))
+    return future
+
+
+def _run(result, call, retries=1):
+    """Render call in the worker and pass its outcome on to the result Future
+
+    A worker that dies (a crash in a native library, the OOM killer) breaks
+    the whole pool; it is replaced with a fresh one and the render retried once.
+    """
+    with _lock:
+        pool = _get_pool()
+    try:
+        future = pool.submit(render_chart, *call)
+    except BrokenProcessPool as e:
+        # Broken by an earlier render; handled below like a failure of this one
+        future = Future()
+        future.set_exception(e)
+
+    def relay(f):
+        if result.done():
+            return
+        if f.cancelled():
+            result.cancel()
+        elif isinstance(f.exception(), BrokenProcessPool) and retries:
+            _replace_pool(pool)
+            _run(result, call, retries - 1)
+        elif f.exception() is not None:
+            result.set_exception(f.exception())
+        else:
+            result.set_result(f.result())
+
+    future.add_done_callback(relay)
+
+
+def _replace_pool(broken):
+    """Drop a broken pool so the next submit starts a new worker"""
+    global _pool
+    with _lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _forget(key, future):
+    with _lock:
+        if _cache.get(key) is future:
+            del _cache[key]
+
+
+def warm_up():
+    """Start the worker and import matplotlib there before the first chart is needed"""
+    with _lock:
+        return _get_pool().submit(_init_worker)
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        _cache.clear()
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
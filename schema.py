@@ -0,0 +1,109 @@
+import re
+import sys
+import sqlite3
+from database import DB_PATH
+
+# (index name, table, column list) for the (username, date) access paths.
+# Created by migration 2; later changes to the set belong in a new migration.
+INDEXES = [
+    ("idx_meals_user_date", "meals", "username, date"),
+    # amount is included so the daily SUM is answered from the index alone
+    ("idx_hydration_user_date", "hydration", "username, date, amount"),
+    ("idx_workouts_user_date", "workouts", "username, date"),
+    ("idx_workout_exercises_workout", "workout_exercises", "workout_id"),
+]
+
+
+def hot_queries():
+    """{name: (sql, sample params)} for the queries every tab runs on refresh; none may scan a whole table
+
+    The SQL is the app's own constants, so the check follows any change to
+    them. Imported here rather than at the top: migrations imports this
+    module for INDEXES, and sleep_stats would bring numpy into the login screen.
+    """
+    from daily_summary import RANGE_QUERY as SUMMARY_RANGE_QUERY
+    from diet_queries import DAY_SUMMARY_QUERY, DAY_WATER_QUERY
+    from food_catalog import NAME_PREFIX_QUERY
+    from food_frequency import TOP_FOODS_QUERY
+    from keyset import KeysetSource
+    from sleep_accumulators import RECENT_QUERY
+    from sleep_stats import RANGE_QUERY as SLEEP_RANGE_QUERY, DATE_SPAN_QUERY
+    import sleep_stats
+    import workouts
+    from streaks import STREAK_QUERY
+
+    queries = {
+        "load_day": (DAY_SUMMARY_QUERY, {"username": "user", "date": "2024-01-01"}),
+        "load_hydration": (DAY_WATER_QUERY, ("user", "2024-01-01")),
+        "daily_summary_range": (SUMMARY_RANGE_QUERY, ("user", "2024-01-01", "2024-01-31")),
+        "streaks": (STREAK_QUERY, {"username": "user"}),
+        "view_workout_details": (workouts.EXERCISES_QUERY, (1,)),
+        "create_workout_graph": (workouts.GRAPH_QUERY, ("user",)),
+        "sleep_zoom": (SLEEP_RANGE_QUERY, ("user", "2024-01-01", "2024-01-31")),
+        "sleep_date_span": (DATE_SPAN_QUERY, ("user",)),
+        "sleep_recent_nights": (RECENT_QUERY, ("user", 14)),
+        "food_name_prefix": (NAME_PREFIX_QUERY, ("chi", "chi\U0010ffff", 6)),
+        "quick_add_foods": (TOP_FOODS_QUERY, ("user", 50)),
+    }
+    # The history lists page through KeysetSource
+    for table, columns in (("workouts", workouts.HISTORY_COLUMNS), ("sleep", sleep_stats.HISTORY_COLUMNS)):
+        for name, query in KeysetSource(table, columns, "user").queries().items():
+            queries[f"{table}_history_{name}"] = query
+    return queries
+
+
+# A scan step of a plan: "SCAN meals", "SCAN TABLE meals", "SCAN m" (an alias)
+SCAN_PATTERN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+# Table references with an optional alias, to recognise scans reported under the alias
+TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+NOT_ALIASES = {"WHERE", "JOIN", "ON", "USING", "LEFT", "INNER", "CROSS", "NATURAL", "OUTER", "ORDER", "GROUP",
+               "LIMIT", "UNION", "HAVING", "WINDOW", "INDEXED", "NOT", "AS"}
+
+
+def scanned_names(sql, tables):
+    """Names a plan may use for the real tables of sql: the tables themselves plus their aliases"""
+    names = set(tables)
+    for table, alias in TABLE_PATTERN.findall(sql):
+        if table in tables and alias and alias.upper() not in NOT_ALIASES:
+            names.add(alias)
+    return names
+
+
+def query_plan(conn, sql, params):
+    """Return the EXPLAIN QUERY PLAN detail lines for a query"""
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def find_full_scans(conn, queries=None):
+    """Return {query name: plan line} for every hot query that scans a table"""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    full_scans = {}
+    for name, (sql, params) in (queries or hot_queries()).items():
+        names = scanned_names(sql, tables)
+        for detail in query_plan(conn, sql, params):
+            match = SCAN_PATTERN.match(detail)
+            if match and match.group(1) in names:
+                full_scans[name] = detail
+                break
+    return full_scans
+
+
+def main(path=DB_PATH):
+    """Check the hot queries against a database file; exits non-zero on a full scan"""
+    conn = sqlite3.connect(path)
+    try:
+        full_scans = find_full_scans(conn)
+    finally:
+        conn.close()
+
+    for name, detail in full_scans.items():
+        print(f"FULL SCAN in {name}: {detail}")
+    if not full_scans:
+        print(f"All {len(hot_queries())} hot queries use an index")
+    return 1 if full_scans else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*sys.argv[1:]))
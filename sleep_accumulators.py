@@ -0,0 +1,231 @@
+import argparse
+import math
+import sqlite3
+import sys
+from database import DB_PATH
+from daily_summary import pending_backfill
+
+# Running sleep statistics per user, kept current in O(1) per write by the
+# triggers below (Welford's update for mean/M2, plain sums for the rest), so
+# the analytics and recommendations never rescan the sleep table.
+ACCUMULATOR_TABLE = '''
+CREATE TABLE IF NOT EXISTS sleep_accumulators (
+    username TEXT PRIMARY KEY,
+    nights INTEGER NOT NULL DEFAULT 0,
+    mean REAL NOT NULL DEFAULT 0,
+    m2 REAL NOT NULL DEFAULT 0,
+    weekday_nights INTEGER NOT NULL DEFAULT 0,
+    weekday_hours REAL NOT NULL DEFAULT 0,
+    weekend_nights INTEGER NOT NULL DEFAULT 0,
+    weekend_hours REAL NOT NULL DEFAULT 0,
+    good INTEGER NOT NULL DEFAULT 0,
+    average INTEGER NOT NULL DEFAULT 0,
+    poor INTEGER NOT NULL DEFAULT 0
+)
+'''
+
+# Folds the existing nights in after the migration, in id-range chunks
+ACCUMULATOR_BACKFILL = "sleep_accumulators"
+
+# How many recent nights the consistency recommendation looks at
+RECENT_NIGHTS = 14
+
+# Only the most recent nights are read from the table (through its (username, date) index)
+RECENT_QUERY = "SELECT hours FROM sleep WHERE username = ? ORDER BY date DESC LIMIT ?"
+
+WEEKEND = "strftime('%w', {row}date) IN ('0', '6')"
+
+# Welford's update; every right-hand side sees the row's values from before the UPDATE
+ADD_NIGHT = '''
+INSERT INTO sleep_accumulators (username) VALUES ({row}username) ON CONFLICT (username) DO NOTHING;
+UPDATE sleep_accumulators SET
+    nights = nights + 1,
+    mean = mean + ({row}hours - mean) / (nights + 1),
+    m2 = m2 + ({row}hours - mean) * ({row}hours - (mean + ({row}hours - mean) / (nights + 1))),
+    weekday_nights = weekday_nights + NOT ({weekend}),
+    weekday_hours = weekday_hours + CASE WHEN {weekend} THEN 0 ELSE {row}hours END,
+    weekend_nights = weekend_nights + ({weekend}),
+    weekend_hours = weekend_hours + CASE WHEN {weekend} THEN {row}hours ELSE 0 END,
+    good = good + ({row}quality = 'Good'),
+    average = average + ({row}quality = 'Average'),
+    poor = poor + ({row}quality = 'Poor')
+WHERE username = {row}username;
+'''
+
+# The inverse update; the last night removed resets mean and M2 exactly
+REMOVE_NIGHT = '''
+UPDATE sleep_accumulators SET
+    nights = nights - 1,
+    mean = CASE WHEN nights <= 1 THEN 0.0 ELSE (nights * mean - {row}hours) / (nights - 1) END,
+    m2 = CASE WHEN nights <= 1 THEN 0.0
+         ELSE MAX(0.0, m2 - ({row}hours - mean) * ({row}hours - (nights * mean - {row}hours) / (nights - 1)))
+         END,
+    weekday_nights = weekday_nights - NOT ({weekend}),
+    weekday_hours = weekday_hours - CASE WHEN {weekend} THEN 0 ELSE {row}hours END,
+    weekend_nights = weekend_nights - ({weekend}),
+    weekend_hours = weekend_hours - CASE WHEN {weekend} THEN {row}hours ELSE 0 END,
+    good = good - ({row}quality = 'Good'),
+    average = average - ({row}quality = 'Average'),
+    poor = poor - ({row}quality = 'Poor')
+WHERE username = {row}username;
+'''
+
+
+def _night(template, row):
+    return template.format(row=row, weekend=WEEKEND.format(row=row))
+
+
+def create_sleep_accumulators(conn):
+    """Create the accumulator table and the triggers that maintain it"""
+    conn.execute(ACCUMULATOR_TABLE)
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS sleep_accumulate_insert AFTER INSERT ON sleep
+    WHEN NOT {pending_backfill(ACCUMULATOR_BACKFILL, "NEW.id")}
+    BEGIN
+        {_night(ADD_NIGHT, "NEW.")}
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS sleep_accumulate_delete AFTER DELETE ON sleep
+    WHEN NOT {pending_backfill(ACCUMULATOR_BACKFILL, "OLD.id")}
+    BEGIN
+        {_night(REMOVE_NIGHT, "OLD.")}
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS sleep_accumulate_update AFTER UPDATE OF username, date, hours, quality ON sleep
+    WHEN NOT {pending_backfill(ACCUMULATOR_BACKFILL, "NEW.id")}
+    BEGIN
+        {_night(REMOVE_NIGHT, "OLD.")}
+        {_night(ADD_NIGHT, "NEW.")}
+    END
+    ''')
+
+
+def add_nights(conn, low_id, high_id):
+    """Fold the nights with low_id < id <= high_id into the accumulators
+
+    Each user's nights in the range are summarized exactly (two passes), then
+    merged with what is stored using Chan's parallel form of Welford's update.
+    """
+    weekend = WEEKEND.format(row="s.")
+    conn.execute(f'''
+    INSERT INTO sleep_accumulators
+    SELECT s.username, COUNT(*), a.mean, SUM((s.hours - a.mean) * (s.hours - a.mean)),
+           SUM(NOT ({weekend})), TOTAL(CASE WHEN {weekend} THEN 0 ELSE s.hours END),
+           SUM({weekend}), TOTAL(CASE WHEN {weekend} THEN s.hours ELSE 0 END),
+           SUM(s.quality = 'Good'), SUM(s.quality = 'Average'), SUM(s.quality = 'Poor')
+    FROM sleep s
+    JOIN (SELECT username, AVG(hours) AS mean FROM sleep WHERE id > :low AND id <= :high GROUP BY username) a
+      ON a.username = s.username
+    WHERE s.id > :low AND s.id <= :high
+    GROUP BY s.username
+    ON CONFLICT (username) DO UPDATE SET
+        nights = nights + excluded.nights,
+        mean = mean + (excluded.mean - mean) * excluded.nights / (nights + excluded.nights),
+        m2 = m2 + excluded.m2 + (excluded.mean - mean) * (excluded.mean - mean)
+                                * nights * excluded.nights / (nights + excluded.nights),
+        weekday_nights = weekday_nights + excluded.weekday_nights,
+        weekday_hours = weekday_hours + excluded.weekday_hours,
+        weekend_nights = weekend_nights + excluded.weekend_nights,
+        weekend_hours = weekend_hours + excluded.weekend_hours,
+        good = good + excluded.good,
+        average = average + excluded.average,
+        poor = poor + excluded.poor
+    ''', {"low": low_id, "high": high_id})
+
+
+def rebuild_sleep_accumulators(conn):
+    """Recompute every user's accumulators from the sleep table"""
+    conn.execute("DELETE FROM sleep_accumulators")
+    add_nights(conn, 0, sys.maxsize)
+    # Anything the initial backfill would still add is included now
+    conn.execute('''
+    UPDATE schema_backfills SET last_id = target_id, completed_at = CURRENT_TIMESTAMP
+    WHERE name = ? AND completed_at IS NULL
+    ''', (ACCUMULATOR_BACKFILL,))
+
+
+def load_summary(conn, username):
+    """Sleep statistics from the accumulators plus the last few nights; None if no data"""
+    row = conn.execute('''
+    SELECT nights, mean, m2, weekday_nights, weekday_hours, weekend_nights, weekend_hours,
+           good, average, poor
+    FROM sleep_accumulators WHERE username = ?
+    ''', (username,)).fetchone()
+    if row is None or row[0] == 0:
+        return None
+
+    nights, mean, m2, weekday_nights, weekday_hours, weekend_nights, weekend_hours, good, average, poor = row
+    std = math.sqrt(max(m2, 0) / nights)
+
+    recent = [hours for (hours,) in conn.execute(RECENT_QUERY, (username, RECENT_NIGHTS))]
+
+    return {
+        'total_hours': mean * nights,
+        'total_days': nights,
+        'avg_hours': mean,
+        'std_hours': std,
+        # 100% when every night is the same length; drops as the spread grows
+        'consistency_percentage': int(max(0.0, 1 - std / mean) * 100) if mean > 0 else 0,
+        'weekday_avg': weekday_hours / weekday_nights if weekday_nights else 0,
+        'weekend_avg': weekend_hours / weekend_nights if weekend_nights else 0,
+        'weekday_count': weekday_nights,
+        'weekend_count': weekend_nights,
+        'quality_counts': {"Good": good, "Average": average, "Poor": poor},
+        'poor_percentage': poor / nights * 100,
+        'recent_variance': sum((h - mean) ** 2 for h in recent) / len(recent) if recent else 0,
+    }
+
+
+def find_drift(conn, tolerance=1e-6):
+    """Compare stored accumulators with a fresh recompute; returns [(username, column, stored, expected)]"""
+    columns = ["nights", "mean", "m2", "weekday_nights", "weekday_hours", "weekend_nights",
+               "weekend_hours", "good", "average", "poor"]
+    stored = {row[0]: row[1:] for row in conn.execute(
+        f"SELECT username, {', '.join(columns)} FROM sleep_accumulators WHERE nights > 0")}
+
+    # Recompute inside a savepoint and roll it back, leaving the table untouched
+    conn.execute("SAVEPOINT drift_check")
+    try:
+        rebuild_sleep_accumulators(conn)
+        expected = {row[0]: row[1:] for row in conn.execute(
+            f"SELECT username, {', '.join(columns)} FROM sleep_accumulators")}
+    finally:
+        conn.execute("ROLLBACK TO drift_check")
+        conn.execute("RELEASE drift_check")
+
+    drift = []
+    for username in stored.keys() | expected.keys():
+        have = stored.get(username, (0,) * len(columns))
+        want = expected.get(username, (0,) * len(columns))
+        for column, a, b in zip(columns, have, want):
+            if abs(a - b) > tolerance * max(1.0, abs(b)):
+                drift.append((username, column, a, b))
+    return drift
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check or rebuild the per-user sleep accumulators")
+    parser.add_argument("db", nargs="?", default=DB_PATH)
+    parser.add_argument("--rebuild", action="store_true", help="recompute the accumulators from scratch")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.rebuild:
+            with conn:
+                rebuild_sleep_accumulators(conn)
+        drift = find_drift(conn)
+    finally:
+        conn.close()
+
+    for username, column, stored, expected in drift[:20]:
+        print(f"{username} {column}: stored {stored}, expected {expected}")
+    if not drift:
+        print("sleep_accumulators match the sleep table")
+    return 1 if drift else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import numpy as np
+
+# First and last night logged, the bounds for zooming the duration chart
+DATE_SPAN_QUERY = "SELECT MIN(date), MAX(date) FROM sleep WHERE username = ?"
+
+# Columns of the history list (KeysetSource adds the date/id key)
+HISTORY_COLUMNS = "date, hours, quality, notes, id"
+
+# Nights in [start, end] for a zoomed chart; served by the (username, date) index
+RANGE_QUERY = '''
+SELECT date, hours
+FROM sleep
+WHERE username = ? AND date BETWEEN ? AND ?
+ORDER BY date
+'''
+
+
+def load_hours(conn, username, start, end):
+    """(dates, hours) arrays for the nights between start and end (YYYY-MM-DD, inclusive)"""
+    rows = conn.execute(RANGE_QUERY, (username, start, end)).fetchall()
+    if not rows:
+        return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.float64)
+    dates, hours = zip(*rows)
+    return np.array(dates, dtype="datetime64[D]"), np.array(hours, dtype=np.float64)
+
+
+# Recommended nightly sleep is 7-9 hours
+RECOMMENDED_RANGE = (7, 9)
+RECOMMENDED_HOURS = 7.5
+
+SLEEP_TIPS = [
+    "Avoid caffeine and alcohol before bedtime.",
+    "Create a relaxing bedtime routine.",
+    "Keep your bedroom cool, dark, and quiet.",
+    "Limit screen time at least 1 hour before bed.",
+    "Consider relaxation techniques like meditation or deep breathing."
+]
+
+
+def recommendations(stats):
+    """Advice paragraphs for a stats dict from sleep_accumulators.load_summary"""
+    advice = []
+    avg_hours = stats['avg_hours']
+    low, high = RECOMMENDED_RANGE
+
+    # Sleep duration recommendation
+    if avg_hours < low:
+        advice.append(f"Your average sleep duration ({avg_hours:.1f} hours) is below the recommended 7-9 hours. Try to sleep {(RECOMMENDED_HOURS - avg_hours):.1f} hours more each night for better health.")
+    elif avg_hours > high:
+        advice.append(f"Your average sleep duration ({avg_hours:.1f} hours) is above the recommended 7-9 hours. While this may be normal for some people, consider if you're spending too much time in bed.")
+    else:
+        advice.append(f"Great job! Your average sleep duration ({avg_hours:.1f} hours) is within the recommended 7-9 hours range.")
+
+    # Sleep consistency recommendation (last nights around the overall average)
+    if stats['total_days']:
+        if stats['recent_variance'] > 1.5:
+            advice.append("Your sleep duration varies significantly from day to day. Try to maintain a more consistent sleep schedule by going to bed and waking up at the same time each day.")
+        else:
+            advice.append("You have a consistent sleep schedule. This is excellent for your circadian rhythm and overall health.")
+
+    # Sleep quality recommendation: more than 25% of nights had poor sleep
+    poor_percentage = stats['poor_percentage']
+    if poor_percentage > 25:
+        advice.append(f"You're experiencing frequent nights of poor sleep quality ({poor_percentage:.1f}% of recorded nights). Consider factors that might be affecting your sleep, such as noise, light, temperature, caffeine intake, screen time, or stress.")
+        advice.append("Some tips to improve your sleep quality:\n• " + "\n• ".join(SLEEP_TIPS))
+
+    # Weekday vs weekend recommendation
+    if stats['weekday_count'] and stats['weekend_count']:
+        weekday_avg = stats['weekday_avg']
+        weekend_avg = stats['weekend_avg']
+        if abs(weekday_avg - weekend_avg) > 1.5:
+            advice.append(f"Your sleep schedule differs significantly between weekdays ({weekday_avg:.1f} hours) and weekends ({weekend_avg:.1f} hours). This 'social jet lag' can disrupt your body clock. Try to maintain a more consistent schedule throughout the week.")
+
+    return advice
+
+
+def save_night(conn, username, date, hours, quality, notes):
+    """Store one night, replacing the user's record for that date; returns True if it replaced one"""
+    updated = conn.execute('''
+    UPDATE sleep SET hours = ?, quality = ?, notes = ? WHERE username = ? AND date = ?
+    ''', (hours, quality, notes, username, date)).rowcount
+    if not updated:
+        conn.execute('''
+        INSERT INTO sleep (username, date, hours, quality, notes) VALUES (?, ?, ?, ?, ?)
+        ''', (username, date, hours, quality, notes))
+    return bool(updated)
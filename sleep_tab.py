@@ -1,12 +1,28 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
 import calendar
-import matplotlib.dates as mdates
+from database import read_connection, submit_write, data_version
+from sleep_stats import (DATE_SPAN_QUERY, HISTORY_COLUMNS, load_hours,
+                         recommendations as sleep_recommendations, save_night)
+from sleep_accumulators import load_summary
+from tk_async import call_when_done
+from refresh_scheduler import scheduler_for
+from virtual_list import VirtualList, KeysetSource
+from chart_host import BitmapChartHost
+from charts import SleepCharts
+from downsample import for_width
+
+# Size of the analytics figure; the duration plot is downsampled to its axis width
+ANALYTICS_FIGSIZE = (10, 8)
+
+# Each wheel step halves (or doubles) the visible range, down to a week
+ZOOM_STEP = 0.5
+MIN_ZOOM_DAYS = 7
+
+# Nights plotted before any zoom; zooming out brings in the rest of the history
+DEFAULT_VIEW_DAYS = 365
 
 class SleepTab:
     def __init__(self, parent, bg_color, username):
@@ -34,6 +50,11 @@ class SleepTab:
         self.notebook = ttk.Notebook(self.main_frame)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
+        # Sleep statistics shared by analytics and recommendations (see get_sleep_stats)
+        self.sleep_stats = None
+        self.stats_version = None
+        self.scheduler = scheduler_for(parent)
+        
         # Create different tabs
         self.log_tab = tk.Frame(self.notebook, bg=bg_color)
         self.history_tab = tk.Frame(self.notebook, bg=bg_color)
@@ -52,6 +73,11 @@ class SleepTab:
         self.setup_analytics_tab()
         self.setup_recommendations_tab()
     
+    def refresh(self):
+        """Reload history, analytics and tips when the tab is shown again after a write"""
+        # Queued, so a save followed by a tab switch still renders each view once
+        self.scheduler.mark_dirty(self.load_sleep_history, self.update_analytics, self.update_recommendations)
+    
     def setup_log_tab(self):
         # Header
         header = tk.Label(self.log_tab, text="Log Your Sleep", font=self.title_font, 
@@ -177,52 +203,27 @@ class SleepTab:
         # Get notes
             notes = self.notes_text.get("1.0", tk.END).strip()
 
-        # Connect to database
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
-
-        # Check if record already exists for this date
-            cursor.execute("SELECT id FROM sleep WHERE username = ? AND date = ?", 
-                       (self.username, date_str))
-            existing = cursor.fetchone()
-
-            if existing:
-            # Update existing record
-                cursor.execute("""
-                UPDATE sleep 
-                SET hours = ?, quality = ?, notes = ?
-                WHERE username = ? AND date = ?
-                """, (total_hours, quality, notes, self.username, date_str))
-                message = "Sleep record updated successfully!"
-            else:
-            # Insert new record
-                cursor.execute("""
-                INSERT INTO sleep (username, date, hours, quality, notes)
-                VALUES (?, ?, ?, ?, ?)
-            """, (self.username, date_str, total_hours, quality, notes))
-            message = "Sleep record saved successfully!"
+        except ValueError as e:
+            messagebox.showerror("Input Error", f"Please enter valid values: {str(e)}")
+            return
 
-            ####################
+        def upsert_record(conn):
+            if save_night(conn, self.username, date_str, total_hours, quality, notes):
+                return "Sleep record updated successfully!"
+            return "Sleep record saved successfully!"
 
+        def on_saved(message):
             messagebox.showinfo("Success", message)
 
-        # Refresh other tabs
-            self.load_sleep_history()
-            self.update_analytics()
-            self.update_recommendations()
+            # Refresh other tabs
+            self.refresh()
 
-        # Ensure the UI updates properly
-            self.parent.after(100, self.update_analytics)
-            self.parent.after(200, self.update_recommendations)
+        # The write runs on the background writer thread
+        call_when_done(self.parent, submit_write(upsert_record), on_saved, self.show_error)
 
-        except ValueError as e:
-            messagebox.showerror("Input Error", f"Please enter valid values: {str(e)}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
-            
-            
-        conn.commit()
-        conn.close()
+    def show_error(self, e):
+        """Report a failed background write"""
+        messagebox.showerror("Error", f"An error occurred: {str(e)}")
 
     
     def setup_history_tab(self):
@@ -245,9 +246,12 @@ class SleepTab:
         table_frame = tk.Frame(self.history_tab, bg=self.bg_color)
         table_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
         
-        # Create treeview
+        # Create treeview (virtualized: only the rows in view are loaded)
         columns = ("date", "hours", "quality", "notes")
-        self.history_tree = ttk.Treeview(table_frame, columns=columns, show="headings")
+        source = KeysetSource("sleep", HISTORY_COLUMNS, self.username)
+        self.history_list = VirtualList(table_frame, source, self.format_history_row, columns, bg=self.bg_color)
+        self.history_list.pack(fill=tk.BOTH, expand=True)
+        self.history_tree = self.history_list.tree
         
         # Define headings
         self.history_tree.heading("date", text="Date")
@@ -261,14 +265,6 @@ class SleepTab:
         self.history_tree.column("quality", width=80, anchor="center")
         self.history_tree.column("notes", width=300)
         
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.history_tree.yview)
-        self.history_tree.configure(yscrollcommand=scrollbar.set)
-        
-        # Pack treeview and scrollbar
-        self.history_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
         # Add edit and delete buttons
         button_frame = tk.Frame(self.history_tab, bg=self.bg_color)
         button_frame.pack(fill=tk.X, padx=20, pady=10)
@@ -287,36 +283,17 @@ class SleepTab:
         self.load_sleep_history()
     
     def load_sleep_history(self):
-        # Clear existing data
-        for item in self.history_tree.get_children():
-            self.history_tree.delete(item)
-        
-        # Connect to database
-        conn = sqlite3.connect('data/fitness_tracker.db')
-        cursor = conn.cursor()
-        
-        # Query sleep records
-        cursor.execute("""
-            SELECT date, hours, quality, notes, id
-            FROM sleep 
-            WHERE username = ?
-            ORDER BY date DESC
-        """, (self.username,))
-        
-        # Add data to treeview
-        for row in cursor.fetchall():
-            date_str, hours, quality, notes, record_id = row
-            # Format hours as decimal
-            hours_display = f"{hours:.1f}"
-            # Truncate notes if too long
-            notes_display = notes[:40] + "..." if notes and len(notes) > 40 else notes
-            
-            # Insert into treeview with record_id as tag
-            self.history_tree.insert("", "end", values=(date_str, hours_display, quality, notes_display),
-                                    tags=(record_id,))
-        
-        # Close connection
-        conn.close()
+        # Re-read the row count and the page in view
+        self.history_list.reload()
+    
+    def format_history_row(self, row):
+        """Display values and record id for one sleep row"""
+        date_str, hours, quality, notes, record_id = row[:5]
+        # Format hours as decimal
+        hours_display = f"{hours:.1f}"
+        # Truncate notes if too long
+        notes_display = notes[:40] + "..." if notes and len(notes) > 40 else notes
+        return (date_str, hours_display, quality, notes_display), record_id
     
     def edit_sleep_record(self):
         # Get selected item
@@ -328,19 +305,18 @@ class SleepTab:
         # Get record ID (stored as tag)
         record_id = self.history_tree.item(selected[0], "tags")[0]
         
-        # Connect to database
-        conn = sqlite3.connect('data/fitness_tracker.db')
-        cursor = conn.cursor()
-        
-        # Query record details
-        cursor.execute("""
-            SELECT date, hours, quality, notes
-            FROM sleep 
-            WHERE id = ?
-        """, (record_id,))
-        
-        record = cursor.fetchone()
-        conn.close()
+        # Borrow a pooled read connection
+        with read_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Query record details
+            cursor.execute("""
+                SELECT date, hours, quality, notes
+                FROM sleep 
+                WHERE id = ?
+            """, (record_id,))
+            
+            record = cursor.fetchone()
         
         if not record:
             messagebox.showerror("Error", "Record not found.")
@@ -437,36 +413,26 @@ class SleepTab:
                 new_total_hours = new_hours + (new_minutes / 60)
                 new_quality = quality_var.get()
                 new_notes = notes_text.get("1.0", tk.END).strip()
-                
-                # Update database
-                conn = sqlite3.connect('data/fitness_tracker.db')
-                cursor = conn.cursor()
-                
-                cursor.execute("""
+            except ValueError as e:
+                messagebox.showerror("Input Error", f"Please enter valid values: {str(e)}")
+                return
+            
+            def update_record(conn):
+                conn.execute("""
                     UPDATE sleep
                     SET hours = ?, quality = ?, notes = ?
                     WHERE id = ?
                 """, (new_total_hours, new_quality, new_notes, record_id))
-                
-                # 
-                
+            
+            def on_updated(_):
                 messagebox.showinfo("Success", "Sleep record updated successfully!")
                 
-                # Close edit window
-                edit_window.destroy()
-                
                 # Refresh history
-                self.load_sleep_history()
-                self.update_analytics()
-                self.update_recommendations()
-                
-                conn.commit()
-                conn.close()
-                
-            except ValueError as e:
-                messagebox.showerror("Input Error", f"Please enter valid values: {str(e)}")
-            except Exception as e:
-                messagebox.showerror("Error", f"An error occurred line 459: {str(e)}")
+                self.refresh()
+            
+            # Close edit window and queue the update on the writer thread
+            edit_window.destroy()
+            call_when_done(self.parent, submit_write(update_record), on_updated, self.show_error)
                 
             
         
@@ -489,24 +455,17 @@ class SleepTab:
         # Get record ID (stored as tag)
         record_id = self.history_tree.item(selected[0], "tags")[0]
         
-        # Connect to database
-        conn = sqlite3.connect('data/fitness_tracker.db')
-        cursor = conn.cursor()
-        
-        # Delete record
-        cursor.execute("DELETE FROM sleep WHERE id = ?", (record_id,))
+        def delete_record(conn):
+            conn.execute("DELETE FROM sleep WHERE id = ?", (record_id,))
         
-        # 
-        
-        messagebox.showinfo("Success", "Sleep record deleted successfully!")
-        
-        # Refresh history
-        self.load_sleep_history()
-        self.update_analytics()
-        self.update_recommendations()
+        def on_deleted(_):
+            messagebox.showinfo("Success", "Sleep record deleted successfully!")
+            
+            # Refresh history
+            self.refresh()
         
-        conn.commit()
-        conn.close()
+        # Delete record on the writer thread
+        call_when_done(self.parent, submit_write(delete_record), on_deleted, self.show_error)
         
     
     #####################################################################
@@ -523,6 +482,19 @@ class SleepTab:
         # Create graphs frame
         self.graphs_frame = tk.Frame(self.analytics_tab, bg=self.bg_color)
         self.graphs_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        quality_colors = {
+            "Good": self.secondary_color,
+            "Average": "#f39c12",  # Orange
+            "Poor": self.warning_color
+        }
+        self.analytics_chart = BitmapChartHost(self.graphs_frame, SleepCharts, figsize=ANALYTICS_FIGSIZE,
+                                               bg=self.bg_color, line_color=self.primary_color,
+                                               quality_colors=quality_colors)
+        self.analytics_chart.pack(fill=tk.BOTH, expand=True)
+        
+        # Mouse wheel over the duration plot zooms; None shows the last DEFAULT_VIEW_DAYS
+        self.sleep_view = None
+        self.analytics_chart.on_wheel(self.zoom_duration)
         
         # Create refresh button
         refresh_button = tk.Button(self.analytics_tab, text="Refresh Analytics", 
@@ -533,56 +505,31 @@ class SleepTab:
         # Initial update of analytics
         self.update_analytics()
 
+    def get_sleep_stats(self):
+        """Sleep statistics for this user, recomputed only after a write"""
+        version = data_version()
+        if self.stats_version != version:
+            # Read from the per-user accumulators; one read serves both tabs
+            with read_connection() as conn:
+                self.sleep_stats = load_summary(conn, self.username)
+            self.stats_version = version
+        return self.sleep_stats
+    
     def update_analytics(self):
         # Clear existing widgets
         for widget in self.summary_frame.winfo_children():
             widget.destroy()
         
-        for widget in self.graphs_frame.winfo_children():
-            widget.destroy()
-        
-        # Connect to database
-        conn = sqlite3.connect('data/fitness_tracker.db')
-        cursor = conn.cursor()
-        
-        # Query ALL sleep records for the user (no date restriction)
-        cursor.execute("""
-            SELECT date, hours, quality
-            FROM sleep 
-            WHERE username = ?
-            ORDER BY date
-        """, (self.username,))
-        
-        records = cursor.fetchall()
+        stats = self.get_sleep_stats()
         
         # Create summary statistics
-        if records:
-            # Extract data
-            dates = [datetime.strptime(r[0], "%Y-%m-%d") for r in records]
-            hours = [r[1] for r in records]
-            qualities = [r[2] for r in records]
-            
-            # Calculate statistics
-            total_hours = sum(hours)
-            total_days = len(hours)
-            avg_hours = total_hours / total_days
-            
-            # Calculate consistency
-            consistency_scores = [max(0, 1 - abs(h - avg_hours) / avg_hours) for h in hours]
-            consistency_percentage = int(sum(consistency_scores) / len(consistency_scores) * 100) if consistency_scores else 0
-            
-            # Calculate weekday vs weekend sleep
-            weekday_hours = []
-            weekend_hours = []
-            
-            for date, hour in zip(dates, hours):
-                if date.weekday() < 5:  # Monday-Friday
-                    weekday_hours.append(hour)
-                else:  # Saturday-Sunday
-                    weekend_hours.append(hour)
-            
-            weekday_avg = sum(weekday_hours) / len(weekday_hours) if weekday_hours else 0
-            weekend_avg = sum(weekend_hours) / len(weekend_hours) if weekend_hours else 0
+        if stats:
+            total_hours = stats['total_hours']
+            total_days = stats['total_days']
+            avg_hours = stats['avg_hours']
+            consistency_percentage = stats['consistency_percentage']
+            weekday_avg = stats['weekday_avg']
+            weekend_avg = stats['weekend_avg']
             
             # Display summary
             summary_title = tk.Label(self.summary_frame, text="Sleep Summary", font=self.header_font,
@@ -615,53 +562,71 @@ class SleepTab:
                                     bg=self.bg_color, fg=self.primary_color)
                 value_widget.pack(anchor='w')
             
-            # Create graphs
-            # 1. Sleep hours over time
-            fig = plt.Figure(figsize=(10, 8), dpi=100)
-            fig.subplots_adjust(hspace=0.5)
-            
-            # First subplot - Sleep duration over time
-            ax1 = fig.add_subplot(211)
-            ax1.plot([d.date() for d in dates], hours, 'o-', color=self.primary_color)
-            ax1.set_title('Sleep Duration Over Time')
-            ax1.set_ylabel('Hours')
-            ax1.set_ylim(0, max(12, max(hours) + 1))
-            ax1.axhline(y=avg_hours, color='r', linestyle='--', alpha=0.7)
-            ax1.text(dates[0].date(), avg_hours + 0.2, f'Average ({avg_hours:.1f}h)', color='r')
-            ax1.xaxis.set_major_formatter(mdates.DateFormatter('%b %d'))
-            
-            # Second subplot - Quality distribution
-            ax2 = fig.add_subplot(212)
-            quality_counts = {"Good": 0, "Average": 0, "Poor": 0}
-            for q in qualities:
-                quality_counts[q] = quality_counts.get(q, 0) + 1
-                
-            colors = {
-                "Good": self.secondary_color,
-                "Average": "#f39c12",  # Orange
-                "Poor": self.warning_color
-            }
-            
-            qualities_list = list(quality_counts.keys())
-            counts = list(quality_counts.values())
-            bar_colors = [colors[q] for q in qualities_list]
-            
-            ax2.bar(qualities_list, counts, color=bar_colors)
-            ax2.set_title('Sleep Quality Distribution')
-            ax2.set_ylabel('Number of Days')
-            
-            # Add canvas
-            canvas = FigureCanvasTkAgg(fig, master=self.graphs_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            self.plot_analytics()
             
         else:
             # No data message
             no_data_label = tk.Label(self.summary_frame, text="No sleep data available. Please add sleep records.", 
                                 font=self.header_font, bg=self.bg_color, fg=self.text_color)
             no_data_label.pack(pady=50)
+            self.analytics_chart.hide()
+
+    def plot_analytics(self):
+        """Plot the nights in the zoom window, downsampled to the duration axis width"""
+        stats = self.get_sleep_stats()
+        if not stats:
+            return
+        
+        # Only the visible range is read, so a refresh costs the same however long the history is
+        with read_connection() as conn:
+            view = self.duration_view(conn)
+            if view is None:
+                return
+            dates, hours = load_hours(conn, self.username, *(str(day) for day in view))
+        
+        dates, hours = for_width(dates, hours, SleepCharts.duration_pixels(ANALYTICS_FIGSIZE))
+        self.analytics_chart.plot(dates, hours, stats['avg_hours'], stats['quality_counts'], view)
+    
+    def duration_view(self, conn):
+        """(first, last) dates of the duration plot; None when no nights are logged"""
+        if self.sleep_view is not None:
+            return self.sleep_view
+        first, last = self.date_span(conn)
+        if first is None:
+            return None
+        return max(first, last - DEFAULT_VIEW_DAYS), last
+    
+    def date_span(self, conn):
+        """First and last night logged, as datetime64[D] (None, None when there are none)"""
+        first, last = conn.execute(DATE_SPAN_QUERY, (self.username,)).fetchone()
+        if first is None:
+            return None, None
+        return np.datetime64(first, 'D'), np.datetime64(last, 'D')
+    
+    def zoom_duration(self, x_fraction, y_fraction, direction):
+        """Zoom the duration plot around the pointer (direction 1 = in, -1 = out)"""
+        axis_fraction = (x_fraction - SleepCharts.LEFT) / (SleepCharts.RIGHT - SleepCharts.LEFT)
+        if y_fraction > SleepCharts.DURATION_BOTTOM or not 0 <= axis_fraction <= 1:
+            return
         
-        conn.close()
+        with read_connection() as conn:
+            first, last = self.date_span(conn)
+            if first is None:
+                return
+            start, end = self.duration_view(conn)
+        
+        span = int((end - start).astype(int))
+        new_span = max(MIN_ZOOM_DAYS, round(span * ZOOM_STEP if direction > 0 else span / ZOOM_STEP))
+        if new_span >= (last - first).astype(int):
+            # Zoomed all the way out: the whole history
+            self.sleep_view = (first, last)
+        else:
+            # Keep the date under the pointer where it is
+            pointer = start + round(axis_fraction * span)
+            new_start = min(max(pointer - round(axis_fraction * new_span), first), last - new_span)
+            self.sleep_view = (new_start, new_start + new_span)
+        
+        self.scheduler.mark_dirty(self.plot_analytics)
 
     def setup_recommendations_tab(self):
         # Header
@@ -687,90 +652,16 @@ class SleepTab:
         for widget in self.recommendations_container.winfo_children():
             widget.destroy()
         
-        # Connect to database
-        conn = sqlite3.connect('data/fitness_tracker.db')
-        cursor = conn.cursor()
-        
-        # Query ALL sleep records for the user (no date restriction)
-        cursor.execute("""
-            SELECT date, hours, quality
-            FROM sleep 
-            WHERE username = ?
-            ORDER BY date
-        """, (self.username,))
-        
-        records = cursor.fetchall()
-        
-        if records:
-            # Extract data
-            dates = [datetime.strptime(r[0], "%Y-%m-%d") for r in records]
-            hours = [r[1] for r in records]
-            qualities = [r[2] for r in records]
-            
-            # Calculate statistics
-            avg_hours = sum(hours) / len(hours)
-            recommended_hours = 7.5  # Recommended sleep duration range is 7-9 hours
-            
-            # Generate recommendations
-            recommendations = []
-            
-            # Sleep duration recommendation
-            if avg_hours < 7:
-                recommendations.append(f"Your average sleep duration ({avg_hours:.1f} hours) is below the recommended 7-9 hours. Try to sleep {(recommended_hours - avg_hours):.1f} hours more each night for better health.")
-            elif avg_hours > 9:
-                recommendations.append(f"Your average sleep duration ({avg_hours:.1f} hours) is above the recommended 7-9 hours. While this may be normal for some people, consider if you're spending too much time in bed.")
-            else:
-                recommendations.append(f"Great job! Your average sleep duration ({avg_hours:.1f} hours) is within the recommended 7-9 hours range.")
-            
-            # Sleep consistency recommendation
-            recent_dates = dates[-14:] if len(dates) >= 14 else dates
-            recent_hours = hours[-14:] if len(hours) >= 14 else hours
-            
-            if recent_hours:
-                variance = sum((h - avg_hours) ** 2 for h in recent_hours) / len(recent_hours)
-                if variance > 1.5:
-                    recommendations.append(f"Your sleep duration varies significantly from day to day. Try to maintain a more consistent sleep schedule by going to bed and waking up at the same time each day.")
-                else:
-                    recommendations.append("You have a consistent sleep schedule. This is excellent for your circadian rhythm and overall health.")
-            
-            # Sleep quality recommendation
-            quality_counts = {"Good": 0, "Average": 0, "Poor": 0}
-            for q in qualities:
-                quality_counts[q] = quality_counts.get(q, 0) + 1
-            
-            poor_percentage = quality_counts["Poor"] / len(qualities) * 100 if qualities else 0
-            
-            if poor_percentage > 25:  # If more than 25% of nights had poor sleep
-                recommendations.append(f"You're experiencing frequent nights of poor sleep quality ({poor_percentage:.1f}% of recorded nights). Consider factors that might be affecting your sleep, such as noise, light, temperature, caffeine intake, screen time, or stress.")
-                
-                # Additional recommendations for improving sleep quality
-                sleep_tips = [
-                    "Avoid caffeine and alcohol before bedtime.",
-                    "Create a relaxing bedtime routine.",
-                    "Keep your bedroom cool, dark, and quiet.",
-                    "Limit screen time at least 1 hour before bed.",
-                    "Consider relaxation techniques like meditation or deep breathing."
-                ]
-                
-                recommendations.append("Some tips to improve your sleep quality:\n• " + "\n• ".join(sleep_tips))
-            
-            # Weekday vs weekend recommendation
-            weekday_hours = [h for d, h in zip(dates, hours) if d.weekday() < 5]
-            weekend_hours = [h for d, h in zip(dates, hours) if d.weekday() >= 5]
-            
-            if weekday_hours and weekend_hours:
-                weekday_avg = sum(weekday_hours) / len(weekday_hours)
-                weekend_avg = sum(weekend_hours) / len(weekend_hours)
-                
-                if abs(weekday_avg - weekend_avg) > 1.5:
-                    recommendations.append(f"Your sleep schedule differs significantly between weekdays ({weekday_avg:.1f} hours) and weekends ({weekend_avg:.1f} hours). This 'social jet lag' can disrupt your body clock. Try to maintain a more consistent schedule throughout the week.")
-            
+        # Same statistics as the analytics tab (computed once per change)
+        stats = self.get_sleep_stats()
+        
+        if stats:
             # Display recommendations
             rec_header = tk.Label(self.recommendations_container, text="Based on your sleep data:", 
                                 font=self.header_font, bg=self.bg_color, fg=self.text_color)
             rec_header.pack(anchor='w', padx=20, pady=(0, 10))
             
-            for i, rec in enumerate(recommendations):
+            for i, rec in enumerate(sleep_recommendations(stats)):
                 rec_frame = tk.Frame(self.recommendations_container, bg=self.bg_color, pady=10)
                 rec_frame.pack(fill=tk.X, padx=20)
                 
@@ -789,13 +680,10 @@ class SleepTab:
                                     font=self.normal_font, bg=self.bg_color, fg=self.text_color,
                                     wraplength=500, justify=tk.CENTER)
             no_data_label.pack(pady=50)
-        
-        conn.close()
 
     # Additional function to ensure analytics update when new sleep data is added
     def add_sleep_entry(self, date, hours, quality):
         # Your existing code to add a sleep entry to the database
         
         # After adding the entry, update the analytics and recommendations
-        self.update_analytics()
-        self.update_recommendations()
\ No newline at end of file
+        self.scheduler.mark_dirty(self.update_analytics, self.update_recommendations)
\ No newline at end of file
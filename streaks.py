@@ -0,0 +1,84 @@
+import datetime
+import threading
+from database import read_connection, data_version
+
+STREAK_KINDS = ("meals", "hydration", "workouts", "sleep")
+
+# Gaps and islands over the daily rollup: within one kind, consecutive dates
+# share the same julianday(date) - row_number, so grouping on that difference
+# yields every streak as (kind, first day, last day, length) in one query.
+STREAK_QUERY = '''
+WITH goal AS (
+    SELECT COALESCE((SELECT hydration_goal FROM diet_goals WHERE username = :username), 2000) AS water_goal
+),
+hits AS (
+    SELECT 'meals' AS kind, date FROM daily_summary
+    WHERE username = :username AND meal_count > 0
+    UNION ALL
+    SELECT 'hydration', date FROM daily_summary, goal
+    WHERE username = :username AND water_ml >= goal.water_goal
+    UNION ALL
+    SELECT 'workouts', date FROM daily_summary
+    WHERE username = :username AND workout_count > 0
+    UNION ALL
+    SELECT 'sleep', date FROM daily_summary
+    WHERE username = :username AND sleep_hours IS NOT NULL
+),
+islands AS (
+    SELECT kind, date,
+           julianday(date) - ROW_NUMBER() OVER (PARTITION BY kind ORDER BY date) AS island
+    FROM hits
+)
+SELECT kind, MIN(date), MAX(date), COUNT(*)
+FROM islands
+GROUP BY kind, island
+'''
+
+# username -> (data version, islands); any committed write invalidates it
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_islands(conn, username):
+    """Return {kind: [(first day, last day, length), ...]} for a user"""
+    islands = {kind: [] for kind in STREAK_KINDS}
+    for kind, first, last, length in conn.execute(STREAK_QUERY, {"username": username}):
+        islands[kind].append((datetime.date.fromisoformat(first), datetime.date.fromisoformat(last), length))
+    return islands
+
+
+def summarize(islands, as_of):
+    """Current and longest streak per kind as of a date
+
+    A streak still counts as current if its last day is as_of or the day
+    before, so a day that hasn't been logged yet doesn't reset it.
+    """
+    yesterday = as_of - datetime.timedelta(days=1)
+    streaks = {}
+    for kind, runs in islands.items():
+        current = 0
+        longest = 0
+        for first, last, length in runs:
+            if first > as_of:
+                continue
+            # Runs that continue past as_of (viewing an older date) are cut off at as_of
+            end = min(last, as_of)
+            longest = max(longest, (end - first).days + 1)
+            if end >= yesterday:
+                current = (end - first).days + 1
+        streaks[kind] = {"current": current, "longest": longest}
+    return streaks
+
+
+def get_streaks(username, as_of=None):
+    """Current and longest streaks for meals, hydration goal, workouts and sleep"""
+    version = data_version()
+    with _cache_lock:
+        cached = _cache.get(username)
+    if cached is None or cached[0] != version:
+        with read_connection() as conn:
+            islands = load_islands(conn, username)
+        cached = (version, islands)
+        with _cache_lock:
+            _cache[username] = cached
+    return summarize(cached[1], as_of or datetime.date.today())
@@ -0,0 +1,73 @@
+import tkinter as tk
+from collections import OrderedDict
+from database import data_version
+
+
+class TabCache:
+    """Keeps built tabs alive and swaps them in and out with pack_forget
+
+    factory(tab_name, host_frame) builds a tab inside host_frame. When a cached
+    tab is shown again it is only refreshed (through its optional refresh()
+    method) if something was written to the database since it last rendered.
+    With max_tabs set, the least recently shown tab is destroyed once the
+    cache grows past the cap.
+    """
+
+    def __init__(self, container, factory, bg_color, max_tabs=None):
+        self.container = container
+        self.factory = factory
+        self.bg_color = bg_color
+        self.max_tabs = max_tabs
+        # tab name -> [host frame, tab, data version it last rendered]
+        self.entries = OrderedDict()
+        self.current = None
+
+    def show(self, tab_name):
+        """Show a tab, building it on first use; returns the tab instance"""
+        if self.current is not None and self.current != tab_name:
+            self.entries[self.current][0].pack_forget()
+
+        entry = self.entries.get(tab_name)
+        if entry is None:
+            host = tk.Frame(self.container, bg=self.bg_color)
+            host.pack(fill=tk.BOTH, expand=True)
+            tab = self.factory(tab_name, host)
+            entry = self.entries[tab_name] = [host, tab, data_version()]
+        else:
+            self.entries.move_to_end(tab_name)
+            if self.current != tab_name:
+                entry[0].pack(fill=tk.BOTH, expand=True)
+            self.refresh_if_stale(entry)
+
+        self.current = tab_name
+        self.evict()
+        return entry[1]
+
+    def refresh_if_stale(self, entry):
+        """Re-query a cached tab only if the database changed since it rendered"""
+        host, tab, version = entry
+        current_version = data_version()
+        if version == current_version:
+            return
+        refresh = getattr(tab, "refresh", None)
+        if refresh is not None:
+            refresh()
+        entry[2] = current_version
+
+    def evict(self):
+        """Destroy the least recently shown tabs beyond max_tabs"""
+        if self.max_tabs is None:
+            return
+        while len(self.entries) > self.max_tabs:
+            tab_name = next(iter(self.entries))
+            if tab_name == self.current:
+                break
+            host, _, _ = self.entries.pop(tab_name)
+            host.destroy()
+
+    def clear(self):
+        """Destroy every cached tab"""
+        for host, _, _ in self.entries.values():
+            host.destroy()
+        self.entries.clear()
+        self.current = None
@@ -0,0 +1,31 @@
+POLL_INTERVAL_MS = 10
+
+
+def call_when_done(widget, future, on_success=None, on_error=None, interval=POLL_INTERVAL_MS):
+    """Poll a Future from the Tk event loop and run the callbacks on the Tk thread
+
+    Worker threads must never touch widgets, so results are picked up here with
+    widget.after() instead of from inside the worker.
+    """
+    def check():
+        # The widget may have been destroyed while the work was running
+        try:
+            if not widget.winfo_exists():
+                return
+        except Exception:
+            return
+
+        if not future.done():
+            widget.after(interval, check)
+            return
+
+        error = future.exception()
+        if error is not None:
+            if on_error:
+                on_error(error)
+            else:
+                print(f"Background task failed: {error}")
+        elif on_success:
+            on_success(future.result())
+
+    check()
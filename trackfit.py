@@ -0,0 +1,399 @@
+import argparse
+import csv
+import datetime
+import json
+import multiprocessing
+import os
+import pathlib
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from database import DB_PATH
+from export import FORMATS, COMPRESSIONS, export_user
+
+# Batch jobs without the GUI: bulk import, health app and GPS activity
+# imports, rollup recompute, per-user reports and exports. Run as `python trackfit.py --db PATH <command>`.
+
+# Per import kind: (column, converter, default) in insert order. A default of
+# None makes the column required.
+IMPORT_COLUMNS = {
+    "meals": [
+        ("username", str, None),
+        ("date", str, None),
+        ("meal_type", str, "Snack"),
+        ("food_name", str, None),
+        ("calories", float, 0),
+        ("protein", float, 0),
+        ("carbs", float, 0),
+        ("fats", float, 0),
+    ],
+    "sleep": [
+        ("username", str, None),
+        ("date", str, None),
+        ("hours", float, None),
+        ("quality", str, "Average"),
+        ("notes", str, ""),
+    ],
+    "workouts": [
+        ("username", str, None),
+        ("date", str, None),
+        ("level", str, "Custom"),
+        ("duration", float, 0),
+        ("calories_burned", float, 0),
+        ("completed", int, 1),
+    ],
+}
+
+# workouts.date as the Workout tab writes and parses it; the other tables store YYYY-MM-DD
+WORKOUT_TIMESTAMP = "%Y-%m-%d %H:%M:%S"
+
+IMPORT_SQL = {
+    "meals": '''
+    INSERT INTO meals (username, date, meal_type, food_name, calories, protein, carbs, fats)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    # One night per user and date, as in the Sleep tab: a re-import replaces it
+    "sleep": '''
+    INSERT INTO sleep (username, date, hours, quality, notes) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (username, date) DO UPDATE
+    SET hours = excluded.hours, quality = excluded.quality, notes = excluded.notes
+    ''',
+    "workouts": '''
+    INSERT INTO workouts (username, date, level, duration, calories_burned, completed, day)
+    VALUES (?, ?, ?, ?, ?, ?, substr(?, 1, 10))
+    ''',
+}
+
+# Users handed to each report worker at a time
+REPORT_CHUNK = 250
+
+REPORT_COLUMNS = [
+    "username", "first_day", "last_day", "days_logged", "meals", "avg_calories_in",
+    "avg_water_ml", "workouts", "workout_minutes", "calories_out", "nights", "avg_sleep_hours",
+    "bmi", "meal_streak", "longest_meal_streak", "water_streak", "workout_streak", "sleep_streak",
+]
+
+# All-time totals from the daily rollup; averages are over days with meals/water logged
+USER_TOTALS_QUERY = '''
+SELECT MIN(date), MAX(date), COUNT(*), SUM(meal_count),
+       TOTAL(calories_in) / MAX(COALESCE(SUM(meal_count > 0), 0), 1),
+       TOTAL(water_ml) / MAX(COALESCE(SUM(water_ml > 0), 0), 1),
+       SUM(workout_count), TOTAL(workout_minutes), TOTAL(calories_out),
+       COUNT(sleep_hours), AVG(sleep_hours)
+FROM daily_summary WHERE username = ?
+'''
+
+
+def read_records(path):
+    """Yield dicts from a .csv (with a header row) or .jsonl file, one at a time"""
+    if path.endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.DictReader(f)
+
+
+def _workout_timestamp(text):
+    """A date or ISO timestamp in the Workout tab's 'YYYY-MM-DD HH:MM:SS' form"""
+    if len(text) == 10:
+        return datetime.date.fromisoformat(text).isoformat() + " 00:00:00"
+    return datetime.datetime.fromisoformat(text).strftime(WORKOUT_TIMESTAMP)
+
+
+def import_rows(kind, records):
+    """Convert records to insert tuples for kind; raises ValueError naming the bad record"""
+    columns = IMPORT_COLUMNS[kind]
+    for number, record in enumerate(records, 1):
+        row = []
+        for column, convert, default in columns:
+            value = record.get(column)
+            if value is None or value == "":
+                if default is None:
+                    raise ValueError(f"record {number}: missing {column}")
+                value = default
+            try:
+                row.append(convert(value))
+            except (TypeError, ValueError):
+                raise ValueError(f"record {number}: bad {column} {value!r}") from None
+        try:
+            row[1] = _workout_timestamp(row[1]) if kind == "workouts" else datetime.date.fromisoformat(row[1]).isoformat()
+        except ValueError:
+            raise ValueError(f"record {number}: bad date {row[1]!r}") from None
+        if kind == "workouts":
+            row.append(row[1])
+        yield row
+
+
+def import_file(conn, kind, path):
+    """Load one file into kind's table in the caller's transaction; returns (rows, users)"""
+    from food_frequency import rebuild_food_frequency
+
+    users = set()
+
+    def rows():
+        for row in import_rows(kind, read_records(path)):
+            users.add(row[0])
+            yield row
+
+    try:
+        count = conn.executemany(IMPORT_SQL[kind], rows()).rowcount
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from None
+    if kind == "meals":
+        # The frequent foods are kept by the app's own writes; bulk loads refresh them per user
+        for username in users:
+            rebuild_food_frequency(conn, username)
+    return count, users
+
+
+def recompute(conn):
+    """Rebuild every derived table from the fact tables; streaks are read from the rollup"""
+    from daily_summary import rebuild_daily_summary
+    from sleep_accumulators import rebuild_sleep_accumulators
+    from food_frequency import rebuild_food_frequency
+
+    rebuild_daily_summary(conn)
+    rebuild_sleep_accumulators(conn)
+    rebuild_food_frequency(conn)
+
+
+def all_users(conn):
+    """Registered users plus anyone with logged data, sorted"""
+    return [username for (username,) in conn.execute('''
+    SELECT username FROM users WHERE username IS NOT NULL
+    UNION SELECT DISTINCT username FROM daily_summary
+    ORDER BY 1
+    ''')]
+
+
+def user_report(conn, username, as_of):
+    """One report row for a user"""
+    from profiles import calculate_bmi
+    from streaks import load_islands, summarize
+
+    (first_day, last_day, days, meals, avg_calories, avg_water, workouts, minutes, calories_out,
+     nights, avg_sleep) = conn.execute(USER_TOTALS_QUERY, (username,)).fetchone()
+    profile = conn.execute("SELECT weight, height FROM profile WHERE username = ?", (username,)).fetchone()
+    streaks = summarize(load_islands(conn, username), as_of)
+
+    return {
+        "username": username,
+        "first_day": first_day,
+        "last_day": last_day,
+        "days_logged": days,
+        "meals": meals or 0,
+        "avg_calories_in": round(avg_calories, 1),
+        "avg_water_ml": round(avg_water, 1),
+        "workouts": workouts or 0,
+        "workout_minutes": round(minutes, 1),
+        "calories_out": round(calories_out, 1),
+        "nights": nights,
+        "avg_sleep_hours": round(avg_sleep, 2) if avg_sleep is not None else None,
+        "bmi": round(calculate_bmi(*profile), 1) if profile and profile[0] and profile[1] else None,
+        "meal_streak": streaks["meals"]["current"],
+        "longest_meal_streak": streaks["meals"]["longest"],
+        "water_streak": streaks["hydration"]["current"],
+        "workout_streak": streaks["workouts"]["current"],
+        "sleep_streak": streaks["sleep"]["current"],
+    }
+
+
+def report_users(db_path, usernames, as_of):
+    """Report rows for a chunk of users on a private read-only connection (runs in a worker)"""
+    # as_uri() percent-encodes the path, so '?', '#' or '%' in a directory name can't change the URI
+    conn = sqlite3.connect(f"{pathlib.Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        return [user_report(conn, username, as_of) for username in usernames]
+    finally:
+        conn.close()
+
+
+def generate_reports(db_path, usernames, as_of, workers):
+    """Yield report rows in username order, spreading the users over worker processes"""
+    chunks = [usernames[i:i + REPORT_CHUNK] for i in range(0, len(usernames), REPORT_CHUNK)]
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from report_users(db_path, chunk, as_of)
+        return
+
+    # spawn, like the chart renderer: nothing of the parent's threads or connections is inherited
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for rows in pool.map(report_users, [db_path] * len(chunks), chunks, [as_of] * len(chunks)):
+            yield from rows
+
+
+def write_report(rows, out, fmt):
+    """Stream rows to out as CSV or JSON lines; returns the number written"""
+    count = 0
+    if fmt == "jsonl":
+        for row in rows:
+            out.write(json.dumps(row) + "\n")
+            count += 1
+        return count
+
+    writer = csv.DictWriter(out, fieldnames=REPORT_COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def _iso_date(text):
+    """argparse type for YYYY-MM-DD, kept as the string the tables store"""
+    return datetime.date.fromisoformat(text).isoformat()
+
+
+def main(argv=None):
+    import database
+    from migrations import migrate, run_backfills
+
+    parser = argparse.ArgumentParser(description="TrackFit batch jobs: bulk import, recompute, reports and exports")
+    parser.add_argument("--db", default=DB_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    load = subparsers.add_parser("import", help="bulk-load CSV or JSONL files (one transaction per file)")
+    load.add_argument("kind", choices=sorted(IMPORT_COLUMNS))
+    load.add_argument("files", nargs="+")
+
+    rebuild = subparsers.add_parser("recompute", help="rebuild the daily rollup, sleep statistics and frequent foods")
+    rebuild.add_argument("--check", action="store_true", help="only report drift, change nothing")
+
+    report = subparsers.add_parser("report", help="per-user summary report")
+    report.add_argument("--user", action="append", help="limit to these users (repeatable)")
+    report.add_argument("--as-of", type=datetime.date.fromisoformat,
+                        help="date the streaks are counted to (YYYY-MM-DD, default today)")
+    report.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    report.add_argument("--output", help="file to write (default stdout)")
+    report.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    health = subparsers.add_parser("health", help="import sleep, workouts and water from Apple Health or Google Fit")
+    health.add_argument("user", help="user the records belong to")
+    health.add_argument("paths", nargs="+", help="Apple export.xml/export.zip, or a Google Takeout Fit folder/zip")
+
+    activities = subparsers.add_parser("activities", help="import GPX, TCX and FIT files as workouts with their routes")
+    activities.add_argument("user", help="user the workouts belong to")
+    activities.add_argument("paths", nargs="+", help="files, or folders searched for .gpx/.tcx/.fit")
+    activities.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+
+    dump = subparsers.add_parser("export", help="export each user's data to CSV, JSON Lines or Parquet files")
+    dump.add_argument("out", help="directory; files go to <out>/<username>-<hash>/<table>.<format>")
+    dump.add_argument("--user", action="append", help="limit to these users (repeatable)")
+    dump.add_argument("--start", type=_iso_date, help="first date to include (YYYY-MM-DD)")
+    dump.add_argument("--end", type=_iso_date, help="last date to include (YYYY-MM-DD)")
+    dump.add_argument("--format", choices=FORMATS, default="csv")
+    dump.add_argument("--compression", choices=COMPRESSIONS, default="none")
+    args = parser.parse_args(argv)
+
+    database.configure(args.db)
+    migrate(run_backfills=False)
+    # Bring the rollup up to date first, so imports and reports see complete data
+    run_backfills()
+    start = time.perf_counter()
+    try:
+        if args.command == "import":
+            for path in args.files:
+                with database.write_connection() as conn:
+                    count, users = import_file(conn, args.kind, path)
+                print(f"{path}: {count} {args.kind} rows for {len(users)} users", file=sys.stderr)
+
+        elif args.command == "health":
+            from health_import import import_health
+
+            def write(sql, rows):
+                # One transaction per batch, so the app can still write between them
+                with database.write_connection() as conn:
+                    return conn.executemany(sql, rows).rowcount
+
+            def progress(importer, reader):
+                print(f"\r{reader.fraction():6.1%}  {importer.parsed} records", end="", file=sys.stderr)
+
+            for path in args.paths:
+                importer = import_health(write, args.user, path, progress)
+                counts = ", ".join(f"{importer.inserted[table]} {table} ({importer.skipped[table]} already stored)"
+                                   for table in importer.inserted)
+                print(f"\r{path}: {importer.parsed} records, {counts}", file=sys.stderr)
+
+        elif args.command == "activities":
+            from activity_import import DEFAULT_WEIGHT_KG, find_files, import_activities
+
+            with database.read_connection() as conn:
+                weight = conn.execute("SELECT weight FROM profile WHERE username = ?", (args.user,)).fetchone()
+            files = find_files(args.paths)
+            parsed = 0
+
+            def progress(summary):
+                nonlocal parsed
+                parsed += 1
+                print(f"\r{parsed}/{len(files)} files", end="", file=sys.stderr)
+
+            def write(work, *work_args):
+                return database.submit_write(work, *work_args).result()
+
+            added, skipped, errors = import_activities(write, args.user, files,
+                                                       (weight and weight[0]) or DEFAULT_WEIGHT_KG,
+                                                       args.workers, progress)
+            for path, error in errors:
+                print(f"\r{path}: {error}", file=sys.stderr)
+            elapsed = time.perf_counter() - start
+            print(f"\r{len(files)} files: {added} workouts added, {skipped} already imported, {len(errors)} unreadable "
+                  f"({len(files) / max(elapsed, 1e-9):.0f} files/s)", file=sys.stderr)
+
+        elif args.command == "recompute":
+            from daily_summary import find_mismatches
+            from sleep_accumulators import find_drift as sleep_drift
+            from food_frequency import find_drift as food_drift
+
+            if not args.check:
+                with database.write_connection() as conn:
+                    recompute(conn)
+            # The checks recompute inside a savepoint and roll back, so they need the writer
+            with database.write_connection() as conn:
+                problems = {"daily_summary": len(find_mismatches(conn)),
+                            "sleep_accumulators": len(sleep_drift(conn)),
+                            "food_frequency": len(food_drift(conn))}
+            for table, count in problems.items():
+                print(f"{table}: {count} mismatches", file=sys.stderr)
+            if any(problems.values()):
+                return 1
+
+        elif args.command == "export":
+            with database.read_connection() as conn:
+                usernames = sorted(set(args.user)) if args.user else all_users(conn)
+                rows = 0
+                for username in usernames:
+                    counts = export_user(conn, username, args.out, args.format, args.compression,
+                                         args.start, args.end)
+                    rows += sum(counts.values())
+            elapsed = time.perf_counter() - start
+            print(f"exported {rows} rows for {len(usernames)} users ({rows / max(elapsed, 1e-9):.0f} rows/s)",
+                  file=sys.stderr)
+
+        else:
+            with database.read_connection() as conn:
+                usernames = sorted(set(args.user)) if args.user else all_users(conn)
+            # Workers open their own connections; make sure everything is on disk first
+            database.close()
+            # Resolved here rather than in the parser, so the default is the day the report runs
+            as_of = args.as_of or datetime.date.today()
+            rows = generate_reports(os.path.abspath(args.db), usernames, as_of, args.workers)
+            if args.output:
+                with open(args.output, "w", newline="", encoding="utf-8") as out:
+                    count = write_report(rows, out, args.format)
+            else:
+                count = write_report(rows, sys.stdout, args.format)
+            print(f"reported {count} users", file=sys.stderr)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        database.close()
+    print(f"done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
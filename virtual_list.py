@@ -0,0 +1,165 @@
+import tkinter as tk
+from tkinter import ttk
+from database import read_connection
+from keyset import KeysetSource  # re-exported: the tabs build their sources from here
+
+# Rows fetched beyond each edge of the visible window
+PREFETCH_ROWS = 50
+
+# Used to size the window from the widget height when the style doesn't say
+DEFAULT_ROW_HEIGHT = 20
+HEADING_HEIGHT = 25
+
+
+class VirtualList(tk.Frame):
+    """A Treeview that only holds the rows in view, backed by a KeysetSource
+
+    format_row(row) returns (values, record_id); the record id is stored as
+    the item's tag, like the history views have always done. The list keeps
+    at most the visible rows plus PREFETCH_ROWS on either side in memory.
+    """
+
+    def __init__(self, parent, source, format_row, columns, height=10, bg=None, **kwargs):
+        super().__init__(parent, bg=bg, **kwargs)
+        self.source = source
+        self.format_row = format_row
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=height)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.visible_rows = height
+        self.total = 0
+        self.first = 0
+        # Contiguous slice of the full result: rows for positions buffer_start..
+        self.buffer = []
+        self.buffer_start = 0
+
+        # The tree never scrolls by itself; every scroll goes through the list
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self.on_wheel)
+        self.tree.bind("<Down>", lambda e: self.on_key(1))
+        self.tree.bind("<Up>", lambda e: self.on_key(-1))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.visible_rows) or "break")
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.visible_rows) or "break")
+        self.tree.bind("<Configure>", self.on_resize)
+
+    # -- data --------------------------------------------------------------
+
+    def reload(self):
+        """Re-read the row count and the rows around the current position"""
+        with read_connection() as conn:
+            self.total = self.source.count(conn)
+            self.first = max(0, min(self.first, self.total - self.visible_rows))
+            self.load_around(conn, self.first)
+        self.render()
+
+    def load_around(self, conn, first):
+        """Replace the buffer with the rows around position first (one OFFSET query)"""
+        start = max(0, first - PREFETCH_ROWS)
+        self.buffer = self.source.page_at(conn, start, self.visible_rows + 2 * PREFETCH_ROWS)
+        self.buffer_start = start
+
+    def ensure_loaded(self, first):
+        """Make sure the rows for a window starting at first are buffered"""
+        end = min(first + self.visible_rows, self.total)
+        buffer_end = self.buffer_start + len(self.buffer)
+
+        with read_connection() as conn:
+            if first < self.buffer_start - PREFETCH_ROWS or end > buffer_end + PREFETCH_ROWS or not self.buffer:
+                # Far jump (scrollbar drag): one OFFSET query around the target
+                self.load_around(conn, first)
+                return
+
+            if end > buffer_end and buffer_end < self.total:
+                # Scrolling down: next page after the last buffered key
+                self.buffer += self.source.page_after(conn, self.buffer[-1][-2:], PREFETCH_ROWS)
+            if first < self.buffer_start:
+                # Scrolling up: previous page before the first buffered key
+                rows = self.source.page_before(conn, self.buffer[0][-2:], PREFETCH_ROWS)
+                self.buffer = rows + self.buffer
+                self.buffer_start -= len(rows)
+
+        # Drop rows far outside the window so memory stays constant
+        limit = self.visible_rows + 2 * PREFETCH_ROWS
+        excess_front = max(0, first - PREFETCH_ROWS - self.buffer_start)
+        if excess_front:
+            del self.buffer[:excess_front]
+            self.buffer_start += excess_front
+        del self.buffer[limit:]
+
+    # -- view --------------------------------------------------------------
+
+    def render(self):
+        """Show the buffered rows for the current window"""
+        selected = {self.tree.item(item, "tags")[0] for item in self.tree.selection()
+                    if self.tree.item(item, "tags")}
+
+        self.tree.delete(*self.tree.get_children())
+        offset = self.first - self.buffer_start
+        for row in self.buffer[offset:offset + self.visible_rows]:
+            values, record_id = self.format_row(row)
+            item = self.tree.insert("", "end", values=values, tags=(record_id,))
+            if record_id in selected:
+                self.tree.selection_add(item)
+
+        if self.total:
+            self.scrollbar.set(self.first / self.total,
+                               min(1.0, (self.first + self.visible_rows) / self.total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll_to(self, first):
+        first = max(0, min(first, self.total - self.visible_rows))
+        if first == self.first and self.tree.get_children():
+            return
+        self.ensure_loaded(first)
+        self.first = first
+        self.render()
+
+    def scroll(self, rows):
+        self.scroll_to(self.first + rows)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.total))
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll(int(amount) * step)
+
+    def on_wheel(self, event):
+        if getattr(event, "num", None) == 5 or getattr(event, "delta", 0) < 0:
+            self.scroll(3)
+        else:
+            self.scroll(-3)
+        return "break"
+
+    def on_key(self, direction):
+        """Arrow keys move the selection, scrolling when it reaches an edge"""
+        items = self.tree.get_children()
+        focus = self.tree.focus()
+        if not items or focus not in items:
+            return None
+        index = items.index(focus)
+        if 0 <= index + direction < len(items):
+            return None  # let the Treeview move within the window
+
+        self.scroll(direction)
+        items = self.tree.get_children()
+        if items:
+            edge = items[-1] if direction > 0 else items[0]
+            self.tree.selection_set(edge)
+            self.tree.focus(edge)
+        return "break"
+
+    def on_resize(self, event):
+        style = ttk.Style()
+        row_height = int(style.lookup("Treeview", "rowheight") or DEFAULT_ROW_HEIGHT)
+        rows = max(1, (event.height - HEADING_HEIGHT) // row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            if self.total:
+                self.first = max(0, min(self.first, self.total - rows))
+                self.ensure_loaded(self.first)
+                self.render()
@@ -2,11 +2,16 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3
 from datetime import datetime
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
-import pandas as pd
 from tkinter import font
+from database import read_connection, submit_write
+from tk_async import call_when_done
+from refresh_scheduler import scheduler_for
+from virtual_list import VirtualList, KeysetSource
+from chart_host import BitmapChartHost
+from charts import WorkoutBars
+from workouts import (WORKOUT_LEVELS, HISTORY_COLUMNS, EXERCISES_QUERY, GRAPH_QUERY, WorkoutSession,
+                      save_workout)
 
 class WorkoutTab:
     def __init__(self, parent, bg_color, username):
@@ -20,39 +25,11 @@ class WorkoutTab:
         self.normal_font = font.Font(family="Helvetica", size=10)
         
         # Workout data
-        self.workout_levels = {
-            "Beginner": [
-                {"name": "Push-ups", "reps": 10, "sets": 3, "calories_per_rep": 0.5},
-                {"name": "Squats", "reps": 15, "sets": 3, "calories_per_rep": 0.6},
-                {"name": "Plank", "reps": 30, "sets": 3, "calories_per_rep": 0.4, "is_duration": True},
-                {"name": "Jumping Jacks", "reps": 20, "sets": 3, "calories_per_rep": 0.3},
-                {"name": "Crunches", "reps": 12, "sets": 3, "calories_per_rep": 0.25}
-            ],
-            "Intermediate": [
-                {"name": "Push-ups", "reps": 15, "sets": 4, "calories_per_rep": 0.5},
-                {"name": "Squats", "reps": 20, "sets": 4, "calories_per_rep": 0.6},
-                {"name": "Plank", "reps": 45, "sets": 4, "calories_per_rep": 0.4, "is_duration": True},
-                {"name": "Burpees", "reps": 12, "sets": 3, "calories_per_rep": 1.0},
-                {"name": "Mountain Climbers", "reps": 30, "sets": 3, "calories_per_rep": 0.3},
-                {"name": "Lunges", "reps": 10, "sets": 3, "calories_per_rep": 0.4}
-            ],
-            "Advanced": [
-                {"name": "Push-ups", "reps": 25, "sets": 4, "calories_per_rep": 0.5},
-                {"name": "Squats", "reps": 30, "sets": 4, "calories_per_rep": 0.6},
-                {"name": "Plank", "reps": 60, "sets": 3, "calories_per_rep": 0.4, "is_duration": True},
-                {"name": "Burpees", "reps": 20, "sets": 4, "calories_per_rep": 1.0},
-                {"name": "Pull-ups", "reps": 8, "sets": 3, "calories_per_rep": 1.0},
-                {"name": "Box Jumps", "reps": 15, "sets": 4, "calories_per_rep": 0.7},
-                {"name": "Diamond Push-ups", "reps": 12, "sets": 3, "calories_per_rep": 0.6}
-            ]
-        }
-        
-        # Current workout state
-        self.current_workout = None
-        self.current_level = None
-        self.workout_in_progress = False
-        self.workout_start_time = None
-        self.completed_exercises = {}
+        self.workout_levels = WORKOUT_LEVELS
+        
+        # Current workout state (a workouts.WorkoutSession while one is running)
+        self.session = None
+        self.sets_vars = {}
         
         # Create UI elements
         self.create_widgets()
@@ -110,9 +87,12 @@ class WorkoutTab:
         history_label = ttk.Label(self.history_frame, text="Workout History", font=self.header_font, background=self.bg_color)
         history_label.pack(anchor="w", pady=(0, 10))
         
-        # Create treeview for workout history
-        self.history_tree = ttk.Treeview(self.history_frame, columns=("Date", "Level", "Duration", "Calories", "Status"), show="headings", height=5)
-        self.history_tree.pack(fill=tk.BOTH, expand=True)
+        # Create treeview for workout history (virtualized, so every workout is reachable)
+        source = KeysetSource("workouts", HISTORY_COLUMNS, self.username)
+        self.history_list = VirtualList(self.history_frame, source, self.format_history_row,
+                                        ("Date", "Level", "Duration", "Calories", "Status"), height=5, bg=self.bg_color)
+        self.history_list.pack(fill=tk.BOTH, expand=True)
+        self.history_tree = self.history_list.tree
         
         # Configure columns
         self.history_tree.heading("Date", text="Date")
@@ -127,25 +107,22 @@ class WorkoutTab:
         self.history_tree.column("Calories", width=100)
         self.history_tree.column("Status", width=100)
         
-        # Add scrollbar to treeview
-        history_scrollbar = ttk.Scrollbar(self.history_tree, orient=tk.VERTICAL, command=self.history_tree.yview)
-        self.history_tree.configure(yscrollcommand=history_scrollbar.set)
-        history_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
         # Bind double-click to view workout details
         self.history_tree.bind("<Double-1>", self.view_workout_details)
         
         # Create graph frame for workout visualization
         self.graph_frame = ttk.Frame(main_frame, style="TFrame")
         self.graph_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        self.workout_chart = BitmapChartHost(self.graph_frame, WorkoutBars, figsize=(8, 3), bg=self.bg_color,
+                                             color='#3498db')
+        self.workout_chart.pack(fill=tk.BOTH, expand=True)
         
         # Create workout summary graph
         self.create_workout_graph()
         
     def on_level_selected(self, event=None):
         # Update exercises list when level is selected
-        if not self.workout_in_progress:
-            self.current_level = self.level_var.get()
+        if self.session is None:
             self.update_exercise_preview()
     
     def update_exercise_preview(self):
@@ -198,11 +175,8 @@ class WorkoutTab:
     
     def start_workout(self):
         # Initialize new workout
-        self.current_level = self.level_var.get()
-        self.current_workout = self.workout_levels[self.current_level]
-        self.workout_in_progress = True
-        self.workout_start_time = datetime.now()
-        self.completed_exercises = {}
+        self.session = WorkoutSession(self.level_var.get())
+        self.sets_vars = {}
         
         # Update UI state
         self.start_button.configure(state=tk.DISABLED)
@@ -233,7 +207,7 @@ class WorkoutTab:
         canvas.configure(yscrollcommand=scrollbar.set)
         
         # Add workout header
-        workout_label = ttk.Label(scrollable_frame, text=f"{self.current_level} Workout in Progress", font=self.header_font, background=self.bg_color)
+        workout_label = ttk.Label(scrollable_frame, text=f"{self.session.level} Workout in Progress", font=self.header_font, background=self.bg_color)
         workout_label.grid(row=0, column=0, columnspan=4, sticky="w", pady=(0, 10))
         
         # Create progress bar
@@ -260,21 +234,12 @@ class WorkoutTab:
         ttk.Label(scrollable_frame, text="Actions", font=self.normal_font, background=self.bg_color).grid(row=3, column=3, sticky="w", padx=(0, 20))
         
         # Add exercise rows with set tracking
-        for i, exercise in enumerate(self.current_workout):
+        for i, exercise in enumerate(self.session.exercises):
             row = i + 4
             name = exercise["name"]
             target_sets = exercise["sets"]
             rep_text = f"{exercise['reps']} {'seconds' if exercise.get('is_duration', False) else 'reps'}"
             
-            # Initialize exercise in completed_exercises
-            if name not in self.completed_exercises:
-                self.completed_exercises[name] = {
-                    "completed_sets": 0,
-                    "target_sets": target_sets,
-                    "reps": exercise["reps"],
-                    "calories_per_rep": exercise["calories_per_rep"]
-                }
-            
             # Exercise name
             ttk.Label(scrollable_frame, text=name, font=self.normal_font, background=self.bg_color).grid(row=row, column=0, sticky="w", padx=(0, 20), pady=5)
             
@@ -282,11 +247,9 @@ class WorkoutTab:
             sets_frame = ttk.Frame(scrollable_frame, style="TFrame")
             sets_frame.grid(row=row, column=1, sticky="w", padx=(0, 20), pady=5)
             
-            sets_var = tk.StringVar(value=f"{self.completed_exercises[name]['completed_sets']}")
+            sets_var = tk.StringVar(value=f"{self.session.completed_sets[name]}")
             ttk.Label(sets_frame, textvariable=sets_var, font=self.normal_font, background=self.bg_color).pack(side=tk.LEFT)
-            
-            # Update reference to the StringVar in completed_exercises
-            self.completed_exercises[name]["sets_var"] = sets_var
+            self.sets_vars[name] = sets_var
             
             # Target display
             ttk.Label(scrollable_frame, text=f"{target_sets} sets of {rep_text}", font=self.normal_font, background=self.bg_color).grid(row=row, column=2, sticky="w", padx=(0, 20), pady=5)
@@ -304,129 +267,57 @@ class WorkoutTab:
         scrollbar.pack(side="right", fill="y")
     
     def complete_set(self, exercise_name):
-        # Update completed sets
-        exercise = self.completed_exercises[exercise_name]
-        
-        if exercise["completed_sets"] < exercise["target_sets"]:
-            exercise["completed_sets"] += 1
-            exercise["sets_var"].set(f"{exercise['completed_sets']}")
-            
-            # Update calories burned
-            new_calories = float(self.calories_var.get()) + (exercise["reps"] * exercise["calories_per_rep"])
-            self.calories_var.set(f"{new_calories:.1f}")
-            
-            # Update progress bar
-            total_sets = sum(ex["target_sets"] for ex in self.completed_exercises.values())
-            completed_sets = sum(ex["completed_sets"] for ex in self.completed_exercises.values())
-            progress = (completed_sets / total_sets) * 100
-            self.progress_var.set(progress)
+        # The session counts the set and its calories; the widgets just show them
+        if self.session.complete_set(exercise_name):
+            self.sets_vars[exercise_name].set(f"{self.session.completed_sets[exercise_name]}")
+            self.calories_var.set(f"{self.session.calories:.1f}")
+            self.progress_var.set(self.session.progress)
     
     def end_workout(self):
         # Check if workout is in progress
-        if not self.workout_in_progress:
+        if self.session is None:
             return
         
-        # Calculate workout duration
-        duration = (datetime.now() - self.workout_start_time).total_seconds() / 60  # in minutes
-        
-        # Calculate completion status
-        total_sets = sum(ex["target_sets"] for ex in self.completed_exercises.values())
-        completed_sets = sum(ex["completed_sets"] for ex in self.completed_exercises.values())
-        
-        completion_percentage = (completed_sets / total_sets) * 100
-        
-        if completion_percentage == 100:
-            status = "Completed"
-        elif completion_percentage >= 75:
-            status = "Mostly Done"
-        elif completion_percentage >= 50:
-            status = "Half Done"
-        else:
-            status = "Partial"
-        
-        # Get calories burned
-        calories_burned = float(self.calories_var.get())
+        # Duration, calories and completion status
+        summary = self.session.finish()
         
         # Save workout to database
-        self.save_workout(self.current_level, duration, calories_burned, status, completed_sets, total_sets)
+        self.save_workout(summary)
         
         # Reset workout state
-        self.workout_in_progress = False
-        self.current_workout = None
+        self.session = None
         
         # Update UI
         self.start_button.configure(state=tk.NORMAL)
         self.end_button.configure(state=tk.DISABLED)
         self.level_dropdown.configure(state="readonly")
         
-        # Show exercise preview again
+        # Show exercise preview again (history refreshes once the save lands)
         self.update_exercise_preview()
         
-        # Refresh history
-        self.load_workout_history()
-        
         # Show completion message
         messagebox.showinfo("Workout Completed", 
-                           f"Workout ended!\nDuration: {duration:.1f} minutes\nCalories Burned: {calories_burned:.1f}\nCompletion: {completion_percentage:.1f}%")
+                           f"Workout ended!\nDuration: {summary['duration']:.1f} minutes\nCalories Burned: {summary['calories_burned']:.1f}\nCompletion: {summary['completion_percentage']:.1f}%")
     
-    def save_workout(self, level, duration, calories_burned, status, completed_sets, total_sets):
-        try:
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
-            
-            # Insert workout record
-            cursor.execute('''
-                INSERT INTO workouts (username, date, level, duration, calories_burned, completed)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (self.username, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 
-                 level, duration, calories_burned, 1 if status == "Completed" else 0))
-            
-            workout_id = cursor.lastrowid
-            
-            # Insert exercise details
-            for exercise_name, exercise_data in self.completed_exercises.items():
-                cursor.execute('''
-                    INSERT INTO workout_exercises (workout_id, exercise_name, sets, reps)
-                    VALUES (?, ?, ?, ?)
-                ''', (workout_id, exercise_name, exercise_data["completed_sets"], exercise_data["reps"]))
-            
-            conn.commit()
-            conn.close()
-            
-        except sqlite3.Error as e:
+    def save_workout(self, summary):
+        def insert_workout(conn):
+            save_workout(conn, self.username, summary)
+        
+        def on_error(e):
             messagebox.showerror("Database Error", f"An error occurred while saving workout: {e}")
+        
+        # Refresh history once the writer thread has stored the workout
+        call_when_done(self.parent, submit_write(insert_workout), 
+                       lambda _: self.refresh(), on_error)
+    
+    def refresh(self):
+        """Reload history and graph when the tab is shown again after a write"""
+        scheduler_for(self.parent).mark_dirty(self.load_workout_history)
     
     def load_workout_history(self):
-        # Clear existing items
-        for item in self.history_tree.get_children():
-            self.history_tree.delete(item)
-        
         try:
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, date, level, duration, calories_burned, completed
-                FROM workouts
-                WHERE username = ?
-                ORDER BY date DESC
-                LIMIT 10
-            ''', (self.username,))
-            
-            workouts = cursor.fetchall()
-            
-            for workout in workouts:
-                workout_id, date, level, duration, calories, completed = workout
-                status = "Completed" if completed == 1 else "Partial"
-                
-                # Format date
-                date_obj = datetime.strptime(date, '%Y-%m-%d %H:%M:%S')
-                formatted_date = date_obj.strftime('%b %d, %Y %I:%M %p')
-                
-                # Insert into treeview
-                self.history_tree.insert("", "end", values=(formatted_date, level, f"{duration:.1f}", f"{calories:.1f}", status), tags=(workout_id,))
-            
-            conn.close()
+            # Re-read the row count and the page in view
+            self.history_list.reload()
             
             # Update workout graph
             self.create_workout_graph()
@@ -434,6 +325,17 @@ class WorkoutTab:
         except sqlite3.Error as e:
             messagebox.showerror("Database Error", f"An error occurred while loading workout history: {e}")
     
+    def format_history_row(self, workout):
+        """Display values and workout id for one workout row"""
+        workout_id, date, level, duration, calories, completed = workout[:6]
+        status = "Completed" if completed == 1 else "Partial"
+        
+        # Format date
+        date_obj = datetime.strptime(date, '%Y-%m-%d %H:%M:%S')
+        formatted_date = date_obj.strftime('%b %d, %Y %I:%M %p')
+        
+        return (formatted_date, level, f"{duration:.1f}", f"{calories:.1f}", status), workout_id
+    
     def view_workout_details(self, event):
         # Get selected item
         item_id = self.history_tree.focus()
@@ -444,34 +346,27 @@ class WorkoutTab:
         workout_id = self.history_tree.item(item_id, "tags")[0]
         
         try:
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
-            
-            # Get workout details
-            cursor.execute('''
-                SELECT date, level, duration, calories_burned, completed
-                FROM workouts
-                WHERE id = ?
-            ''', (workout_id,))
-            
-            workout = cursor.fetchone()
-            
-            if not workout:
-                conn.close()
-                return
+            with read_connection() as conn:
+                cursor = conn.cursor()
                 
-            date, level, duration, calories, completed = workout
-            
-            # Get exercise details
-            cursor.execute('''
-                SELECT exercise_name, sets, reps
-                FROM workout_exercises
-                WHERE workout_id = ?
-            ''', (workout_id,))
-            
-            exercises = cursor.fetchall()
-            
-            conn.close()
+                # Get workout details
+                cursor.execute('''
+                    SELECT date, level, duration, calories_burned, completed
+                    FROM workouts
+                    WHERE id = ?
+                ''', (workout_id,))
+                
+                workout = cursor.fetchone()
+                
+                if not workout:
+                    return
+                    
+                date, level, duration, calories, completed = workout
+                
+                # Get exercise details
+                cursor.execute(EXERCISES_QUERY, (workout_id,))
+                
+                exercises = cursor.fetchall()
             
             # Create details window
             details_window = tk.Toplevel(self.parent)
@@ -525,55 +420,28 @@ class WorkoutTab:
             messagebox.showerror("Database Error", f"An error occurred while loading workout details: {e}")
     
     def create_workout_graph(self):
-        # Clear existing graph
-        for widget in self.graph_frame.winfo_children():
-            widget.destroy()
-        
+        """Update the calories graph for the first 10 workouts"""
         try:
-            conn = sqlite3.connect('data/fitness_tracker.db')
-            cursor = conn.cursor()
-            
-            # Get workout data for last 10 workouts
-            cursor.execute('''
-                SELECT date, calories_burned, duration
-                FROM workouts
-                WHERE username = ?
-                ORDER BY date ASC
-                LIMIT 10
-            ''', (self.username,))
-            
-            workouts = cursor.fetchall()
-            conn.close()
+            with read_connection() as conn:
+                cursor = conn.cursor()
+                
+                # Get workout data for last 10 workouts
+                cursor.execute(GRAPH_QUERY, (self.username,))
+                
+                workouts = cursor.fetchall()
             
             if not workouts:
                 # Show placeholder if no data
-                ttk.Label(self.graph_frame, text="Complete workouts to see your progress graph", 
-                         font=self.normal_font, background=self.bg_color).pack(pady=20)
+                self.workout_chart.show_message("Complete workouts to see your progress graph")
                 return
             
-            # Create figure and axis
-            figure = plt.Figure(figsize=(8, 3), dpi=100)
-            ax = figure.add_subplot(111)
-            
             # Prepare data
             dates = [datetime.strptime(workout[0], '%Y-%m-%d %H:%M:%S').strftime('%m/%d') for workout in workouts]
             calories = [workout[1] for workout in workouts]
             
-            # Create bar chart
-            bars = ax.bar(dates, calories, color='#3498db')
-            ax.set_title('Calories Burned per Workout')
-            ax.set_xlabel('Date')
-            ax.set_ylabel('Calories')
-            
-            # Adjust layout
-            figure.tight_layout()
-            
-            # Create canvas
-            canvas = FigureCanvasTkAgg(figure, self.graph_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            # The bars are re-heighted in place on the chart built in __init__
+            self.workout_chart.plot(dates, calories)
             
         except Exception as e:
             # Show error message if graph creation fails
-            ttk.Label(self.graph_frame, text=f"Unable to create graph: {e}", 
-                     font=self.normal_font, background=self.bg_color).pack(pady=20)
\ No newline at end of file
+            self.workout_chart.show_message(f"Unable to create graph: {e}")
\ No newline at end of file
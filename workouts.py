@@ -0,0 +1,117 @@
+from datetime import datetime
+
+# Columns of the history list (KeysetSource adds the date/id key)
+HISTORY_COLUMNS = "id, date, level, duration, calories_burned, completed"
+
+# The exercises of one workout, for the details window
+EXERCISES_QUERY = '''
+SELECT exercise_name, sets, reps FROM workout_exercises WHERE workout_id = ?
+'''
+
+# The progress graph plots the user's first workouts
+GRAPH_QUERY = '''
+SELECT date, calories_burned, duration FROM workouts
+WHERE username = ?
+ORDER BY date ASC
+LIMIT 10
+'''
+
+# Exercises per level; calories_per_rep counts per second for duration exercises
+WORKOUT_LEVELS = {
+    "Beginner": [
+        {"name": "Push-ups", "reps": 10, "sets": 3, "calories_per_rep": 0.5},
+        {"name": "Squats", "reps": 15, "sets": 3, "calories_per_rep": 0.6},
+        {"name": "Plank", "reps": 30, "sets": 3, "calories_per_rep": 0.4, "is_duration": True},
+        {"name": "Jumping Jacks", "reps": 20, "sets": 3, "calories_per_rep": 0.3},
+        {"name": "Crunches", "reps": 12, "sets": 3, "calories_per_rep": 0.25}
+    ],
+    "Intermediate": [
+        {"name": "Push-ups", "reps": 15, "sets": 4, "calories_per_rep": 0.5},
+        {"name": "Squats", "reps": 20, "sets": 4, "calories_per_rep": 0.6},
+        {"name": "Plank", "reps": 45, "sets": 4, "calories_per_rep": 0.4, "is_duration": True},
+        {"name": "Burpees", "reps": 12, "sets": 3, "calories_per_rep": 1.0},
+        {"name": "Mountain Climbers", "reps": 30, "sets": 3, "calories_per_rep": 0.3},
+        {"name": "Lunges", "reps": 10, "sets": 3, "calories_per_rep": 0.4}
+    ],
+    "Advanced": [
+        {"name": "Push-ups", "reps": 25, "sets": 4, "calories_per_rep": 0.5},
+        {"name": "Squats", "reps": 30, "sets": 4, "calories_per_rep": 0.6},
+        {"name": "Plank", "reps": 60, "sets": 3, "calories_per_rep": 0.4, "is_duration": True},
+        {"name": "Burpees", "reps": 20, "sets": 4, "calories_per_rep": 1.0},
+        {"name": "Pull-ups", "reps": 8, "sets": 3, "calories_per_rep": 1.0},
+        {"name": "Box Jumps", "reps": 15, "sets": 4, "calories_per_rep": 0.7},
+        {"name": "Diamond Push-ups", "reps": 12, "sets": 3, "calories_per_rep": 0.6}
+    ]
+}
+
+
+def completion_status(percentage):
+    """Status label stored with a workout for the share of sets done"""
+    if percentage == 100:
+        return "Completed"
+    elif percentage >= 75:
+        return "Mostly Done"
+    elif percentage >= 50:
+        return "Half Done"
+    return "Partial"
+
+
+class WorkoutSession:
+    """A workout in progress: sets done per exercise and calories burned so far"""
+
+    def __init__(self, level, started=None):
+        self.level = level
+        self.exercises = WORKOUT_LEVELS[level]
+        self.started = started or datetime.now()
+        self.completed_sets = {exercise["name"]: 0 for exercise in self.exercises}
+        self.total_sets = sum(exercise["sets"] for exercise in self.exercises)
+        self.done_sets = 0
+        self.calories = 0.0
+        self._by_name = {exercise["name"]: exercise for exercise in self.exercises}
+
+    def complete_set(self, name):
+        """Count one set of an exercise; False once its target is reached"""
+        exercise = self._by_name[name]
+        if self.completed_sets[name] >= exercise["sets"]:
+            return False
+        self.completed_sets[name] += 1
+        self.done_sets += 1
+        self.calories += exercise["reps"] * exercise["calories_per_rep"]
+        return True
+
+    @property
+    def progress(self):
+        """Percentage of all target sets done"""
+        return self.done_sets / self.total_sets * 100
+
+    def finish(self, ended=None):
+        """Summary of the workout as save_workout stores it"""
+        ended = ended or datetime.now()
+        percentage = self.progress
+        return {
+            "level": self.level,
+            "date": ended.strftime('%Y-%m-%d %H:%M:%S'),
+            "duration": (ended - self.started).total_seconds() / 60,  # in minutes
+            "calories_burned": round(self.calories, 1),
+            "completion_percentage": percentage,
+            "status": completion_status(percentage),
+            "completed_sets": self.done_sets,
+            "total_sets": self.total_sets,
+            "exercises": [(exercise["name"], self.completed_sets[exercise["name"]], exercise["reps"])
+                          for exercise in self.exercises],
+        }
+
+
+def save_workout(conn, username, summary):
+    """Store a finished workout and its exercises; returns the workout id"""
+    cursor = conn.execute('''
+    INSERT INTO workouts (username, date, day, level, duration, calories_burned, completed)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (username, summary["date"], summary["date"][:10], summary["level"], summary["duration"],
+          summary["calories_burned"], 1 if summary["status"] == "Completed" else 0))
+    workout_id = cursor.lastrowid
+    conn.executemany('''
+    INSERT INTO workout_exercises (workout_id, exercise_name, sets, reps)
+    VALUES (?, ?, ?, ?)
+    ''', [(workout_id, name, sets, reps) for name, sets, reps in summary["exercises"]])
+    return workout_id